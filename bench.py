@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+bench.py
+
+Offline benchmark of the magic.py restore passes over a pinned local corpus.
+
+Corpus (rebuilt in <workdir>/corpus on every run, nothing is downloaded):
+ - restore_work/all.js                         real webpack bundle
+ - every inline <script> of ./captcha          small real-world snippets (latency bound)
+ - obfuscator.io-style samples of increasing size, generated from a fixed seed
+   (string array function, rotation IIFE, base64 decoder, wrapper and alias)
+
+Every pass runs in a fresh tools/worker.js per file (so peak RSS belongs to that pass on that
+file): one warm-up, then --repeat timed runs. The full try_passes() pipeline is timed the same
+way, in its default and --pipeline modes. Reported per benchmark: MB/s at the median, p50/p90/max
+latency and peak RSS of the node worker. The puppeteer pass loads each file from a local
+file:// page; its RSS is the worker's only, the browser processes are not counted.
+
+Usage:
+  python3 bench.py [--repeat N] [--sizes 100,400,1600] [--only beautify,pipeline,...] [--no-full]
+                   [--baseline bench_baseline.json] [--save-baseline] [--threshold 0.25] [--report PATH]
+
+With --baseline, a benchmark whose median latency or peak RSS grew by more than --threshold
+(and by more than --min-delta-ms for latency) is reported as a regression and the exit code is 1.
+--save-baseline writes the current results to the --baseline path instead of comparing.
+"""
+
+import argparse
+import base64
+import contextlib
+import json
+import os
+import random
+import re
+import shutil
+import sys
+import time
+from pathlib import Path
+
+import magic
+from magic import NodeWorker, try_passes
+
+ROOT = Path(__file__).resolve().parent
+LOG_PREFIX = "[bench]"
+PASSES = ["beautify", "deobf_string_array", "ast_rename", "pipeline", "split_webpack", "puppeteer"]
+FULL_MODES = {"full": {}, "full_pipeline": {"pipeline": True}}
+DEFAULT_SIZES = [100, 400, 1600]
+INLINE_SCRIPT_RE = re.compile(r"<script(?![^>]*\bsrc=)[^>]*>(.*?)</script>", re.S | re.I)
+WORDS = ("user token session fetch length push apply call prototype toString value data items status "
+         "error message request response headers json parse stringify location href origin cookie "
+         "storage timeout interval resolve reject then catch balance deposit withdraw game round").split()
+
+
+def log(msg):
+    print(f"{LOG_PREFIX} {msg}", flush=True)
+
+
+def obfuscated_sample(n_funcs, seed=0):
+    """obfuscator.io-like script with n_funcs functions that read their strings through the decoder."""
+    rng = random.Random(seed)
+    names = set()
+
+    def hexname():
+        while True:
+            name = "_0x%x" % rng.randrange(0x1000, 0xffffff)
+            if name not in names:
+                names.add(name)
+                return name
+
+    n_strings = max(16, n_funcs)
+    strings = [str(rng.randrange(100000, 999999))]
+    strings += [rng.choice(WORDS) + ("" if rng.random() < 0.5 else str(rng.randrange(100))) for _ in range(n_strings - 1)]
+    check = int(strings[0])
+    offset = rng.randrange(0x100, 0x300)
+    # the rotation IIFE shifts the array left until strings[0] is back at index 0
+    shift = rng.randrange(1, n_strings)
+    encoded = [base64.b64encode(s.encode()).decode() for s in strings]
+    encoded = encoded[-shift:] + encoded[:-shift]
+
+    arr_fn, arr, dec, wrap, alias = hexname(), hexname(), hexname(), hexname(), hexname()
+    a, b, c, d, e = (hexname() for _ in range(5))
+    lines = [
+        f"function {arr_fn}(){{var {arr}=[{','.join(repr(s) for s in encoded)}];"
+        f"{arr_fn}=function(){{return {arr};}};return {arr_fn}();}}",
+        f"function {dec}({a},{b}){{var {c}={arr_fn}();{dec}=function({d},{e}){{{d}={d}-{hex(offset)};"
+        f"var {a}={c}[{d}];{a}=atob({a});return {a};}};return {dec}({a},{b});}}",
+        f"(function({a},{b}){{var {c}={a}();while(!![]){{try{{var {d}=parseInt({dec}({hex(offset)}));"
+        f"if({d}==={b})break;else {c}['push']({c}['shift']());}}catch({e}){{{c}['push']({c}['shift']());}}}}}}"
+        f"({arr_fn},{check}));",
+        f"function {wrap}({a},{b}){{return {dec}({a}-0x10,{b});}}",
+        f"var {alias}={dec};",
+    ]
+
+    def ref():
+        idx = offset + rng.randrange(1, n_strings)
+        kind = rng.random()
+        if kind < 0.15:
+            return f"{wrap}({hex(idx + 0x10)})"
+        if kind < 0.3:
+            return f"{alias}({hex(idx)})"
+        return f"{dec}({hex(idx)})"
+
+    for _ in range(n_funcs):
+        fn, p, q, r, s = (hexname() for _ in range(5))
+        lines.append(
+            f"function {fn}({p},{q}){{var {r}={ref()}+{p};if({q}&&{q}[{ref()}]){{{r}+={q}[{ref()}];}}"
+            f"var {s}=[{ref()},{ref()},{r}];return {s}[{ref()}]?{s}.join({ref()}):{r};}}"
+        )
+    return "\n".join(lines) + "\n"
+
+
+def build_corpus(corpus_dir, sizes, seed):
+    shutil.rmtree(corpus_dir, ignore_errors=True)
+    corpus_dir.mkdir(parents=True)
+    items = []
+    bundle = ROOT / "restore_work" / "all.js"
+    if bundle.exists():
+        shutil.copy2(bundle, corpus_dir / "all.js")
+        items.append(corpus_dir / "all.js")
+    captcha = ROOT / "captcha"
+    if captcha.exists():
+        seen = set()
+        html = captcha.read_text(encoding="utf8", errors="ignore")
+        for code in INLINE_SCRIPT_RE.findall(html):
+            if not code.strip() or code in seen:
+                continue
+            seen.add(code)
+            path = corpus_dir / f"captcha_inline_{len(seen):02d}.js"
+            path.write_text(code, encoding="utf8")
+            items.append(path)
+    for n in sizes:
+        path = corpus_dir / f"obfuscated_{n}.js"
+        path.write_text(obfuscated_sample(n, seed), encoding="utf8")
+        items.append(path)
+    return items
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(q * (len(ordered) - 1))))]
+
+
+def summarize(name, item, size, times, peak_rss_kb):
+    p50 = percentile(times, 0.5)
+    return {
+        "bench": f"{name}:{item}",
+        "bytes": size,
+        "runs": len(times),
+        "p50_ms": round(p50, 2),
+        "p90_ms": round(percentile(times, 0.9), 2),
+        "max_ms": round(max(times), 2),
+        "mb_s": round(size / 1e6 / (p50 / 1000), 3) if p50 else None,
+        "peak_rss_kb": peak_rss_kb,
+    }
+
+
+@contextlib.contextmanager
+def quiet():
+    """Pass and worker logs would bury the results; they are dropped while timing."""
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+def bench_pass(method, items, outdir, repeat):
+    results = []
+    outdir.mkdir(parents=True, exist_ok=True)
+    for item in items:
+        params = {"src": str(item)} if method == "split_webpack" else {"src": str(item), "outdir": str(outdir)}
+        times = []
+        # the worker reports its lifetime max RSS, so every file gets its own
+        with quiet():
+            worker = NodeWorker()
+        try:
+            with quiet():
+                for i in range(repeat + 1):
+                    t0 = time.perf_counter()
+                    worker.call(method, **params)
+                    if i:
+                        times.append((time.perf_counter() - t0) * 1000)
+        except RuntimeError as e:
+            log(f"{method} failed on {item.name}, skipped: {str(e).splitlines()[0]}")
+            continue
+        finally:
+            with quiet():
+                worker.close()
+        results.append(summarize(method, item.name, item.stat().st_size, times, worker.usage.get("peak_rss_kb")))
+    return results
+
+
+def bench_full(mode, options, items, outdir, repeat):
+    results = []
+    for item in items:
+        times = []
+        with quiet():
+            worker = NodeWorker()
+        try:
+            for i in range(repeat + 1):
+                shutil.rmtree(outdir, ignore_errors=True)
+                with quiet():
+                    t0 = time.perf_counter()
+                    try_passes(item, outdir, cache=None, worker=worker, **options)
+                    elapsed = (time.perf_counter() - t0) * 1000
+                if i:
+                    times.append(elapsed)
+        finally:
+            with quiet():
+                worker.close()
+        results.append(summarize(mode, item.name, item.stat().st_size, times, worker.usage.get("peak_rss_kb")))
+    return results
+
+
+def compare(results, baseline, threshold, min_delta_ms):
+    base = {r["bench"]: r for r in baseline.get("results", [])}
+    regressions = []
+    for r in results:
+        old = base.get(r["bench"])
+        if not old:
+            continue
+        if r["p50_ms"] > old["p50_ms"] * (1 + threshold) and r["p50_ms"] - old["p50_ms"] > min_delta_ms:
+            regressions.append(f"{r['bench']}: p50 {old['p50_ms']}ms -> {r['p50_ms']}ms")
+        if old.get("peak_rss_kb") and r.get("peak_rss_kb") and r["peak_rss_kb"] > old["peak_rss_kb"] * (1 + threshold):
+            regressions.append(f"{r['bench']}: peak RSS {old['peak_rss_kb']}KB -> {r['peak_rss_kb']}KB")
+    return regressions
+
+
+def print_table(results):
+    log(f"{'benchmark':<44} {'bytes':>9} {'MB/s':>8} {'p50 ms':>9} {'p90 ms':>9} {'max ms':>9} {'rss MB':>7}")
+    for r in results:
+        rss = r["peak_rss_kb"] // 1024 if r.get("peak_rss_kb") else "-"
+        log(f"{r['bench']:<44} {r['bytes']:>9} {r['mb_s'] or 0:>8.3f} {r['p50_ms']:>9.1f} {r['p90_ms']:>9.1f} "
+            f"{r['max_ms']:>9.1f} {rss:>7}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workdir", default="bench_work", help="Corpus and pass output directory")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per file (after one warm-up)")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="Function counts of the synthetic obfuscated samples")
+    parser.add_argument("--seed", type=int, default=1337, help="Seed of the synthetic samples")
+    parser.add_argument("--only", help="Comma-separated subset of passes/modes to run")
+    parser.add_argument("--no-full", action="store_true", help="Skip the full try_passes() runs")
+    parser.add_argument("--baseline", default="bench_baseline.json", help="Baseline results file")
+    parser.add_argument("--save-baseline", action="store_true", help="Write results to --baseline")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed relative slowdown / RSS growth")
+    parser.add_argument("--min-delta-ms", type=float, default=5.0, help="Ignore latency changes below this")
+    parser.add_argument("--report", help="Also write the results as JSON here")
+    args = parser.parse_args()
+
+    if not (magic.TOOLS / "worker.js").exists():
+        log("tools/worker.js not found; run bench.py from the repository root after magic.py wrote the tools")
+        sys.exit(2)
+    workdir = Path(args.workdir).resolve()
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+    items = build_corpus(workdir / "corpus", sizes, args.seed)
+    log(f"Corpus: {len(items)} files, {sum(p.stat().st_size for p in items)} bytes in {workdir / 'corpus'}")
+    only = set(args.only.split(",")) if args.only else None
+
+    results = []
+    for method in PASSES:
+        if only and method not in only:
+            continue
+        log(f"Pass {method} x{args.repeat}")
+        results += bench_pass(method, items, workdir / "out", args.repeat)
+    if not args.no_full:
+        for mode, options in FULL_MODES.items():
+            if only and mode not in only:
+                continue
+            log(f"try_passes {mode} x{args.repeat}")
+            results += bench_full(mode, options, items, workdir / "full", args.repeat)
+    print_table(results)
+
+    run = {"created": time.time(), "repeat": args.repeat, "sizes": sizes, "seed": args.seed, "results": results}
+    if args.report:
+        Path(args.report).write_text(json.dumps(run, indent=1), encoding="utf8")
+        log(f"Report written: {args.report}")
+    baseline_path = Path(args.baseline)
+    if args.save_baseline:
+        baseline_path.write_text(json.dumps(run, indent=1), encoding="utf8")
+        log(f"Baseline saved: {baseline_path}")
+        return
+    if baseline_path.exists():
+        regressions = compare(results, json.loads(baseline_path.read_text(encoding="utf8")),
+                              args.threshold, args.min_delta_ms)
+        for line in regressions:
+            log("REGRESSION " + line)
+        if regressions:
+            sys.exit(1)
+        log(f"No regressions against {baseline_path} (threshold {args.threshold:.0%})")
+    else:
+        log(f"No baseline at {baseline_path}; use --save-baseline to create one")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""
+body_store.py
+
+Контентно-адресуемое хранилище тел ответов: каждое уникальное тело лежит один раз
+в objects/<ab>/<sha256>[.gz], а timeline (history.py --body-store DIR) вместо
+содержимого пишет ссылку:
+
+    [BODY]
+    sha256:<hash> (<size> bytes)
+
+Хеш считается по тому же тексту, что раньше попадал в timeline (после strip),
+и совпадает с body_hash в timeline1.sqlite. Объект пишется во временный файл
+и публикуется жёсткой ссылкой (os.link не заменяет существующий файл), поэтому
+в хранилище могут одновременно писать несколько процессов (history.py --workers):
+одно и то же тело создаёт и считает новым только один из них.
+
+  python3 body_store.py DIR             статистика хранилища и последнего прогона
+  python3 body_store.py DIR --cat HASH  содержимое тела
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import re
+import tempfile
+
+# тела до этого размера хешируются в памяти: дубликат не пишется на диск вовсе
+SPILL_SIZE = 4 << 20
+REF_RE = re.compile(r"^sha256:([0-9a-f]{64}) \((\d+) bytes\)$")
+
+
+def body_ref(body_hash, size):
+    return f"sha256:{body_hash} ({size} bytes)"
+
+
+class BodyStore:
+    def __init__(self, root, compress=True):
+        self.root = root
+        self.compress = compress
+        self.objects = os.path.join(root, "objects")
+        self.tmp = os.path.join(root, "tmp")
+
+    def path(self, body_hash, compress=None):
+        compress = self.compress if compress is None else compress
+        return os.path.join(self.objects, body_hash[:2], body_hash[2:] + (".gz" if compress else ""))
+
+    def find(self, body_hash):
+        for compress in (self.compress, not self.compress):
+            path = self.path(body_hash, compress)
+            if os.path.exists(path):
+                return path
+        return None
+
+    def get(self, body_hash):
+        path = self.find(body_hash)
+        if path is None:
+            raise KeyError(body_hash)
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rb") as f:
+            return f.read()
+
+    def _open_tmp(self):
+        os.makedirs(self.tmp, exist_ok=True)
+        fd, name = tempfile.mkstemp(dir=self.tmp)
+        raw = os.fdopen(fd, "wb")
+        return name, raw, (gzip.GzipFile(fileobj=raw, mode="wb", mtime=0) if self.compress else raw)
+
+    def put(self, chunks):
+        """
+        Сохраняет тело из кусков (str или bytes). Возвращает (hash, размер, байт записано
+        на диск) — 0, если такое тело уже было в хранилище.
+        """
+        digest = hashlib.sha256()
+        size = 0
+        buf = []
+        spill = None
+        try:
+            for chunk in chunks:
+                data = chunk.encode("utf-8") if isinstance(chunk, str) else chunk
+                digest.update(data)
+                size += len(data)
+                if spill:
+                    spill[2].write(data)
+                    continue
+                buf.append(data)
+                if size > SPILL_SIZE:
+                    spill = self._open_tmp()
+                    spill[2].write(b"".join(buf))
+                    buf = None
+
+            body_hash = digest.hexdigest()
+            if self.find(body_hash):
+                return body_hash, size, 0
+            if spill is None:
+                spill = self._open_tmp()
+                spill[2].write(b"".join(buf))
+            name, raw, f = spill
+            f.close()
+            raw.close()
+            path = self.path(body_hash)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            try:
+                os.link(name, path)
+            except FileExistsError:
+                # другой процесс записал это тело между find() и link
+                return body_hash, size, 0
+            return body_hash, size, os.path.getsize(path)
+        finally:
+            if spill:
+                spill[2].close()
+                spill[1].close()
+                os.remove(spill[0])
+
+    def disk_usage(self):
+        objects = stored = 0
+        for root, dirs, files in os.walk(self.objects):
+            for f in files:
+                objects += 1
+                stored += os.path.getsize(os.path.join(root, f))
+        return objects, stored
+
+
+class StoreStats:
+    """Счётчики дедупликации за один прогон history.py."""
+
+    def __init__(self):
+        self.bodies = 0
+        self.bytes = 0
+        self.unique = {}
+        self.new = 0
+        self.new_bytes = 0
+        self.written = 0
+
+    def add(self, body_hash, size, written):
+        self.bodies += 1
+        self.bytes += size
+        self.unique[body_hash] = size
+        if written:
+            self.new += 1
+            self.new_bytes += size
+            self.written += written
+
+    def summary(self):
+        unique_bytes = sum(self.unique.values())
+        return {
+            "bodies": self.bodies,
+            "bytes": self.bytes,
+            "unique": len(self.unique),
+            "unique_bytes": unique_bytes,
+            "dedup_ratio": round(self.bytes / unique_bytes, 2) if unique_bytes else None,
+            "new_objects": self.new,
+            "new_bytes": self.new_bytes,
+            "written_bytes": self.written,
+        }
+
+    def save(self, store):
+        os.makedirs(store.root, exist_ok=True)
+        with open(os.path.join(store.root, "stats.json"), "w", encoding="utf-8") as f:
+            json.dump(self.summary(), f, indent=1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Хранилище тел ответов (history.py --body-store)")
+    parser.add_argument("root")
+    parser.add_argument("--cat", metavar="HASH", help="Вывести тело по sha256")
+    args = parser.parse_args()
+
+    store = BodyStore(args.root)
+    if args.cat:
+        os.write(1, store.get(args.cat.removeprefix("sha256:")))
+        return
+
+    objects, stored = store.disk_usage()
+    print(f"[STAT] Объектов: {objects}, на диске {stored / 1e6:.1f} MB")
+    stats_path = os.path.join(args.root, "stats.json")
+    if os.path.exists(stats_path):
+        with open(stats_path, encoding="utf-8") as f:
+            s = json.load(f)
+        print(f"[STAT] Последний прогон: тел {s['bodies']} ({s['bytes'] / 1e6:.1f} MB), уникальных {s['unique']} "
+              f"({s['unique_bytes'] / 1e6:.1f} MB), дедупликация ×{s['dedup_ratio']}, новых объектов {s['new_objects']}")
+
+
+if __name__ == "__main__":
+    main()
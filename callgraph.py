@@ -0,0 +1,311 @@
+"""
+callgraph.py
+
+Граф вызовов функций JS-бандла (по jsscan.scan) и, для webpack-бандлов, граф модулей
+по require r(<id>) (restore_work/all.js). Рёбра хранятся компактно, в виде CSR: для
+каждого узла — смещение в общем массиве id соседей (array "I"), прямой и обратный граф.
+Индекс — один файл: строка-заголовок JSON (имена функций, где какой массив) и сырые
+массивы; загрузка — одно чтение, запросы достижимости — обход в ширину по массивам.
+
+Узлы графа вызовов — функции (id из jsscan). Вызов name(...) связывается с функциями
+с таким именем, obj.name(...) — ещё и с методами name; имена, которые носят больше
+MAX_CANDIDATES функций (минифицированные e, t, n), не связываются. Вложенная функция
+или стрелка (не метод) связана с объемлющей: объемлющая её создаёт и вызывает сама
+(IIFE) или отдаёт колбэком (then(res), forEach(x => ...)), так что вызовы колбэка
+достижимы из объемлющей. Граф приблизительный: колбэк, сохранённый и вызванный
+позже чужим кодом, тоже считается вызовом объемлющей. Вызовы API из того же прохода
+(fetch, xhr, client, websocket, subscribe) — метки узлов: цель "api:fetch".
+
+  python3 callgraph.py GRAPH --build restore_work/all.js    построить и сохранить
+  python3 callgraph.py [GRAPH] --to api:fetch --to api:websocket  кто транзитивно вызывает
+  python3 callgraph.py [GRAPH] --from NAME|ID                     что достижимо из функции
+  python3 callgraph.py [GRAPH] --modules --to 3445                кто require-ит модуль
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from array import array
+
+from jsscan import scan
+
+GRAPH_FILE = "analysis_graph.bin"
+MAGIC = b"JSGRAPH1\n"
+MAX_CANDIDATES = 3
+API_KINDS = ["fetch", "xhr", "client", "websocket", "subscribe"]
+REQUIRE_ARG_RE = re.compile(r"\(\s*(\d+)\s*\)")
+# сразу после функции: ((...) => {...})(...), function () {...}(...), (function () {...}).call(...)
+IIFE_RE = re.compile(r"\s*\)?\s*(?:\.\s*(?:call|apply)\s*)?\(")
+KIND_CODES = {"function": "f", "arrow": "a", "method": "m"}
+
+
+def csr(n, edges):
+    """(offsets, targets) для рёбер (a, b) между узлами 0..n-1; соседи узла i — targets[offsets[i]:offsets[i + 1]]."""
+    edges = sorted(set(edges))
+    offsets = array("I", [0]) * (n + 1)
+    for a, _ in edges:
+        offsets[a + 1] += 1
+    for i in range(n):
+        offsets[i + 1] += offsets[i]
+    return offsets, array("I", (b for _, b in edges))
+
+
+def add_csr(arrays, name, n, edges):
+    arrays[name + "_off"], arrays[name] = csr(n, edges)
+    arrays[name + "_rev_off"], arrays[name + "_rev"] = csr(n, [(b, a) for a, b in edges])
+
+
+def call_edges(src, funcs, refs):
+    """
+    Рёбра вызывающая → вызываемая и функции, вызванные с верхнего уровня. Вложенная
+    функция или стрелка — ребро от объемлющей функции; IIFE верхнего уровня — корень.
+    """
+    plain, member = {}, {}
+    for f in funcs:
+        name = f["name"]
+        if name.startswith("<") or name.isdigit():
+            continue
+        member.setdefault(name, []).append(f["id"])
+        if f["kind"] != "method":
+            plain.setdefault(name, []).append(f["id"])
+    edges, roots = set(), set()
+    for f in funcs:
+        if f["kind"] == "method":
+            continue
+        if f["parent"] is not None:
+            edges.add((f["parent"], f["id"]))
+        elif IIFE_RE.match(src, f["end"]):
+            roots.add(f["id"])
+    for caller, name in zip(refs[0], refs[1]):
+        if name is None:
+            continue
+        targets = member.get(name[1:]) if name[0] == "." else plain.get(name)
+        if not targets or len(targets) > MAX_CANDIDATES:
+            continue
+        for target in targets:
+            if caller < 0:
+                roots.add(target)
+            elif target != caller:
+                edges.add((caller, target))
+    return edges, roots
+
+
+def module_edges(src, funcs, refs):
+    """
+    Модули webpack — функции с числовым именем (334: function (t, e, r) {...}) не глубже
+    фабрики бандла; ребро модуль → модуль для каждого r(<id>), где r — третий параметр
+    модуля. (id модулей по порядку, {id функции: id модуля}, рёбра, entry-модули).
+    """
+    module_of = [None] * len(funcs)
+    require = {}
+    for f in funcs:
+        parent = f["parent"]
+        if f["name"].isdigit() and f["depth"] <= 1:
+            module_of[f["id"]] = int(f["name"])
+            params = [p.strip() for p in f["params"].split(",")]
+            if len(params) >= 3:
+                require[f["id"]] = params[2]
+        elif parent is not None:
+            module_of[f["id"]] = module_of[parent]
+    module_func = {}
+    for f in funcs:
+        if f["name"].isdigit() and f["depth"] <= 1:
+            module_func.setdefault(int(f["name"]), f["id"])
+    if not module_func:
+        return [], {}, set(), set()
+
+    edges, entries = set(), set()
+    func_names = {f["name"] for f in funcs if not f["name"].isdigit()}
+    for caller, name, pos in zip(*refs):
+        if name is None or name[0] == ".":
+            continue
+        m = REQUIRE_ARG_RE.match(src, pos)
+        if not m or int(m.group(1)) not in module_func:
+            continue
+        module = module_of[caller] if caller >= 0 else None
+        if module is None:
+            # вызов вне модулей — рантайм бандла грузит entry-модуль своей функцией require
+            if name in func_names:
+                entries.add(int(m.group(1)))
+            continue
+        func = module_func[module]
+        if require.get(func) == name:
+            edges.add((module, int(m.group(1))))
+    ids = sorted(module_func)
+    return ids, {module_func[i]: i for i in ids}, edges, entries
+
+
+def build(src, funcs, calls, refs, source=None):
+    """Граф по результатам scan(src, api=True, graph=True): (заголовок, массивы)."""
+    n = len(funcs)
+    arrays = {}
+    edges, roots = call_edges(src, funcs, refs)
+    add_csr(arrays, "calls", n, edges)
+    arrays["roots"] = array("I", sorted(roots))
+    arrays["start"] = array("I", (f["start"] for f in funcs))
+    api = {(c["function"], API_KINDS.index(c["kind"])) for c in calls if c["function"] is not None}
+    arrays["api_off"], arrays["api"] = csr(n, api)
+
+    ids, _, medges, entries = module_edges(src, funcs, refs)
+    index = {m: i for i, m in enumerate(ids)}
+    arrays["module_ids"] = array("I", ids)
+    add_csr(arrays, "requires", len(ids), [(index[a], index[b]) for a, b in medges])
+    arrays["entries"] = array("I", sorted(index[m] for m in entries))
+
+    header = {
+        "format": 1,
+        "source": source,
+        "sha256": hashlib.sha256(src.encode("utf-8", "surrogatepass")).hexdigest(),
+        "names": [f["name"] for f in funcs],
+        "kinds": "".join(KIND_CODES[f["kind"]] for f in funcs),
+        "api_kinds": API_KINDS,
+    }
+    return header, arrays
+
+
+def save(path, header, arrays):
+    layout = {}
+    offset = 0
+    for name, a in arrays.items():
+        layout[name] = [offset, len(a), a.typecode]
+        offset += len(a) * a.itemsize
+    header = dict(header, arrays=layout)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(MAGIC)
+        f.write(json.dumps(header, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n")
+        for a in arrays.values():
+            a.tofile(f)
+    os.replace(tmp, path)
+
+
+class Graph:
+    """Сохранённый граф: массивы CSR и запросы достижимости."""
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            data = f.read()
+        if not data.startswith(MAGIC):
+            raise ValueError(f"{path}: not a call graph file")
+        end = data.index(b"\n", len(MAGIC))
+        self.header = json.loads(data[len(MAGIC):end])
+        base = end + 1
+        self.arrays = {}
+        for name, (offset, count, typecode) in self.header["arrays"].items():
+            a = array(typecode)
+            a.frombytes(data[base + offset:base + offset + count * a.itemsize])
+            self.arrays[name] = a
+        self.names = self.header["names"]
+        self.kinds = self.header["kinds"]
+
+    def __getattr__(self, name):
+        try:
+            return self.__dict__["arrays"][name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def reach(self, seeds, graph="calls", reverse=False):
+        """{узел: расстояние} для всех узлов, достижимых из seeds (reverse — по обратным рёбрам)."""
+        key = graph + "_rev" if reverse else graph
+        offsets, targets = self.arrays[key + "_off"], self.arrays[key]
+        dist = {s: 0 for s in seeds}
+        queue = list(dist)
+        for node in queue:
+            d = dist[node] + 1
+            for t in targets[offsets[node]:offsets[node + 1]]:
+                if t not in dist:
+                    dist[t] = d
+                    queue.append(t)
+        return dist
+
+    def api_of(self, func):
+        return [API_KINDS[k] for k in self.api[self.api_off[func]:self.api_off[func + 1]]]
+
+    def functions(self, spec):
+        """id функций по спецификации: число — id, api:KIND — функции с таким вызовом, иначе имя."""
+        if spec.isdigit():
+            return [int(spec)]
+        if spec.startswith("api:"):
+            kind = API_KINDS.index(spec[4:])
+            off, api = self.api_off, self.api
+            return [i for i in range(len(self.names)) if kind in api[off[i]:off[i + 1]]]
+        return [i for i, name in enumerate(self.names) if name == spec]
+
+    def modules(self, spec):
+        ids = self.module_ids
+        return [i for i in range(len(ids)) if str(ids[i]) == spec]
+
+
+def query(graph, sources=(), targets=(), modules=False):
+    """
+    {узел: расстояние}: достижимые из sources, транзитивно достигающие targets,
+    при обоих — узлы на путях от sources к targets.
+    """
+    resolve = graph.modules if modules else graph.functions
+    name = "requires" if modules else "calls"
+    forward = backward = None
+    if sources:
+        forward = graph.reach([n for s in sources for n in resolve(s)], name)
+    if targets:
+        backward = graph.reach([n for s in targets for n in resolve(s)], name, reverse=True)
+    if forward is not None and backward is not None:
+        return {n: d for n, d in forward.items() if n in backward}
+    return forward if forward is not None else backward or {}
+
+
+def build_file(js_path, graph_path):
+    with open(js_path, encoding="utf-8", errors="replace") as f:
+        src = f.read()
+    funcs, calls, _, refs = scan(src, api=True, graph=True)
+    header, arrays = build(src, funcs, calls, refs, js_path)
+    save(graph_path, header, arrays)
+    return header, arrays
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Граф вызовов / модулей JS-бандла (см. f.py)")
+    parser.add_argument("graph", nargs="?", default=GRAPH_FILE)
+    parser.add_argument("--build", metavar="JS", help="Построить граф по JS-файлу и сохранить в GRAPH")
+    parser.add_argument("--from", dest="sources", action="append", default=[],
+                        help="Что достижимо из функции (id, имя) или модуля; можно несколько раз")
+    parser.add_argument("--to", dest="targets", action="append", default=[],
+                        help="Кто транзитивно вызывает функцию (id, имя, api:fetch, api:websocket, ...)")
+    parser.add_argument("--modules", action="store_true", help="Граф модулей webpack вместо графа вызовов")
+    parser.add_argument("--limit", type=int)
+    parser.add_argument("--count", action="store_true", help="Только число узлов")
+    args = parser.parse_args()
+
+    if args.build:
+        started = time.perf_counter()
+        header, arrays = build_file(args.build, args.graph)
+        print(f"[OK] {len(header['names'])} функций, {len(arrays['calls'])} рёбер вызовов, "
+              f"{len(arrays['module_ids'])} модулей, {len(arrays['requires'])} require → {args.graph} "
+              f"за {time.perf_counter() - started:.2f} с", file=sys.stderr)
+        return
+
+    started = time.perf_counter()
+    graph = Graph(args.graph)
+    loaded = time.perf_counter()
+    result = query(graph, args.sources, args.targets, args.modules)
+    elapsed = time.perf_counter() - loaded
+    if args.count:
+        print(len(result))
+    else:
+        nodes = sorted(result, key=lambda n: (result[n], n))
+        for node in nodes[:args.limit]:
+            if args.modules:
+                print(f"{result[node]:>3}  module {graph.module_ids[node]}")
+            else:
+                api = graph.api_of(node)
+                print(f"{result[node]:>3}  #{node:<6} {graph.start[node]:>9}  {graph.kinds[node]} {graph.names[node]}"
+                      + (f"  [{', '.join(api)}]" if api else ""))
+    print(f"[OK] {len(result)} узлов; загрузка {(loaded - started) * 1000:.1f} мс, "
+          f"запрос {elapsed * 1000:.1f} мс", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,53 +1,23 @@
 import re
+import os
 import requests
 import json
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import callgraph
+from jsscan import scan
 
 GIST_RAW_URL = "https://gist.githubusercontent.com/Hikita1337/a170c7a734fe705335e7a9737138f1e0/raw/restored.js"
 OUTPUT_FILE = "analysis_output_extended.json"
+NDJSON_FILE = "analysis_output.ndjson"
+# результаты по функциям между запусками и разница с предыдущим запуском
+CACHE_FILE = "analysis_cache.json"
+DIFF_FILE = "analysis_diff.json"
 
-print("[1] Downloading restored.js from Gist...")
-
-resp = requests.get(GIST_RAW_URL)
-if resp.status_code != 200:
-    raise Exception(f"Failed to download Gist: {resp.status_code}")
-
-js = resp.text
-print(f"[OK] File length: {len(js)} bytes")
-
-# ------------------------------------------------------
-# Extract all functions
-# ------------------------------------------------------
-print("[2] Extracting all functions...")
-
-# Простая эвристика для function + arrow + var/const function
-FUNC_REGEX = re.compile(
-    r'(function\s+([\w$]+)?\s*\((.*?)\)\s*\{)|'         # function foo(a,b)
-    r'(?:const\s+([\w$]+)\s*=\s*\((.*?)\)\s*=>\s*\{)|' # const foo = (a,b) => {
-    r'(?:var\s+([\w$]+)\s*=\s*function\s*\((.*?)\))',  # var foo = function(a,b)
-    re.DOTALL
-)
-
-def extract_function_bodies(js_code):
-    funcs = []
-    for m in FUNC_REGEX.finditer(js_code):
-        name = m.group(2) or m.group(4) or m.group(6) or "<anonymous>"
-        params = m.group(3) or m.group(5) or m.group(7) or ""
-        # Найдем тело функции
-        start = m.end()
-        brace_count = 1
-        i = start
-        while i < len(js_code) and brace_count > 0:
-            if js_code[i] == "{":
-                brace_count += 1
-            elif js_code[i] == "}":
-                brace_count -= 1
-            i += 1
-        body = js_code[start:i-1].strip()
-        funcs.append({"name": name, "params": params, "body": body})
-    return funcs
-
-functions = extract_function_bodies(js)
-print(f"[OK] Found {len(functions)} functions.")
+# функций на одну задачу пула при категоризации
+CATEGORIZE_BATCH = 2000
 
 # ------------------------------------------------------
 # Keyword categories
@@ -61,45 +31,426 @@ KEYWORDS = {
     "roulette": ["roulette", "spin", "wheel", "color"]
 }
 
-category_hits = {k: [] for k in KEYWORDS}
 
-print("[3] Categorizing functions by keywords inside body...")
+def download_js(url=GIST_RAW_URL):
+    print("[1] Downloading restored.js from Gist...")
+    resp = requests.get(url)
+    if resp.status_code != 200:
+        raise Exception(f"Failed to download Gist: {resp.status_code}")
+    js = resp.text
+    print(f"[OK] File length: {len(js)} bytes")
+    return js
+
+
+def read_js(path):
+    print(f"[1] Reading {path}...")
+    with open(path, encoding="utf-8", errors="replace") as f:
+        js = f.read()
+    print(f"[OK] File length: {len(js)} bytes")
+    return js
 
-for func in functions:
-    for cat, words in KEYWORDS.items():
+
+# ------------------------------------------------------
+# Extract all functions
+# ------------------------------------------------------
+# Один проход токенизатора (jsscan.py): строки, комментарии, regex и template literals
+# не путают подсчёт скобок, вложенные функции не пересканируются. Тот же проход
+# находит вызовы API (шаг 4)
+def extract_function_bodies(js_code, found):
+    funcs = []
+    for f in found:
+        funcs.append({
+            "id": f["id"],
+            "name": f["name"],
+            "kind": f["kind"],
+            "params": f["params"],
+            "start": f["start"],
+            "end": f["end"],
+            "body_start": f["body_start"],
+            "body_end": f["body_end"],
+            "depth": f["depth"],
+            "parent": f["parent"],
+            "hash": normalized_hash(js_code[f["body_start"]:f["body_end"]]),
+        })
+    return funcs
+
+
+def normalized_hash(body):
+    """sha256 тела без различий в пробелах и переводах строк — ключ кэша и diff."""
+    return hashlib.sha256(" ".join(body.split()).encode("utf-8", "surrogatepass")).hexdigest()
+
+
+# ------------------------------------------------------
+# Categorization: все ключевые слова — одно регулярное выражение,
+# каждое тело сканируется один раз
+# ------------------------------------------------------
+def load_keywords(path):
+    """
+    Категории из файла: JSON {"категория": ["слово", ...]} или текст,
+    по строке на категорию: "категория: слово, слово" (# — комментарий).
+    """
+    with open(path, encoding="utf8") as f:
+        text = f.read()
+    if text.lstrip().startswith("{"):
+        return json.loads(text)
+    keywords = {}
+    for line in text.splitlines():
+        line = line.split("#", 1)[0].strip()
+        if not line:
+            continue
+        cat, _, words = line.partition(":")
+        keywords.setdefault(cat.strip(), []).extend(w.strip() for w in words.split(",") if w.strip())
+    return keywords
+
+
+def _is_word(c):
+    return c.isalnum() or c == "_"
+
+
+def keywords_overlap(a, b):
+    """
+    Могут ли совпадения \ba\b и \bb\b пересечься в тексте ("game" и "game over",
+    "game over" и "over time"). Одно регулярное выражение на такие слова находит только
+    одно из них, остальные пропадают.
+    """
+    for x, y in ((a, b), (b, a)):
+        for d in range(len(x)):
+            common = min(len(y), len(x) - d)
+            if x[d:d + common] != y[:common]:
+                continue
+            # внутри x на границах y должна быть граница слова
+            if d and _is_word(x[d - 1]) == _is_word(x[d]):
+                continue
+            end = d + len(y)
+            if end < len(x) and _is_word(x[end - 1]) == _is_word(x[end]):
+                continue
+            if end > len(x) and _is_word(y[common - 1]) == _is_word(y[common]):
+                continue
+            return True
+    return False
+
+
+def compile_keywords(keywords):
+    """
+    (регулярные выражения, слово в нижнем регистре → его категории). Все слова —
+    одно выражение; слова, чьи совпадения могут пересекаться с другими, ищутся
+    каждое своим, как в прежнем поиске по одному слову.
+    """
+    categories = {}
+    for cat, words in keywords.items():
         for w in words:
-            if re.search(r'\b' + re.escape(w) + r'\b', func["body"], re.IGNORECASE):
-                category_hits[cat].append(func)
-                break
+            categories.setdefault(w.lower(), []).append(cat)
+    words = sorted(categories, key=len, reverse=True)
+    separate = set()
+    for i, w in enumerate(words):
+        for v in words[i + 1:]:
+            if keywords_overlap(w, v):
+                separate.update((w, v))
+    patterns = []
+    alternatives = "|".join(re.escape(w) for w in words if w not in separate)
+    if alternatives:
+        patterns.append(re.compile(r"\b(?:" + alternatives + r")\b", re.IGNORECASE))
+    patterns += [re.compile(r"\b" + re.escape(w) + r"\b", re.IGNORECASE) for w in words if w in separate]
+    return patterns, categories
+
+
+_source = None
+_patterns = None
+
+
+def init_categorizer(js, keywords):
+    global _source, _patterns
+    _source = js
+    _patterns = compile_keywords(keywords)[0]
+
+
+def categorize_batch(spans):
+    """Для каждого тела (start, end) — {слово: число вхождений}."""
+    results = []
+    for start, end in spans:
+        hits = {}
+        for pattern in _patterns:
+            for m in pattern.finditer(_source, start, end):
+                w = m.group().lower()
+                hits[w] = hits.get(w, 0) + 1
+        results.append(hits)
+    return results
+
+
+def categorize(js, functions, keywords, workers=1):
+    """
+    Hit counts per function: [{категория: {слово: число}}, ...] в порядке functions.
+    Процессам передаются только смещения тел, исходник — один раз при старте пула.
+    """
+    spans = [(f["body_start"], f["body_end"]) for f in functions]
+    batches = [spans[i:i + CATEGORIZE_BATCH] for i in range(0, len(spans), CATEGORIZE_BATCH)]
+    if workers > 1 and len(batches) > 1:
+        with ProcessPoolExecutor(workers, initializer=init_categorizer, initargs=(js, keywords)) as pool:
+            word_hits = [h for batch in pool.map(categorize_batch, batches) for h in batch]
+    else:
+        init_categorizer(js, keywords)
+        word_hits = [h for batch in batches for h in categorize_batch(batch)]
+
+    categories = compile_keywords(keywords)[1]
+    results = []
+    for hits in word_hits:
+        by_cat = {}
+        for w, n in hits.items():
+            for cat in categories[w]:
+                by_cat.setdefault(cat, {})[w] = n
+        results.append(by_cat)
+    return results
+
 
 # ------------------------------------------------------
-# API extraction
+# Cache: результаты категоризации по нормализованному хешу тела. После нового restore
+# заново сканируются только функции, чьи тела изменились
 # ------------------------------------------------------
-print("[4] Extracting API requests...")
+def keywords_fingerprint(keywords):
+    return hashlib.sha256(json.dumps(keywords, sort_keys=True).encode("utf-8")).hexdigest()
 
-API_PATTERNS = {
-    "fetch": r'fetch\s*\((.*?)\)',
-    "xhr": r'new\s+XMLHttpRequest\s*\(',
-    "axios": r'axios\.(get|post|put|delete)\s*\((.*?)\)',
-    "urls": r'https?://[^\s\'")]+'
-}
 
-api_results = {k: [] for k in API_PATTERNS}
-api_results["fetch"] = re.findall(API_PATTERNS["fetch"], js, re.DOTALL)
-api_results["axios"] = re.findall(API_PATTERNS["axios"], js, re.DOTALL)
-api_results["xhr"] = re.findall(API_PATTERNS["xhr"], js)
-api_results["urls"] = re.findall(API_PATTERNS["urls"], js)
+def load_cache(path, fingerprint):
+    try:
+        with open(path, encoding="utf8") as f:
+            cache = json.load(f)
+    except FileNotFoundError:
+        return {"keywords": fingerprint, "results": {}, "last": None}
+    if cache.get("keywords") != fingerprint:
+        # другие ключевые слова — старые совпадения недействительны, diff остаётся
+        cache["keywords"] = fingerprint
+        cache["results"] = {}
+    return cache
+
+
+def save_cache(path, cache, js, functions, results):
+    # только хеши текущей версии, иначе кэш растёт с каждым restore
+    cache["results"] = {f["hash"]: r for f, r in zip(functions, results)}
+    cache["last"] = {
+        "sha256": hashlib.sha256(js.encode("utf-8", "surrogatepass")).hexdigest(),
+        "categories": {cat: [[f["name"], f["hash"]] for f, r in zip(functions, results) if cat in r]
+                       for cat in {cat for r in results for cat in r}},
+    }
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf8") as f:
+        json.dump(cache, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp, path)
+
+
+def categorize_cached(js, functions, keywords, workers, cache):
+    """categorize() только для тел, которых нет в кэше; (результаты, сколько тел сканировалось)."""
+    known = cache["results"]
+    todo = {}
+    for f in functions:
+        if f["hash"] not in known and f["hash"] not in todo:
+            todo[f["hash"]] = f
+    fresh = dict(zip(todo, categorize(js, list(todo.values()), keywords, workers)))
+    return [known[f["hash"]] if f["hash"] in known else fresh[f["hash"]] for f in functions], len(todo)
+
+
+def diff_categories(last, functions, results):
+    """
+    added/removed/changed по категориям относительно прошлого запуска. Функция — пара
+    (имя, хеш тела); изменённой считается именованная функция, у которой в категории
+    исчез старый хеш и появился новый.
+    """
+    old_categories = last["categories"] if last else {}
+    new_categories = {}
+    for f, r in zip(functions, results):
+        for cat in r:
+            new_categories.setdefault(cat, {}).setdefault((f["name"], f["hash"]), f["id"])
+    diff = {}
+    for cat in sorted(set(old_categories) | set(new_categories)):
+        old = {(name, h) for name, h in old_categories.get(cat, ())}
+        new = new_categories.get(cat, {})
+        removed = sorted(key for key in old if key not in new)
+        old_by_name = {}
+        for name, h in removed:
+            if name != "<anonymous>":
+                old_by_name.setdefault(name, []).append(h)
+        added, changed, matched = [], [], set()
+        for name, h in new:
+            if (name, h) in old:
+                continue
+            hashes = old_by_name.get(name)
+            if hashes:
+                old_hash = hashes.pop()
+                matched.add((name, old_hash))
+                changed.append({"id": new[(name, h)], "name": name, "old_hash": old_hash, "hash": h})
+            else:
+                added.append((name, h))
+        removed = [key for key in removed if key not in matched]
+        if added or removed or changed:
+            diff[cat] = {
+                "added": [{"id": new[key], "name": key[0], "hash": key[1]} for key in added],
+                "removed": [{"name": name, "hash": h} for name, h in removed],
+                "changed": changed,
+            }
+    return diff
+
+
+def category_stats(keywords, results):
+    stats = {cat: {"functions": 0, "hits": 0, "keywords": {w.lower(): 0 for w in words}}
+             for cat, words in keywords.items()}
+    for by_cat in results:
+        for cat, hits in by_cat.items():
+            stats[cat]["functions"] += 1
+            for w, n in hits.items():
+                stats[cat]["hits"] += n
+                stats[cat]["keywords"][w] += n
+    return stats
+
 
 # ------------------------------------------------------
-# Save JSON
+# API extraction: fetch / XMLHttpRequest.open / axios-подобные клиенты / WebSocket,
+# Centrifugo subscribe — из того же прохода jsscan.scan, URL собраны из констант
 # ------------------------------------------------------
-output = {
-    "function_categories": category_hits,
-    "api_requests": api_results,
-    "total_functions": len(functions)
-}
+def summarize_api(calls, urls):
+    endpoints = {}
+    for c in calls:
+        key = (c["kind"], c["method"], c["url"])
+        e = endpoints.get(key)
+        if e is None:
+            e = endpoints[key] = {"kind": c["kind"], "method": c["method"], "url": c["url"],
+                                  "resolved": c["resolved"], "calls": 0, "functions": []}
+        e["calls"] += 1
+        if c["function"] is not None and c["function"] not in e["functions"]:
+            e["functions"].append(c["function"])
+    return {
+        "endpoints": sorted(endpoints.values(), key=lambda e: (e["kind"], e["url"], e["method"] or "")),
+        "calls": calls,
+        "urls": sorted(set(urls)),
+    }
+
+
+# ------------------------------------------------------
+# Output
+# ------------------------------------------------------
+def write_json(path, js, functions, results, stats, api_results):
+    """Прежний формат: в каждой категории полные тела функций."""
+    category_hits = {k: [] for k in stats}
+    for func, by_cat in zip(functions, results):
+        for cat, hits in by_cat.items():
+            entry = {k: v for k, v in func.items() if k not in ("body_start", "body_end")}
+            entry["body"] = js[func["body_start"]:func["body_end"]].strip()
+            entry["hits"] = hits
+            category_hits[cat].append(entry)
+    output = {
+        "function_categories": category_hits,
+        "category_stats": stats,
+        "api_requests": api_results,
+        "total_functions": len(functions)
+    }
+    with open(path, "w", encoding="utf8") as f:
+        json.dump(output, f, indent=4, ensure_ascii=False)
+
+
+def write_ndjson(path, js, source, functions, results, stats, api_results):
+    """
+    Компактный формат, по записи JSON на строку, пишется потоком:
+      {"type": "meta", ...}
+      {"type": "function", "id", "name", "kind", "params", "start", "end", "body_start", "body_end",
+       "depth", "parent", "hash"}  — каждая функция один раз; тело — срез исходника по смещениям
+      {"type": "category", "name", "functions", "hits", "keywords", "members": [[id, {слово: число}], ...]}
+      {"type": "endpoint", ...}, {"type": "call", ...}, {"type": "url", "url"}
+    Размер растёт с числом функций, а не с телами × категории.
+    """
+    members = {cat: [] for cat in stats}
+    with open(path, "w", encoding="utf8") as f:
+        def emit(record):
+            f.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+
+        emit({"type": "meta", "source": source, "length": len(js),
+              "sha256": hashlib.sha256(js.encode("utf-8", "surrogatepass")).hexdigest(),
+              "total_functions": len(functions), "categories": list(stats)})
+        for func, by_cat in zip(functions, results):
+            emit({"type": "function", **func})
+            for cat, hits in by_cat.items():
+                members[cat].append([func["id"], hits])
+        for cat, s in stats.items():
+            emit({"type": "category", "name": cat, **s, "members": members[cat]})
+        for e in api_results["endpoints"]:
+            emit({"type": "endpoint", **e})
+        for c in api_results["calls"]:
+            emit({"type": "call", **c})
+        for url in api_results["urls"]:
+            emit({"type": "url", "url": url})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analyze restored.js: functions, categories, API requests")
+    parser.add_argument("--input", help="Local restored.js instead of downloading --url")
+    parser.add_argument("--url", default=GIST_RAW_URL)
+    parser.add_argument("--keywords", help="Keyword categories file (JSON or 'category: word, word' lines)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Processes for categorization (default: CPU count)")
+    parser.add_argument("--format", choices=["json", "ndjson"], default="json",
+                        help="json: full bodies per category (legacy); ndjson: each function once, streamed")
+    parser.add_argument("--output", help=f"Output file (default: {OUTPUT_FILE} / {NDJSON_FILE})")
+    parser.add_argument("--cache", default=CACHE_FILE, help="Per-function results cache between runs")
+    parser.add_argument("--no-cache", action="store_true", help="Analyze every function, do not read or write the cache")
+    parser.add_argument("--diff", default=DIFF_FILE, help="Per-category diff against the previous cached run")
+    parser.add_argument("--graph", default=callgraph.GRAPH_FILE,
+                        help="Call graph (and webpack module graph) index, query with callgraph.py")
+    parser.add_argument("--no-graph", action="store_true", help="Do not build the call graph")
+    args = parser.parse_args()
+
+    keywords = load_keywords(args.keywords) if args.keywords else KEYWORDS
+    js = read_js(args.input) if args.input else download_js(args.url)
+    source = args.input or args.url
+
+    print("[2] Extracting all functions...")
+    found, calls, urls, refs = scan(js, api=True, graph=not args.no_graph)
+    functions = extract_function_bodies(js, found)
+    print(f"[OK] Found {len(functions)} functions.")
+
+    print("[3] Categorizing functions by keywords inside body...")
+    if args.no_cache:
+        cache = None
+        results = categorize(js, functions, keywords, args.workers)
+    else:
+        cache = load_cache(args.cache, keywords_fingerprint(keywords))
+        results, scanned = categorize_cached(js, functions, keywords, args.workers, cache)
+        print(f"[OK] {scanned} new function bodies scanned, {len(functions) - scanned} results from cache")
+    stats = category_stats(keywords, results)
+    for cat, s in stats.items():
+        print(f"[OK] {cat}: {s['functions']} functions, {s['hits']} hits")
+
+    print("[4] Extracting API requests...")
+    api_results = summarize_api(calls, urls)
+    print(f"[OK] {len(calls)} call sites, {len(api_results['endpoints'])} endpoints, {len(api_results['urls'])} URLs")
+
+    # ------------------------------------------------------
+    # Save
+    # ------------------------------------------------------
+    if args.format == "ndjson":
+        output = args.output or NDJSON_FILE
+        write_ndjson(output, js, source, functions, results, stats, api_results)
+    else:
+        output = args.output or OUTPUT_FILE
+        write_json(output, js, functions, results, stats, api_results)
+
+    if not args.no_graph:
+        print("[5] Building call graph...")
+        header, arrays = callgraph.build(js, found, calls, refs, source)
+        callgraph.save(args.graph, header, arrays)
+        print(f"[OK] {len(arrays['calls'])} call edges, {len(arrays['module_ids'])} modules, "
+              f"{len(arrays['requires'])} module requires. Saved to {args.graph}")
+
+    if cache is not None:
+        print("[6] Comparing with the previous run...")
+        diff = diff_categories(cache["last"], functions, results)
+        with open(args.diff, "w", encoding="utf8") as f:
+            json.dump({"previous": cache["last"] and cache["last"]["sha256"],
+                       "current": hashlib.sha256(js.encode("utf-8", "surrogatepass")).hexdigest(),
+                       "categories": diff}, f, indent=1, ensure_ascii=False)
+        for cat, d in diff.items():
+            print(f"[OK] {cat}: +{len(d['added'])} -{len(d['removed'])} ~{len(d['changed'])}")
+        save_cache(args.cache, cache, js, functions, results)
+        print(f"[OK] Diff saved to {args.diff}, cache to {args.cache}")
+
+    print(f"[FINAL] Analysis complete. Saved to {output}")
 
-with open(OUTPUT_FILE, "w", encoding="utf8") as f:
-    json.dump(output, f, indent=4, ensure_ascii=False)
 
-print(f"[FINAL] Analysis complete. Saved to {OUTPUT_FILE}")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,33 @@
 import os
 import re
+import io
 import json
+import gzip
+import heapq
+import hashlib
+import tempfile
+import argparse
+import itertools
+import posixpath
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 import zipfile
 import subprocess
 import shutil
 import gdown
 
+from body_store import REF_RE, BodyStore, StoreStats, body_ref
+from timeline_blocks import BlockWriter
+from timeline_db import PLACEHOLDERS, TimelineIndex, exchange_meta
+
 ZIP_FILE = "http.zip"
 BASE_DIR = "http"
 OUTPUT_DIR = "History"
 OUTPUT_FILE = os.path.join(OUTPUT_DIR, "timeline1.txt")
+INDEX_FILE = os.path.join(OUTPUT_DIR, "timeline1.sqlite")
+# --ingest: sha256 уже влитых архивов
+STATE_FILE = os.path.join(OUTPUT_DIR, "ingested.json")
 
 # ТВОЙ GOOGLE DRIVE ID
 GDRIVE_ID = "10ClYKixNN2B-k0RFX_3IcNKDvzoEqCXI"
@@ -17,6 +35,16 @@ GDRIVE_ID = "10ClYKixNN2B-k0RFX_3IcNKDvzoEqCXI"
 JUNK_EXT = {".css", ".html", ".jpg", ".jpeg", ".png", ".webp", ".bin"}
 
 TIMESTAMP_RE = re.compile(r"(\d{4}-\d{2}-\d{2}_\d{2}-\d{2}-\d{2}-\d+)")
+RECORD_RE = re.compile(rb"^===== (\d{4}-\d{2}-\d{2}_[\d-]+) \| ")
+URL_RE = re.compile(r"URL:\s+(.+)")
+
+# порядок секций внутри блока (и внутри одного timestamp при сортировке)
+ENTRY_ORDER = {"REQUEST": 0, "RESPONSE": 1, "BODY": 2}
+COPY_CHUNK = 1 << 16
+
+# --workers: сколько файлов/блоков отдаётся одной задаче пула и сколько задач в полёте на процесс
+TASK_BATCH = 64
+TASKS_PER_WORKER = 4
 
 
 # ANSI цвета
@@ -103,62 +131,556 @@ def read_file(path):
         return "(unreadable)"
 
 
-def parse_json_body(path):
+def parse_entry(timestamp, ftype, path):
+    """Чтение и разбор одного файла: (timestamp, ftype, содержимое секции, url, размер)."""
+    content = read_file(path)
+    url_match = URL_RE.search(content)
+    url = url_match.group(1).strip() if url_match else "UNKNOWN"
+    if ftype == "BODY" and path.endswith(".json") and content != "(unreadable)":
+        if not content.startswith(("{", "[")):
+            content = "(binary or unknown)"
     try:
-        with open(path, "r", encoding="utf-8", errors="ignore") as f:
-            t = f.read().strip()
-            if t.startswith("{") or t.startswith("["):
-                return t
-            return "(binary or unknown)"
-    except:
-        return "(unreadable)"
+        size = os.path.getsize(path)
+    except OSError:
+        size = 0
+    return timestamp, ftype, content, url, size
+
+
+def parse_entries(batch):
+    return [parse_entry(*item) for item in batch]
+
+
+def batched(iterable, n):
+    it = iter(iterable)
+    while True:
+        batch = list(itertools.islice(it, n))
+        if not batch:
+            return
+        yield batch
+
+
+def ordered_map(fn, batches, workers, initializer=None, initargs=()):
+    """
+    fn(batch) для каждого батча, результаты строго в исходном порядке. При workers > 1
+    батчи разбираются в пуле процессов; в полёте не больше workers * TASKS_PER_WORKER
+    задач, поэтому память не растёт с размером захвата.
+    """
+    if workers <= 1:
+        if initializer:
+            initializer(*initargs)
+        for batch in batches:
+            yield fn(batch)
+        return
+    with ProcessPoolExecutor(workers, initializer=initializer, initargs=initargs) as pool:
+        pending = deque()
+        for batch in batches:
+            pending.append(pool.submit(fn, batch))
+            if len(pending) >= workers * TASKS_PER_WORKER:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def print_throughput(files, size, started, blocks):
+    elapsed = max(time.perf_counter() - started, 1e-9)
+    print(BLUE + f"[STAT] Файлов: {files}, блоков: {blocks}, {size / 1e6:.1f} MB за {elapsed:.2f} с "
+                 f"→ {files / elapsed:.0f} файлов/с, {size / 1e6 / elapsed:.2f} MB/s" + RESET)
+
+
+class TimelineWriter:
+    """
+    Пишет timeline в бинарный файл и считает байтовые смещения секций — из них
+    строится индекс timeline1.sqlite (см. timeline_db.py). Текст тот же, что и раньше;
+    с хранилищем тел (body_store.py) вместо тела пишется ссылка sha256:<hash>.
+    """
+
+    def __init__(self, out, pos=0, store=None):
+        self.out = out
+        self.pos = pos
+        self.store = store
+
+    def write(self, text):
+        data = text.encode("utf-8")
+        self.out.write(data)
+        offset = self.pos
+        self.pos += len(data)
+        return offset, len(data)
+
+    def mark(self, timestamp):
+        # BlockWriter режет сжатые блоки только на границах записей
+        if hasattr(self.out, "mark"):
+            self.out.mark(timestamp)
+
+    def block(self, timestamp, url, request=None, response=None):
+        """Заголовок блока и секции REQUEST/RESPONSE; возвращает запись для индекса."""
+        self.mark(timestamp)
+        rec = {"ts": timestamp, "url": url, "block_offset": self.pos}
+        rec.update(exchange_meta(url, request, response))
+        self.write(f"===== {timestamp} | {url} =====\n")
+        for key, name, text in (("req", "REQUEST", request), ("resp", "RESPONSE", response)):
+            if text:
+                self.write(f"\n[{name}]\n")
+                rec[key + "_offset"], rec[key + "_len"] = self.write(text)
+                self.write("\n")
+        return rec
+
+    def body(self, rec, chunks, hashed=True):
+        """Секция [BODY] из кусков текста; sha256 считается по ходу записи."""
+        self.write("\n[BODY]\n")
+        if hashed and self.store:
+            rec["body_hash"], rec["body_size"], rec["body_written"] = self.store.put(chunks)
+            rec["body_offset"], rec["body_len"] = self.write(body_ref(rec["body_hash"], rec["body_size"]))
+            self.write("\n\n")
+            return
+        digest = hashlib.sha256() if hashed else None
+        start = self.pos
+        for chunk in chunks:
+            data = chunk.encode("utf-8")
+            self.out.write(data)
+            self.pos += len(data)
+            if digest:
+                digest.update(data)
+        rec["body_offset"], rec["body_len"] = start, self.pos - start
+        rec["body_hash"] = digest.hexdigest() if digest else None
+        self.write("\n\n")
+
+    def extend(self, data, records):
+        """Дописывает блоки, отрисованные в другом процессе с нуля, сдвигая их смещения."""
+        base = self.pos
+        starts = [rec["block_offset"] for rec in records] + [len(data)]
+        for rec, start, end in zip(records, starts, starts[1:]):
+            self.mark(rec["ts"])
+            self.out.write(data[start:end])
+        self.pos += len(data)
+        for rec in records:
+            for key in ("block_offset", "req_offset", "resp_offset", "body_offset"):
+                if rec.get(key) is not None:
+                    rec[key] += base
+        return records
+
+
+def open_output(output, compress):
+    """Обычный timeline1.txt или, с --blocks, блочно-сжатый timeline1.txt.gz (timeline_blocks.py)."""
+    if compress:
+        return BlockWriter(output + ".gz")
+    return open(output, "wb")
+
+
+def open_index(output, out, enabled, store=None):
+    if not enabled:
+        return None
+    # индекс один и тот же для обоих форматов: смещения — в несжатом тексте
+    return TimelineIndex(os.path.splitext(output)[0] + ".sqlite", getattr(out, "path", None) or out.name,
+                         body_store=store and store.root)
+
+
+def add_record(db, stats, rec):
+    if db:
+        db.add(rec)
+    if stats and "body_written" in rec:
+        stats.add(rec["body_hash"], rec["body_size"], rec["body_written"])
+
+
+def print_store(store, stats):
+    if not store:
+        return
+    s = stats.summary()
+    stats.save(store)
+    print(BLUE + f"[STAT] Тел: {s['bodies']} ({s['bytes'] / 1e6:.1f} MB), уникальных: {s['unique']} "
+                 f"({s['unique_bytes'] / 1e6:.1f} MB), дедупликация ×{s['dedup_ratio']}, новых объектов: "
+                 f"{s['new_objects']} ({s['written_bytes'] / 1e6:.1f} MB на диске) → {store.root}" + RESET)
+
+
+def print_blocks(out):
+    if isinstance(out, BlockWriter):
+        ratio = out.raw_offset / max(os.path.getsize(out.path), 1)
+        print(BLUE + f"[STAT] Блоков gzip: {len(out.blocks)}, {out.raw_offset / 1e6:.1f} MB → "
+                     f"{os.path.getsize(out.path) / 1e6:.1f} MB (×{ratio:.1f}) → {out.path}" + RESET)
+
+
+def close_index(index, fts):
+    if index is None:
+        return
+    started = time.perf_counter()
+    count = index.close(fts=fts)
+    print(GREEN + f"[OK] Индекс → {index.path} (обменов: {count}{', FTS' if fts else ''}, "
+                  f"{time.perf_counter() - started:.2f} с)" + RESET)
 
 
-def build_timeline():
+def build_timeline(workers=1, index=True, fts=False, compress=False, body_store=None):
     print(GREEN + "[STEP] Формирование истории…" + RESET)
     os.makedirs(OUTPUT_DIR, exist_ok=True)
+    started = time.perf_counter()
 
     items = collect_files()
 
     blocks = {}
+    total = 0
 
-    for timestamp, ftype, path in items:
-        content = read_file(path)
-        url_match = re.search(r"URL:\s+(.+)", content)
-        url = url_match.group(1).strip() if url_match else "UNKNOWN"
+    for parsed in ordered_map(parse_entries, batched(items, TASK_BATCH), workers):
+        for timestamp, ftype, content, url, size in parsed:
+            total += size
 
-        if timestamp not in blocks:
-            blocks[timestamp] = {"REQUEST": None, "RESPONSE": None, "BODY": None, "url": url}
+            if timestamp not in blocks:
+                blocks[timestamp] = {"REQUEST": None, "RESPONSE": None, "BODY": None, "url": url}
 
-        if ftype == "BODY" and path.endswith(".json"):
-            blocks[timestamp]["BODY"] = parse_json_body(path)
-        else:
             blocks[timestamp][ftype] = content
-
-        blocks[timestamp]["url"] = url
+            blocks[timestamp]["url"] = url
 
     timeline = sorted(blocks.items(), key=lambda x: x[0])
 
-    with open(OUTPUT_FILE, "w", encoding="utf-8") as out:
+    store = BodyStore(body_store) if body_store else None
+    stats = StoreStats()
+    with open_output(OUTPUT_FILE, compress) as out:
+        db = open_index(OUTPUT_FILE, out, index, store)
+        writer = TimelineWriter(out, store=store)
         for timestamp, data in timeline:
-            out.write(f"===== {timestamp} | {data['url']} =====\n")
-
-            if data["REQUEST"]:
-                out.write("\n[REQUEST]\n" + data["REQUEST"] + "\n")
-
-            if data["RESPONSE"]:
-                out.write("\n[RESPONSE]\n" + data["RESPONSE"] + "\n")
+            rec = writer.block(timestamp, data["url"], data["REQUEST"], data["RESPONSE"])
 
             if data["BODY"]:
-                out.write("\n[BODY]\n" + data["BODY"] + "\n\n")
+                writer.body(rec, [data["BODY"]], hashed=data["BODY"] not in PLACEHOLDERS)
+
+            add_record(db, stats, rec)
 
     print(GREEN + f"[OK] История сформирована → {OUTPUT_FILE}" + RESET)
+    print_blocks(out)
+    print_store(store, stats)
+    close_index(db, fts)
+    print_throughput(len(items), total, started, len(timeline))
+
+
+# ---------------------------------------------------------------------------
+# Потоковый режим (--stream): читаем http.zip на месте, без распаковки.
+# В памяти только метаданные центрального каталога и текущий блок;
+# тела копируются в timeline кусками по COPY_CHUNK.
+# ---------------------------------------------------------------------------
+
+def entry_type(dirname):
+    if "requests" in dirname:
+        return "REQUEST"
+    if "responses" in dirname:
+        return "RESPONSE"
+    if "files" in dirname:
+        return "BODY"
+    return None
+
+
+def collect_zip_entries(z):
+    """(timestamp, type, ZipInfo) всех файлов захвата, только по центральному каталогу ZIP."""
+    items = []
+    junk = 0
+    for info in z.infolist():
+        if info.is_dir():
+            continue
+        dirname, fname = posixpath.split(info.filename)
+        if os.path.splitext(fname)[1].lower() in JUNK_EXT:
+            junk += 1
+            continue
+        match = TIMESTAMP_RE.search(fname)
+        ftype = entry_type(dirname)
+        if not match or not ftype:
+            continue
+        items.append((match.group(1), ftype, info))
+    items.sort(key=lambda x: (x[0], ENTRY_ORDER[x[1]]))
+    print(GREEN + f"[OK] Записей в архиве: {len(items)}, мусорных пропущено: {junk}" + RESET)
+    return items
+
+
+def open_member(z, info):
+    return io.TextIOWrapper(z.open(info), encoding="utf-8", errors="ignore")
+
+
+def read_member(z, info):
+    try:
+        with open_member(z, info) as f:
+            return f.read().strip()
+    except Exception:
+        return "(unreadable)"
 
 
-def git_push():
+def stripped_chunks(f):
+    """Содержимое файла кусками по COPY_CHUNK с тем же strip(), что у read_member."""
+    head = ""
+    while not head:
+        chunk = f.read(COPY_CHUNK)
+        if not chunk:
+            return
+        head = chunk.lstrip()
+    # хвостовые пробелы придерживаются, пока не станет ясно, что это не конец файла
+    pending = ""
+    while head:
+        data = pending + head
+        text = data.rstrip()
+        if text:
+            yield text
+        pending = data[len(text):]
+        head = f.read(COPY_CHUNK)
+
+
+def copy_body(z, info, writer, rec):
+    """Пишет секцию [BODY] как build_timeline (strip, проверка JSON), но кусками."""
+    try:
+        with open_member(z, info) as f:
+            chunks = stripped_chunks(f)
+            first = next(chunks, None)
+            if first is None:
+                return
+            if info.filename.endswith(".json") and not first.startswith(("{", "[")):
+                writer.body(rec, ["(binary or unknown)"], hashed=False)
+                return
+            writer.body(rec, itertools.chain([first], chunks))
+    except Exception as e:
+        print(RED + f"[WARN] Не удалось прочитать {info.filename}: {e}" + RESET)
+
+
+def write_stream_block(z, writer, timestamp, group):
+    # как и в build_timeline, из нескольких файлов одного типа побеждает последний
+    latest = {ftype: info for _, ftype, info in group}
+    texts = {ftype: read_member(z, latest[ftype]) for ftype in ("REQUEST", "RESPONSE") if ftype in latest}
+
+    url = "UNKNOWN"
+    for ftype in ("REQUEST", "RESPONSE"):
+        url_match = URL_RE.search(texts.get(ftype) or "")
+        if url_match:
+            url = url_match.group(1).strip()
+            break
+
+    rec = writer.block(timestamp, url, texts.get("REQUEST"), texts.get("RESPONSE"))
+    if "BODY" in latest:
+        copy_body(z, latest["BODY"], writer, rec)
+    return rec
+
+
+# ZIP и хранилище тел, открытые в процессе пула (у каждого процесса свой дескриптор)
+_zip = None
+_store = None
+
+
+def open_worker_zip(zip_path, body_store=None):
+    global _zip, _store
+    _zip = zipfile.ZipFile(zip_path, "r")
+    _store = BodyStore(body_store) if body_store else None
+
+
+def render_stream_blocks(batch):
+    """
+    Блоки timeline для батча [(timestamp, [(ftype, имя члена ZIP)])]:
+    (байты, записи индекса со смещениями от начала батча).
+    """
+    buf = io.BytesIO()
+    writer = TimelineWriter(buf, store=_store)
+    records = []
+    for timestamp, members in batch:
+        group = [(timestamp, ftype, _zip.getinfo(name)) for ftype, name in members]
+        records.append(write_stream_block(_zip, writer, timestamp, group))
+    return buf.getvalue(), records
+
+
+def build_timeline_stream(zip_path=ZIP_FILE, output=OUTPUT_FILE, workers=1, index=True, fts=False,
+                          compress=False, body_store=None):
+    print(GREEN + "[STEP] Потоковое формирование истории из ZIP…" + RESET)
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    started = time.perf_counter()
+
+    with zipfile.ZipFile(zip_path, "r") as z:
+        items = collect_zip_entries(z)
+    size = sum(info.file_size for _, _, info in items)
+    # записи отсортированы, поэтому блок готов, как только меняется timestamp
+    groups = ((timestamp, [(ftype, info.filename) for _, ftype, info in group])
+              for timestamp, group in itertools.groupby(items, key=lambda x: x[0]))
+
+    count = 0
+    store = BodyStore(body_store) if body_store else None
+    stats = StoreStats()
+    with open_output(output, compress) as out:
+        db = open_index(output, out, index, store)
+        writer = TimelineWriter(out, store=store)
+        if workers <= 1:
+            with zipfile.ZipFile(zip_path, "r") as z:
+                for timestamp, members in groups:
+                    rec = write_stream_block(z, writer, timestamp, [(timestamp, f, z.getinfo(n)) for f, n in members])
+                    count += 1
+                    add_record(db, stats, rec)
+        else:
+            batches = batched(groups, TASK_BATCH)
+            worker_args = (zip_path, body_store)
+            for data, records in ordered_map(render_stream_blocks, batches, workers, open_worker_zip, worker_args):
+                writer.extend(data, records)
+                count += len(records)
+                for rec in records:
+                    add_record(db, stats, rec)
+
+    print(GREEN + f"[OK] История сформирована → {output} (блоков: {count})" + RESET)
+    print_blocks(out)
+    print_store(store, stats)
+    close_index(db, fts)
+    print_throughput(len(items), size, started, count)
+
+
+# ---------------------------------------------------------------------------
+# Слияние нескольких захватов (--ingest a.zip b.zip …). Каждый новый архив
+# разбирается в свой отсортированный timeline (параллельно, по процессу на архив),
+# затем k-way merge вместе с уже существующим timeline; одинаковые обмены
+# (тот же timestamp и тот же текст блока) пишутся один раз. Архив узнаётся
+# по sha256 и при повторном запуске пропускается.
+# ---------------------------------------------------------------------------
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_state():
+    if not os.path.exists(STATE_FILE):
+        return {}
+    with open(STATE_FILE, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_state(state):
+    tmp = STATE_FILE + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=1, ensure_ascii=False)
+    os.replace(tmp, STATE_FILE)
+
+
+def ingest_archives(batch):
+    for zip_path, run_path, body_store in batch:
+        build_timeline_stream(zip_path, run_path, workers=1, index=False, body_store=body_store)
+    return [run_path for _, run_path, _ in batch]
+
+
+def iter_records(path, source=0):
+    """(timestamp, source, байты блока) из готового timeline — обычного или блочного .gz."""
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rb") as f:
+        timestamp, buf = "", []
+        for line in f:
+            match = RECORD_RE.match(line)
+            if match:
+                if buf:
+                    yield timestamp, source, b"".join(buf)
+                timestamp, buf = match.group(1).decode(), []
+            buf.append(line)
+        if buf:
+            yield timestamp, source, b"".join(buf)
+
+
+def parse_record(timestamp, data):
+    """Запись индекса для готового блока timeline (смещения от начала блока)."""
+    header_end = data.find(b"\n") + 1
+    url = data[len(f"===== {timestamp} | "):header_end - len(" =====\n")].decode("utf-8", errors="ignore")
+    rec = {"ts": timestamp, "url": url, "block_offset": 0}
+    texts = {}
+    pos = header_end
+    sections = (("req", b"\n[REQUEST]\n", (b"\n\n[RESPONSE]\n", b"\n\n[BODY]\n")),
+                ("resp", b"\n[RESPONSE]\n", (b"\n\n[BODY]\n",)))
+    for key, marker, ends in sections:
+        if data.startswith(marker, pos):
+            start = pos + len(marker)
+            found = [i for i in (data.find(end, start) for end in ends) if i >= 0]
+            end = min(found) if found else len(data) - 1
+            rec[key + "_offset"], rec[key + "_len"] = start, end - start
+            texts[key] = data[start:end].decode("utf-8", errors="ignore")
+            pos = end + 1
+    if data.startswith(b"\n[BODY]\n", pos):
+        start = pos + len(b"\n[BODY]\n")
+        body = data[start:len(data) - 2]
+        rec["body_offset"], rec["body_len"] = start, len(body)
+        text = body.decode("utf-8", errors="ignore")
+        ref = REF_RE.match(text)
+        if ref:
+            rec["body_hash"] = ref.group(1)
+        elif text not in PLACEHOLDERS:
+            rec["body_hash"] = hashlib.sha256(body).hexdigest()
+    rec.update(exchange_meta(url, texts.get("req"), texts.get("resp")))
+    return rec
+
+
+def ingest(archives, workers=1, index=True, fts=False, compress=False, body_store=None):
+    print(GREEN + f"[STEP] Слияние захватов: {len(archives)} архивов…" + RESET)
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    started = time.perf_counter()
+
+    state = load_state()
+    todo = {}
+    for path in archives:
+        digest = file_sha256(path)
+        if digest in state or digest in todo:
+            print(YELLOW + f"[INFO] {path} уже влит ({digest[:12]}…), пропуск" + RESET)
+            continue
+        todo[digest] = path
+    if not todo:
+        print(GREEN + "[OK] Новых архивов нет" + RESET)
+        return False
+
+    output = OUTPUT_FILE + ".gz" if compress else OUTPUT_FILE
+    runs_dir = tempfile.mkdtemp(prefix="ingest_", dir=OUTPUT_DIR)
+    previous = None
+    try:
+        jobs = [(path, os.path.join(runs_dir, f"run{i}.txt"), body_store) for i, path in enumerate(todo.values())]
+        runs = [run for done in ordered_map(ingest_archives, ([job] for job in jobs), min(workers, len(jobs)))
+                for run in done]
+
+        # старый timeline — такой же отсортированный вход слияния; на время записи он уезжает в runs_dir
+        sources = list(runs)
+        if os.path.exists(output):
+            previous = os.path.join(runs_dir, "previous" + os.path.splitext(output)[1])
+            os.replace(output, previous)
+            sources.insert(0, previous)
+
+        counts = [0] * len(sources)
+        written = duplicates = 0
+        current, seen = None, set()
+        store = BodyStore(body_store) if body_store else None
+        merged = heapq.merge(*[iter_records(path, source) for source, path in enumerate(sources)],
+                             key=lambda r: r[0])
+        with open_output(OUTPUT_FILE, compress) as out:
+            db = open_index(OUTPUT_FILE, out, index, store)
+            writer = TimelineWriter(out)
+            for timestamp, source, data in merged:
+                counts[source] += 1
+                if timestamp != current:
+                    current, seen = timestamp, set()
+                digest = hashlib.sha1(data).digest()
+                if digest in seen:
+                    duplicates += 1
+                    continue
+                seen.add(digest)
+                for rec in writer.extend(data, [parse_record(timestamp, data)]):
+                    add_record(db, None, rec)
+                written += 1
+    except BaseException:
+        if previous:
+            os.replace(previous, output)
+        raise
+    finally:
+        shutil.rmtree(runs_dir, ignore_errors=True)
+
+    print(GREEN + f"[OK] История сформирована → {output} (блоков: {written}, дубликатов: {duplicates})" + RESET)
+    print_blocks(out)
+    close_index(db, fts)
+    # состояние пишется последним: если до него не дошло, повторный запуск просто схлопнет дубликаты
+    for (digest, path), count in zip(todo.items(), counts[-len(todo):]):
+        state[digest] = {"archive": os.path.basename(path), "exchanges": count, "ingested": time.time()}
+    save_state(state)
+    print(BLUE + f"[STAT] Влито архивов: {len(todo)}, было блоков: {counts[0] if previous else 0}, "
+                 f"за {time.perf_counter() - started:.2f} с" + RESET)
+    return True
+
+
+def git_push(compress=False):
     print(GREEN + "[STEP] Публикация в GitHub обычным способом…" + RESET)
 
-    subprocess.run(["git", "add", OUTPUT_FILE])
+    if compress:
+        subprocess.run(["git", "add", OUTPUT_FILE + ".gz", OUTPUT_FILE + ".gz.idx.json"])
+    else:
+        subprocess.run(["git", "add", OUTPUT_FILE])
+    if os.path.exists(STATE_FILE):
+        subprocess.run(["git", "add", STATE_FILE])
     subprocess.run(["git", "commit", "-m", "Add processed timeline"])
     subprocess.run(["git", "push"])
 
@@ -167,9 +689,37 @@ def git_push():
 
 
 if __name__ == "__main__":
-    download_zip()
-    unzip_if_needed()
-    cleanup_junk()
-    build_timeline()
-    git_push()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--stream", action="store_true",
+                        help="Читать записи прямо из ZIP, без распаковки и cleanup_junk")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Процессов для чтения/разбора файлов (1 = последовательно)")
+    parser.add_argument("--no-index", action="store_true",
+                        help=f"Не строить индекс {INDEX_FILE} (см. timeline_db.py)")
+    parser.add_argument("--fts", action="store_true",
+                        help="Добавить в индекс полнотекстовый поиск по телам (timeline_db.py --contains)")
+    parser.add_argument("--blocks", action="store_true",
+                        help="Писать timeline1.txt.gz из независимых gzip-блоков с индексом (timeline_blocks.py)")
+    parser.add_argument("--body-store", metavar="DIR",
+                        help="Хранить тела один раз в DIR (body_store.py), в timeline — ссылка sha256")
+    parser.add_argument("--ingest", nargs="+", metavar="ZIP",
+                        help=f"Влить локальные архивы в существующий timeline (уже влитые — см. {STATE_FILE})")
+    args = parser.parse_args()
+
+    changed = True
+    if args.ingest:
+        changed = ingest(args.ingest, workers=args.workers, index=not args.no_index, fts=args.fts,
+                         compress=args.blocks, body_store=args.body_store)
+    elif args.stream:
+        download_zip()
+        build_timeline_stream(workers=args.workers, index=not args.no_index, fts=args.fts, compress=args.blocks,
+                              body_store=args.body_store)
+    else:
+        download_zip()
+        unzip_if_needed()
+        cleanup_junk()
+        build_timeline(workers=args.workers, index=not args.no_index, fts=args.fts, compress=args.blocks,
+                       body_store=args.body_store)
+    if changed:
+        git_push(args.blocks)
     print(BLUE + "[DONE] Процесс полностью завершён" + RESET)
\ No newline at end of file
@@ -0,0 +1,634 @@
+"""
+jsscan.py
+
+Однопроходный разбор JavaScript для f.py. Токенизатор на одном регулярном выражении
+знает строки, комментарии, regex-литералы и template literals (с вложенными ${...}),
+поэтому скобки внутри них не сбивают подсчёт. Поверх токенов за один проход
+находятся все функции: объявления, function-выражения, стрелочные функции и методы
+объектов/классов — с точными смещениями, без повторного сканирования вложенных тел,
+т.е. O(размера исходника).
+
+Функция — словарь:
+    id, name, kind ("function" | "arrow" | "method"), start, end (весь текст функции),
+    body_start, body_end (внутри фигурных скобок или выражение краткой стрелки),
+    params, depth (число объемлющих функций), parent (id объемлющей или None)
+
+scan(src, api=True) в том же проходе находит вызовы API: fetch/$fetch, XMLHttpRequest
+.open, axios-подобные клиенты (.get/.post/... и axios({url})), new WebSocket/Centrifuge
+и subscribe/newSubscription каналов. Аргументы сворачиваются из строковых литералов,
+конкатенаций, template literals и строковых констант файла в шаблон
+("/api/user/{id}"); к вызову прикладывается объемлющая функция. Это не AST:
+константы ищутся по присваиваниям без учёта областей видимости.
+
+  python3 jsscan.py restored.js [--list]
+"""
+
+
+import argparse
+import ast
+import re
+import time
+
+# пробелы и комментарии перед токеном съедаются тем же совпадением
+TOKEN_RE = re.compile(r"""
+    \s*(?:(?://[^\n]*|/\*[\s\S]*?(?:\*/|\Z))\s*)*
+    (?:(?P<name>[A-Za-z_$\u0080-\uffff\\][\w$\u0080-\uffff\\]*|\#[A-Za-z_$][\w$]*)
+     | (?P<num>0[xXoObB][\da-fA-F_]+n?|(?:\d[\d_]*\.?[\d_]*|\.\d[\d_]*)(?:[eE][+-]?\d+)?n?)
+     | (?P<str>"[^"\\\n]*(?:\\[\s\S][^"\\\n]*)*"|'[^'\\\n]*(?:\\[\s\S][^'\\\n]*)*')
+     | (?P<punct>>>>=|\.\.\.|===|!==|\*\*=|<<=|>>=|>>>|\?\?=|&&=|\|\|=|=>|==|!=|<=|>=|&&|\|\||\?\?|\?\.(?!\d)
+         |\+\+|--|\+=|-=|\*=|/=|%=|&=|\|=|\^=|\*\*|<<|>>|[{}()\[\];,<>+\-*/%&|^!~?:=.@`]))
+""", re.X)
+REGEX_RE = re.compile(r"/(?:[^/\\\[\n]+|\\.|\[(?:[^\]\\\n]|\\.)*\])+/[A-Za-z]*")
+TEMPLATE_RE = re.compile(r"[^`\\$]*(?:(?:\\[\s\S]|\$(?!\{))[^`\\$]*)*(?:`|\$\{|\Z)")
+
+# после этих слов "/" начинает regex-литерал, а не деление
+KEYWORDS_BEFORE_EXPR = {"return", "typeof", "instanceof", "in", "of", "new", "delete", "void", "throw",
+                        "case", "do", "else", "yield", "await"}
+# "name (...) {" — метод, если name не из этого списка
+NOT_METHODS = {"if", "for", "while", "switch", "catch", "with", "function", "extends"}
+METHOD_PREFIX = {"async", "get", "set", "static", "*"}
+# ключевое слово инструкции на той же глубине скобок завершает краткую стрелку (ASI в неминифицированном коде),
+# в том числе продолжение инструкции: if (x) f = () => 1 \n else ..., case/default в switch
+STATEMENT_KEYWORDS = {"var", "let", "const", "if", "for", "while", "do", "return", "switch", "try", "throw",
+                      "break", "continue", "export", "else", "catch", "finally", "case", "default"}
+# "?", ":" тернарного оператора и цель присваивания перед ним — для имён функций в ветвях
+TERNARY_PUNCT = {"?", ":", "=", ",", ";"}
+
+# вызовы API (scan(src, api=True))
+FETCH_CALLEES = {"fetch", "$fetch", "ofetch", "useFetch", "useLazyFetch"}
+FETCH_OWNERS = {"window", "self", "globalThis"}
+HTTP_VERBS = {"get", "post", "put", "delete", "patch", "head", "options"}
+# клиент.get(...) считается запросом всегда; для прочих объектов — только если URL похож на адрес
+KNOWN_CLIENTS = {"axios", "$axios", "$http", "http", "$api", "api", "client", "$fetch", "ofetch"}
+SOCKET_CLASSES = {"WebSocket", "Centrifuge", "SockJS", "EventSource", "ReconnectingWebSocket"}
+SUBSCRIBE_METHODS = {"subscribe", "newSubscription"}
+# name( с такими name — не вызов (scan(src, graph=True))
+NOT_CALLS = NOT_METHODS | KEYWORDS_BEFORE_EXPR | {"super", "import"}
+MAX_CONSTANT = 2000   # длиннее — точно не строковая константа
+MAX_PLACEHOLDER = 40  # нерезолвленное выражение длиннее заменяется на {}
+URL_RE = re.compile(r"(?:https?|wss?)://[^\s'\"`)$\\]+")
+
+
+def tokenize(src):
+    """
+    (kind, start, end, value) для каждого значимого токена; value — текст для имён
+    и пунктуации, для остальных None (текст — срез src). Template literal приходит
+    как "template" (без подстановок) или "template_head", "template_middle",
+    "template_tail" вокруг выражений ${...}.
+    """
+    pos = 0
+    n = len(src)
+    braces = []  # "{" или "${" — отличает "}" подстановки от закрытия блока
+    last = None
+    last_kind = None
+    match = TOKEN_RE.match
+    while pos < n:
+        m = match(src, pos)
+        if m is None:
+            # хвостовые пробелы/комментарии или одиночный символ (незакрытая строка)
+            pos += 1
+            continue
+        kind = m.lastgroup
+        start = m.start(kind)
+        end = m.end()
+        value = m.group(kind) if kind in ("name", "punct") else None
+        if kind == "punct":
+            if value[0] == "/" and (last_kind is None or last_kind in ("template_head", "template_middle")
+                                    or (last_kind == "punct" and last not in (")", "]", "}"))
+                                    or (last_kind == "name" and last in KEYWORDS_BEFORE_EXPR)):
+                rm = REGEX_RE.match(src, start)
+                if rm:
+                    yield "regex", start, rm.end(), None
+                    last, last_kind = None, "regex"
+                    pos = rm.end()
+                    continue
+            elif value == "`" or (value == "}" and braces and braces[-1] == "${"):
+                head = value == "`"
+                if not head:
+                    braces.pop()
+                end = TEMPLATE_RE.match(src, end).end()
+                opens = src.endswith("${", start, end)
+                if head:
+                    kind = "template_head" if opens else "template"
+                else:
+                    kind = "template_middle" if opens else "template_tail"
+                if opens:
+                    braces.append("${")
+                yield kind, start, end, None
+                last, last_kind = None, kind
+                pos = end
+                continue
+            elif value == "{":
+                braces.append("{")
+            elif value == "}" and braces:
+                braces.pop()
+        yield kind, start, end, value
+        last, last_kind = value, kind
+        pos = end
+
+
+def _name_from(src, before):
+    """Имя function-выражения по токенам перед ним: `x = function`, `x: () =>`, `"x": ...`."""
+    if len(before) >= 2 and before[-1][3] in ("=", ":"):
+        kind, start, end, value = before[-2]
+        if kind == "name":
+            return value
+        if kind == "str":
+            return src[start + 1:end - 1]
+        if kind == "num":
+            return src[start:end]
+    return None
+
+
+def _with_prefix(start, before):
+    """Начало метода с учётом модификаторов async/get/set/static/*."""
+    i = len(before)
+    while i and before[i - 1][3] in METHOD_PREFIX:
+        i -= 1
+        start = before[i][1]
+    return start
+
+
+def extract_functions(src):
+    """Все функции src в порядке начала; поля — в описании модуля."""
+    return scan(src)[0]
+
+
+def scan(src, api=False, graph=False):
+    """
+    (функции, вызовы API, абсолютные URL из строковых литералов, ссылки) за один проход
+    токенов. Без api вызовы и URL — пустые списки. С graph ссылки — все вызовы name(...)
+    и obj.name(...): (id вызывающей функции или -1, имя — ".name" для obj.name, смещение "(");
+    без graph — три пустых списка.
+    """
+    funcs = []
+    fstack = []        # открытые функции, внутренняя последней
+    stack = []         # открытые скобки: [char, func] или [char, None, start, токены перед, вычисляемый ключ]
+    prev = []          # последние значимые токены
+    closed = None      # группа "(" / "[", закрытая предыдущим токеном: (char, start, end, before, key)
+    arrow_wait = None  # стрелка, тело которой начинается со следующего токена
+    concise = []       # открытые краткие стрелки: [func, глубина скобок, число незакрытых "?"]
+    ternary = {}       # глубина скобок → [незакрытые "?", токены "x =" / "x:", смещение ":" тернарного]
+    calls = []         # места вызовов API: аргументы пока только смещениями, значения — после прохода
+    captures = []      # открытые вызовы: (глубина скобок внутри вызова, запись)
+    assigns = []       # открытые присваивания name = ...: [глубина, name, начало значения]
+    values = {}        # name → смещения присвоенных выражений (для свёртки строковых констант)
+    urls = []
+    ref_callers, ref_names, ref_pos = [], [], []
+
+    def new_func(kind, name, start, params):
+        f = {"id": None, "name": name or "<anonymous>", "kind": kind, "start": start, "end": None,
+             "body_start": None, "body_end": None, "params": params,
+             "depth": len(fstack), "parent": fstack[-1] if fstack else None}
+        funcs.append(f)
+        return f
+
+    def name_of(before):
+        """Имя по токенам перед функцией; ветви "c ? f : g" получают цель присваивания."""
+        if before:
+            entry = ternary.get(len(stack))
+            if before[-1][3] == "?" or (entry and before[-1][1] == entry[2]):
+                return _name_from(src, entry[1]) if entry and entry[1] else None
+        return _name_from(src, before)
+
+    def close_concise(end, ternary=False):
+        depth = len(stack)
+        while concise and concise[-1][1] == depth:
+            if ternary and concise[-1][2]:
+                concise[-1][2] -= 1
+                return
+            f = concise.pop()[0]
+            f["end"] = f["body_end"] = end
+            fstack.pop()
+
+    for tok in tokenize(src):
+        kind, start, end, value = tok
+        last_closed, closed = closed, None
+
+        if arrow_wait is not None:
+            f, arrow_wait = arrow_wait, None
+            fstack.append(f)
+            if value == "{":
+                f["body_start"] = end
+                stack.append(["{", f])
+                prev.append(tok)
+                continue
+            f["body_start"] = start
+            concise.append([f, len(stack), 0])
+
+        # p.catch(...), x.default — свойства, а не ключевые слова
+        statement = kind == "name" and value in STATEMENT_KEYWORDS and not (prev and prev[-1][3] in (".", "?."))
+        if concise and concise[-1][1] == len(stack):
+            if value in (",", ";", ")", "]", "}") or kind in ("template_middle", "template_tail") or statement:
+                close_concise(prev[-1][2])
+            elif value == ":":
+                close_concise(prev[-1][2], ternary=True)
+            elif value == "?":
+                concise[-1][2] += 1
+
+        if api:
+            depth = len(stack)
+            if captures and captures[-1][0] == depth:
+                rec = captures[-1][1]
+                if value in (",", ")"):
+                    if rec["arg_start"] is not None:
+                        rec["args"].append((rec["arg_start"], prev[-1][2]))
+                        rec["arg_start"] = None
+                    if value == ")":
+                        captures.pop()
+                elif rec["arg_start"] is None:
+                    rec["arg_start"] = start
+            if assigns and assigns[-1][0] == depth and (value in (",", ";", ")", "]", "}") or statement):
+                while assigns and assigns[-1][0] == depth:
+                    _, name, value_start = assigns.pop()
+                    if value_start is not None and prev[-1][2] - value_start <= MAX_CONSTANT:
+                        values.setdefault(name, []).append((value_start, prev[-1][2]))
+            if assigns and assigns[-1][2] is None:
+                assigns[-1][2] = start
+            if kind == "str" or kind.startswith("template"):
+                if src.find("://", start, end) != -1:
+                    urls.extend(URL_RE.findall(src, start, end))
+            elif value == "=" and prev and prev[-1][0] == "name" and (len(prev) < 2 or prev[-2][3] not in (".", "?.")):
+                assigns.append([depth, prev[-1][3], None])
+
+        if kind == "punct":
+            if value == "(":
+                key = last_closed if last_closed and last_closed[0] == "[" else None
+                ref = None
+                if graph and prev and prev[-1][0] == "name" and prev[-1][3] not in NOT_CALLS:
+                    p2 = prev[-2][3] if len(prev) > 1 else None
+                    if p2 != "function" and not (p2 == "*" and len(prev) > 2 and prev[-3][3] == "function"):
+                        ref = len(ref_names)
+                        ref_callers.append(fstack[-1] if fstack else None)
+                        ref_names.append("." + prev[-1][3] if p2 in (".", "?.") else prev[-1][3])
+                        ref_pos.append(start)
+                stack.append(["(", None, start, prev[-5:], key, ref])
+                site = api and prev and _call_site(prev)
+                if site:
+                    rec = {"kind": site[0], "callee": site[1], "offset": site[2], "args": [], "arg_start": None,
+                           "function": fstack[-1] if fstack else None}
+                    calls.append(rec)
+                    captures.append((len(stack), rec))
+            elif value == "[":
+                stack.append(["[", None, start, prev[-5:], None, None])
+            elif value == "{":
+                func = None
+                if last_closed and last_closed[0] == "(":
+                    func = _function_at(src, last_closed, new_func, name_of)
+                    if func and last_closed[5] is not None:
+                        # name(...) { — заголовок метода, а не вызов
+                        ref_names[last_closed[5]] = None
+                    if func:
+                        func["body_start"] = end
+                        fstack.append(func)
+                stack.append(["{", func])
+            elif value in (")", "]", "}"):
+                ternary.pop(len(stack), None)
+                frame = stack.pop() if stack else None
+                if frame and frame[0] == "{" and frame[1] is not None:
+                    f = frame[1]
+                    f["end"] = end
+                    f["body_end"] = start
+                    fstack.pop()
+                elif frame and frame[0] in ("(", "["):
+                    closed = (frame[0], frame[2], end, frame[3], frame[4], frame[5])
+            elif value == "=>":
+                p1 = prev[-1] if prev else None
+                if p1 and p1[3] == ")" and last_closed:
+                    _, a_start, close_end, before = last_closed[:4]
+                    if last_closed[5] is not None:
+                        # async (...) => — не вызов async
+                        ref_names[last_closed[5]] = None
+                    params = src[a_start + 1:close_end - 1].strip()
+                elif p1 and p1[0] == "name":
+                    a_start, params, before = p1[1], p1[3], prev[-6:-1]
+                else:
+                    a_start, params, before = start, "", prev[-5:]
+                if before and before[-1][3] == "async":
+                    a_start = before[-1][1]
+                    before = before[:-1]
+                arrow_wait = new_func("arrow", name_of(before), a_start, params)
+            elif value in TERNARY_PUNCT:
+                depth = len(stack)
+                entry = ternary.get(depth)
+                if value == "?":
+                    if entry is None:
+                        entry = ternary[depth] = [0, None, None]
+                    entry[0] += 1
+                elif value == ":" and entry and entry[0]:
+                    entry[0] -= 1
+                    entry[2] = start
+                elif value in (",", ";"):
+                    if entry:
+                        del ternary[depth]
+                elif prev:
+                    # x = ..., x: ... — имя функций в ветвях тернарного оператора справа
+                    if entry is None:
+                        ternary[depth] = [0, (prev[-1], tok), None]
+                    else:
+                        entry[1] = (prev[-1], tok)
+        elif kind == "template_head":
+            stack.append(["${", None])
+        elif kind == "template_middle":
+            ternary.pop(len(stack), None)
+        elif kind == "template_tail" and stack and stack[-1][0] == "${":
+            ternary.pop(len(stack), None)
+            stack.pop()
+
+        prev.append(tok)
+        if len(prev) > 64:
+            del prev[:-8]
+
+    # оборванный исходник: всё незакрытое заканчивается в конце текста
+    for f in funcs:
+        if f["end"] is None:
+            f["end"] = f["body_end"] = prev[-1][2] if prev else len(src)
+            if f["body_start"] is None:
+                f["body_start"] = f["end"]
+    funcs.sort(key=lambda f: f["start"])
+    for i, f in enumerate(funcs):
+        f["id"] = i
+    for f in funcs:
+        f["parent"] = f["parent"]["id"] if f["parent"] else None
+    refs = ([f["id"] if f else -1 for f in ref_callers], ref_names, ref_pos)
+    if not api:
+        return funcs, [], [], refs
+    constants = _Constants(src, values)
+    return funcs, [c for c in (_finish_call(src, rec, constants) for rec in calls) if c], urls, refs
+
+
+def _callee(prev):
+    """Текст вызываемого выражения из цепочки name.name.name перед "(" (до 4 звеньев)."""
+    i = len(prev) - 1
+    parts = [prev[i][3]]
+    while i >= 2 and len(parts) < 4 and prev[i - 1][3] in (".", "?.") and prev[i - 2][0] == "name":
+        i -= 2
+        parts.append(prev[i][3])
+    return ".".join(reversed(parts)), prev[i][1]
+
+
+def _call_site(prev):
+    """(kind, callee, offset) для вызова, который может быть запросом; иначе None."""
+    p1 = prev[-1]
+    if p1[0] != "name":
+        return None
+    member = len(prev) > 1 and prev[-2][3] in (".", "?.")
+    name = p1[3]
+    if name in FETCH_CALLEES and (not member or prev[-3][3] in FETCH_OWNERS):
+        callee, offset = _callee(prev)
+        return "fetch", callee, offset
+    if not member:
+        if name in ("axios", "$axios"):
+            return "client", name, p1[1]
+        if name in SOCKET_CLASSES and len(prev) > 1 and prev[-2][3] == "new":
+            return "websocket", name, prev[-2][1]
+        return None
+    if name in HTTP_VERBS or name == "request":
+        callee, offset = _callee(prev)
+        return "client", callee, offset
+    if name == "open":
+        callee, offset = _callee(prev)
+        return "xhr", callee, offset
+    if name in SUBSCRIBE_METHODS:
+        callee, offset = _callee(prev)
+        return "subscribe", callee, offset
+    return None
+
+
+class _Constants:
+    """
+    Строковые константы по присваиваниям name = "..." во всём файле. Области видимости
+    не различаются: имя с разными значениями (частое в минифицированном коде) не резолвится.
+    """
+
+    def __init__(self, src, values):
+        self.src = src
+        self.values = values
+        self.cache = {}
+
+    def get(self, name, depth):
+        if name in self.cache:
+            return self.cache[name]
+        self.cache[name] = None  # защита от циклов a = b + "x"; b = a
+        spans = self.values.get(name, ())
+        texts = {self.src[a:b] for a, b in spans}
+        value = None
+        if len(texts) == 1 and depth < 8:
+            value, literal = resolve_string(texts.pop(), self, depth + 1)
+            if not literal:
+                value = None
+        self.cache[name] = value
+        return value
+
+
+def _split_top(tokens, sep):
+    """Токены, разрезанные по sep вне скобок и подстановок шаблонов."""
+    parts, current, depth = [], [], 0
+    for tok in tokens:
+        kind, value = tok[0], tok[3]
+        if value in ("(", "[", "{") or kind == "template_head":
+            depth += 1
+        elif value in (")", "]", "}") or kind == "template_tail":
+            depth -= 1
+        if depth == 0 and value == sep:
+            parts.append(current)
+            current = []
+        else:
+            current.append(tok)
+    parts.append(current)
+    return parts
+
+
+def _single_template(tokens):
+    """Токены — ровно один template literal с подстановками (`a${x}b`, но не `a${x}`.length)."""
+    level = 0
+    for i, tok in enumerate(tokens):
+        if tok[0] == "template_head":
+            level += 1
+        elif tok[0] == "template_tail":
+            level -= 1
+            if level == 0:
+                return i == len(tokens) - 1
+    return False
+
+
+def _unquote(text):
+    try:
+        return ast.literal_eval(text)
+    except (ValueError, SyntaxError):
+        return text[1:-1]
+
+
+def resolve_string(text, constants=None, depth=0):
+    """
+    Шаблон строки из JS-выражения: литералы и конкатенации сворачиваются,
+    template literal сохраняет текст, подстановки и неизвестные части — {выражение}.
+    ("/api/user/" + id + "/info" → "/api/user/{id}/info"). Возвращает (шаблон, полностью ли литерал).
+    """
+    out = []
+    literal = True
+    for operand in _split_top(list(tokenize(text)), "+"):
+        if not operand:
+            continue
+        first, last = operand[0], operand[-1]
+        kind = first[0]
+        if len(operand) == 1 and kind == "str":
+            out.append(_unquote(text[first[1]:first[2]]))
+        elif len(operand) == 1 and kind == "template":
+            out.append(text[first[1] + 1:first[2] - 1])
+        elif kind == "template_head" and _single_template(operand):
+            # куски шаблона верхнего уровня и подстановки между ними
+            level = 0
+            piece_end = None
+            for tok in operand:
+                if tok[0] in ("template_head", "template_middle", "template_tail"):
+                    top = (tok[0] == "template_head" and level == 0) or (tok[0] != "template_head" and level == 1)
+                    if top and piece_end is not None:
+                        sub, sub_literal = resolve_string(text[piece_end:tok[1]], constants, depth + 1)
+                        out.append(sub if sub_literal else "{" + sub.strip("{}") + "}")
+                        literal = literal and sub_literal
+                    if top:
+                        tail = 1 if tok[0] == "template_tail" else 2
+                        out.append(text[tok[1] + 1:tok[2] - tail])
+                        piece_end = tok[2]
+                    if tok[0] == "template_head":
+                        level += 1
+                    elif tok[0] == "template_tail":
+                        level -= 1
+        elif len(operand) == 1 and kind == "name" and constants is not None \
+                and constants.get(first[3], depth) is not None:
+            out.append(constants.get(first[3], depth))
+        else:
+            literal = False
+            expr = " ".join(text[first[1]:last[2]].split())
+            out.append("{" + (expr if len(expr) <= MAX_PLACEHOLDER else "") + "}")
+    return "".join(out), literal
+
+
+def _object_field(text, key):
+    """Текст значения поля key объектного литерала верхнего уровня ({url: ..., method: ...})."""
+    tokens = list(tokenize(text))
+    if not tokens or tokens[0][3] != "{":
+        return None
+    for field in _split_top(tokens[1:-1], ","):
+        if len(field) > 2 and field[0][0] in ("name", "str") and field[1][3] == ":" \
+                and text[field[0][1]:field[0][2]].strip("'\"") == key:
+            return text[field[2][1]:field[-1][2]]
+    return None
+
+
+def _looks_like_endpoint(url):
+    return url.startswith(("/", "http:", "https:", "ws:", "wss:", "{")) and "/" in url
+
+
+def _finish_call(src, rec, constants):
+    """Запись вызова с вычисленными URL и методом; None, если это не запрос."""
+    args = [src[a:b] for a, b in rec["args"]]
+    kind, callee = rec["kind"], rec["callee"]
+    method = None
+    url_text = args[0] if args else None
+    options = args[1] if len(args) > 1 else None
+    name = callee.rsplit(".", 1)[-1]
+    owner = callee.rsplit(".", 2)[-2] if "." in callee else None
+
+    if kind == "xhr":
+        if len(args) < 2:
+            return None
+        verb, literal = resolve_string(args[0], constants)
+        if not literal or verb.lower() not in HTTP_VERBS:
+            return None
+        method, url_text, options = verb.upper(), args[1], None
+    elif kind == "client" and name in HTTP_VERBS:
+        method = name.upper()
+    elif kind == "client" and url_text and url_text.lstrip().startswith("{"):
+        # axios({url, method}) / client.request({url, method})
+        options = url_text
+        url_text = _object_field(url_text, "url")
+    if options and method is None:
+        field = _object_field(options, "method")
+        if field is not None:
+            verb, literal = resolve_string(field, constants)
+            method = verb.upper() if literal else verb
+    if kind in ("fetch", "client") and method is None:
+        method = "GET"
+
+    if url_text is None:
+        return None
+    url, literal = resolve_string(url_text, constants)
+    if kind == "subscribe" and (literal is False and not url.strip("{}") or url.startswith("{")):
+        # subscribe(callback) у RxJS и т.п. — не канал
+        return None
+    if kind == "client" and owner not in KNOWN_CLIENTS and callee not in ("axios", "$axios") \
+            and not _looks_like_endpoint(url):
+        return None
+    func = rec["function"]
+    return {
+        "kind": kind,
+        "callee": callee,
+        "method": method,
+        "url": url,
+        "resolved": literal,
+        "offset": rec["offset"],
+        "function": func["id"] if func else None,
+        "function_start": func["start"] if func else None,
+    }
+
+
+def _function_at(src, paren, new_func, name_of):
+    """
+    Функция или метод, чьи параметры — скобочная группа прямо перед "{";
+    None для if/for/while/... и вызовов. name_of — имя function-выражения по токенам перед ним.
+    """
+    _, open_pos, close_end, before, key = paren[:5]
+    params = src[open_pos + 1:close_end - 1].strip()
+    if not before:
+        return None
+    # function [*] [name] (
+    i = len(before) - 1
+    name = None
+    if before[i][0] == "name" and before[i][3] != "function":
+        name = before[i][3]
+        i -= 1
+    if i >= 0 and before[i][3] == "*":
+        i -= 1
+    if i >= 0 and before[i][3] == "function" and not (i and before[i - 1][3] in (".", "?.")):
+        fn_start = before[i][1]
+        if i and before[i - 1][3] == "async":
+            i -= 1
+            fn_start = before[i][1]
+        return new_func("function", name or name_of(before[:i]), fn_start, params)
+    # method: key (...) {
+    last = before[-1]
+    if len(before) > 1 and before[-2][3] in (".", "?."):
+        return None
+    if last[0] == "name" and last[3] not in NOT_METHODS and not (last[3] == "await" and before[-2:-1]
+                                                                  and before[-2][3] == "for"):
+        return new_func("method", last[3], _with_prefix(last[1], before[:-1]), params)
+    if last[0] in ("str", "num"):
+        name = src[last[1] + 1:last[2] - 1] if last[0] == "str" else src[last[1]:last[2]]
+        return new_func("method", name, _with_prefix(last[1], before[:-1]), params)
+    if last[3] == "]" and key:
+        return new_func("method", "<computed>", _with_prefix(key[1], key[3]), params)
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Функции JavaScript-файла (см. f.py)")
+    parser.add_argument("path")
+    parser.add_argument("--list", action="store_true", help="Печатать каждую функцию")
+    args = parser.parse_args()
+
+    with open(args.path, encoding="utf-8", errors="replace") as f:
+        src = f.read()
+    started = time.perf_counter()
+    funcs = extract_functions(src)
+    elapsed = time.perf_counter() - started
+    if args.list:
+        for f in funcs:
+            print(f"{f['start']:>9} {f['end']:>9} {'  ' * f['depth']}{f['kind']} {f['name']}({f['params'][:60]})")
+    print(f"[OK] {len(funcs)} functions in {len(src)} chars, max depth "
+          f"{max((f['depth'] for f in funcs), default=0)}, {elapsed:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
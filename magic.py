@@ -9,10 +9,24 @@ Designed for GitHub Codespaces (Python coordinator + embedded Node helper script
 
 Usage:
   python3 magic_restore.py [--source <url_or_local_path>] [--out restored.js] [--workdir tmp_work] [--commit]
+                           [--no-cache] [--cache-dir DIR] [--cache-max-mb N] [--no-worker] [--pipeline]
+                           [--webpack] [--jobs N] [--module-store DIR] [--baseline-manifest PATH] [--profile]
 
 Notes:
  - If --source is omitted, script downloads the default JS file from the repo.
  - All Node dependencies are installed automatically if missing.
+ - Passes run inside one long-lived node worker (tools/worker.js) unless --no-worker is given.
+   The worker keeps one Chromium warm for the runtime dump; pages settle on network idle and
+   DOM quiescence (10s ceiling). `node tools/run_puppeteer.js --batch <outdir> <src>...` dumps
+   several scripts in parallel pages of one browser.
+ - --pipeline parses the file once and prints it once instead of beautify/dearr/rename/prettier.
+ - --webpack splits a webpack module map and restores the modules in --jobs parallel node workers.
+   Modules unchanged since the previous bundle are reused; the change report is written next to --out.
+ - Minified local bindings are renamed per scope; the old -> new name map is written next to --out
+   as <out>.renames.json.
+ - --profile records wall/CPU time, peak RSS, bytes in/out and cache hits per pass into
+   <out>.profile.json and a Chrome trace-event file <out>.trace.json (see restore_profile.py).
+ - Pass outputs are cached by input hash (see restore_cache.py); use --no-cache to force a full run.
 """
 
 import argparse
@@ -20,26 +34,46 @@ import os
 import sys
 import shutil
 import subprocess
+import time
+import queue
+import re
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import urllib.request
 import json
 
+from restore_cache import PassCache, ModuleStore, DEFAULT_CACHE_DIR, diff_manifests, hash_script, sha256_file
+from restore_profile import Profiler, child_usage
+
 ROOT = Path.cwd()
 TOOLS = ROOT / "tools"
 WORK = ROOT / "magic_restore_work"
 LOG_PREFIX = "[magic_restore]"
 
+WEBPACK_PLACEHOLDER = "__WEBPACK_MODULES__"
+WEBPACK_WRAP_RE = re.compile(r"^\s*var\s+__webpack_module__\s*=\s*")
+WEBPACK_BATCH_BYTES = 512 * 1024
+
+# enabled by --profile; spans are no-ops otherwise
+PROFILER = Profiler(enabled=False)
+
 DEFAULT_SOURCE_URL = "https://raw.githubusercontent.com/Hikita1337/Anal/refs/heads/main/2025-12-09_09-42-51-297323.js"
 
 def log(msg):
     print(f"{LOG_PREFIX} {msg}", flush=True)
 
-def run(cmd, cwd=None, env=None, check=True):
+def run(cmd, cwd=None, env=None, check=True, usage=None):
+    """Run cmd streaming its output; CPU time and peak RSS of the child go into `usage` if given."""
     log("RUN: " + " ".join(cmd))
     p = subprocess.Popen(cmd, cwd=cwd, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1)
     for line in p.stdout:
         print(line.rstrip())
-    p.wait()
+    if usage is not None and hasattr(os, "wait4"):
+        _, status, ru = os.wait4(p.pid, 0)
+        p.returncode = os.waitstatus_to_exitcode(status)
+        usage.update(child_usage(ru))
+    else:
+        p.wait()
     if check and p.returncode != 0:
         raise RuntimeError(f"Command failed (exit {p.returncode}): {' '.join(cmd)}")
     return p.returncode
@@ -54,171 +88,1088 @@ def write_tools():
 const fs = require('fs');
 const child = require('child_process');
 const path = require('path');
-const [,, src, outdir] = process.argv;
-if(!src || !outdir) { console.error("Usage: node run_beautify.js src outdir"); process.exit(2); }
-const srcContent = fs.readFileSync(src,'utf8');
-const bname = path.basename(src);
-const out1 = path.join(outdir, bname + ".beautified.js");
-try {
-  child.execSync(`npx --yes js-beautify "${src}" -o "${out1}" --indent-size 2`, {stdio:'inherit'});
-} catch(e) {
-  const naive = srcContent.replace(/;/g, ';\n').replace(/\{/g,'{\n').replace(/\}/g,'}\n');
-  fs.writeFileSync(out1, naive, 'utf8');
-}
-const out2 = path.join(outdir, bname + ".prettier.js");
-try {
-  child.execSync(`npx --yes prettier --parser babel --write "${out1}"`, {stdio:'inherit'});
-  fs.copyFileSync(out1, out2);
-} catch(e) {
-  fs.copyFileSync(out1, out2);
-}
-console.log("Beautify outputs:", out1, out2);
+
+function tryRequire(name) {
+  try { return require(name); } catch(e) { return null; }
+}
+
+// js-beautify/prettier are loaded once per process; npx is only a fallback when they are not installed.
+const jsBeautify = tryRequire('js-beautify');
+const prettier = tryRequire('prettier');
+
+function formatFile(file) {
+  if(prettier) {
+    fs.writeFileSync(file, prettier.format(fs.readFileSync(file,'utf8'), {parser:'babel'}), 'utf8');
+  } else {
+    child.execSync(`npx --yes prettier --parser babel --write "${file}"`, {stdio:'inherit'});
+  }
+}
+
+function beautify(src, outdir) {
+  const srcContent = fs.readFileSync(src,'utf8');
+  const bname = path.basename(src);
+  const out1 = path.join(outdir, bname + ".beautified.js");
+  try {
+    if(jsBeautify) fs.writeFileSync(out1, jsBeautify.js(srcContent, {indent_size: 2}), 'utf8');
+    else child.execSync(`npx --yes js-beautify "${src}" -o "${out1}" --indent-size 2`, {stdio:'inherit'});
+  } catch(e) {
+    const naive = srcContent.replace(/;/g, ';\n').replace(/\{/g,'{\n').replace(/\}/g,'}\n');
+    fs.writeFileSync(out1, naive, 'utf8');
+  }
+  const out2 = path.join(outdir, bname + ".prettier.js");
+  try {
+    formatFile(out1);
+    fs.copyFileSync(out1, out2);
+  } catch(e) {
+    fs.copyFileSync(out1, out2);
+  }
+  console.log("Beautify outputs:", out1, out2);
+  return [out1, out2];
+}
+
+module.exports = { beautify, formatFile };
+
+if(require.main === module) {
+  const [,, src, outdir] = process.argv;
+  if(!src || !outdir) { console.error("Usage: node run_beautify.js src outdir"); process.exit(2); }
+  beautify(src, outdir);
+}
 """.lstrip())
 
     # deobf_string_array.js
     (TOOLS / "deobf_string_array.js").write_text(r"""
+// String-array decoder engine (obfuscator.io style).
+// One traversal records every string array (`var _0xa = ['..']` and the
+// `function _0xa(){var a=[..]; _0xa=function(){return a;}; return _0xa();}` form), every
+// named function that could be a decoder or a decoder wrapper, aliases (`var w = _0xdec`),
+// rotation IIFEs (`(function(arr, 0x1a2b){ ...push(...shift()) ... })(_0xa, 0x1a2b)`) and
+// every call with literal arguments. finish() groups these by array, evaluates each group's
+// own source in a vm sandbox (so rotations, base64/rc4 decoders and offsets behave exactly as
+// at runtime) and inlines every call site whose result is a string. A group's definitions
+// are removed only when every reference to them was inlined.
 const fs = require('fs');
 const path = require('path');
-const [,, src, outdir] = process.argv;
-if(!src || !outdir) throw "usage";
-const code = fs.readFileSync(src,'utf8');
-
-const arrRegex = /var\s+(_0x[a-f0-9]+)\s*=\s*\[((?:\s*'[^']*'\s*,?|\s*"[^"]*"\s*,?)+)\]\s*;/i;
-let m = code.match(arrRegex);
-let outPath = path.join(outdir, path.basename(src) + ".dearr.js");
-let out = code;
-let replaced = 0;
-if(m){
-  const varName = m[1];
-  const arrText = m[2];
-  const items = Array.from(arrText.matchAll(/'([^']*)'|"([^"]*)"/g)).map(x=> x[1] || x[2]);
-  const decoderRegex = new RegExp("(_0x[0-9a-f]+)\\s*=\\s*function\\([^)]*\\)\\s*\\{[\\s\\S]*?return\\s+"+varName+"\\s*\\[\\s*a\\s*-\\s*(0x[0-9a-f]+|\\d+)\\s*\\]", "i");
-  const dec = code.match(decoderRegex);
-  if(dec){
-    const func = dec[1];
-    const off = parseInt(dec[2], 0);
-    const callRegex = new RegExp(func + "\\(\\s*(0x[0-9a-fA-F]+|\\d+)\\s*\\)", "g");
-    out = out.replace(callRegex, (s, num) => {
-      try{
-        let idx = parseInt(num, 0) - off;
-        if(idx >= 0 && idx < items.length) { replaced++; return JSON.stringify(items[idx]); }
-      }catch(e){}
-      return s;
-    });
-    out = out.replace(arrRegex, '');
-    out = out.replace(decoderRegex, '');
+const vm = require('vm');
+const recast = require('recast');
+const { builders: b } = recast.types;
+const { transform, literalValue } = require('./ast_core.js');
+
+const MAX_CANDIDATE_CHARS = 200000;
+const MAX_DECODER_PARAMS = 5;
+const SANDBOX_TIMEOUT_MS = 5000;
+
+function isStringArray(node) {
+  return node && node.type === 'ArrayExpression' && node.elements.length > 0
+    && node.elements.every(e => typeof literalValue(e) === 'string');
+}
+
+function tooBig(node) {
+  return typeof node.start === 'number' && node.end - node.start > MAX_CANDIDATE_CHARS;
+}
+
+// `return callee(<params/literals/arithmetic>)` as the whole body
+function wrapperTarget(fn) {
+  const body = fn.body && fn.body.type === 'BlockStatement' ? fn.body.body : null;
+  const ret = body ? (body.length === 1 && body[0].type === 'ReturnStatement' && body[0].argument) : fn.body;
+  if(!ret || ret.type !== 'CallExpression' || ret.callee.type !== 'Identifier') return null;
+  const params = new Set(fn.params.map(p => p.type === 'Identifier' && p.name));
+  const pure = e => e.type === 'Identifier' ? params.has(e.name)
+    : literalValue(e) !== undefined ? true
+    : e.type === 'BinaryExpression' ? pure(e.left) && pure(e.right)
+    : e.type === 'UnaryExpression' ? pure(e.argument)
+    : false;
+  return ret.arguments.every(pure) ? ret.callee.name : null;
+}
+
+function stringArrayPass({ quiet = false } = {}) {
+  const defs = new Map();       // name -> [def]
+  const containers = [];        // stack of candidate functions / IIFEs being visited
+  const nameCount = new Map();  // every identifier occurrence, by name
+  const calls = [];
+  const rotations = [];
+
+  function addDef(name, def) {
+    if(!defs.has(name)) defs.set(name, []);
+    defs.get(name).push(def);
+  }
+  function inContainer(name) {
+    return containers.some(c => c && c.name === name);
+  }
+  function current() {
+    for(let i = containers.length - 1; i >= 0; i--) if(containers[i]) return containers[i];
+    return null;
+  }
+
+  function enterFunction(path) {
+    const node = path.node;
+    const parent = path.parent && path.parent.node;
+    let name = null, stmt = null, external = null;
+    if(node.type === 'FunctionDeclaration' && node.id) {
+      name = node.id.name; stmt = path;
+    } else if(parent && parent.type === 'VariableDeclarator' && parent.init === node && parent.id.type === 'Identifier') {
+      name = parent.id.name; stmt = path.parent; external = { [name]: 1 };
+    } else if(parent && parent.type === 'AssignmentExpression' && parent.right === node && parent.operator === '='
+              && parent.left.type === 'Identifier' && path.parent.parent.node.type === 'ExpressionStatement') {
+      name = parent.left.name; stmt = path.parent.parent; external = { [name]: 1 };
+    } else if(parent && parent.type === 'CallExpression' && parent.callee === node && parent.arguments.length >= 2
+              && parent.arguments[0].type === 'Identifier' && !tooBig(node)) {
+      // the call arguments are visited after this container is left, count them here
+      external = {};
+      for(const a of parent.arguments) if(a.type === 'Identifier') external[a.name] = (external[a.name] || 0) + 1;
+      const c = { kind: 'rotation', node, call: parent, array: parent.arguments[0].name, external, refs: new Map() };
+      let up = path.parent.parent;
+      if(up.node.type === 'UnaryExpression') up = up.parent;
+      c.stmt = up.node.type === 'ExpressionStatement' ? up : null;
+      rotations.push(c);
+      containers.push(c);
+      return;
+    }
+    // decoders reassign themselves inside their own body; that is not a second definition
+    if(!name || inContainer(name) || tooBig(node) || node.params.length > MAX_DECODER_PARAMS) {
+      containers.push(null);
+      return;
+    }
+    let arrayFn = false;
+    if(node.params.length === 0 && node.body.type === 'BlockStatement') {
+      arrayFn = node.body.body.some(s => s.type === 'VariableDeclaration' && s.declarations.some(d => isStringArray(d.init)));
+    }
+    const c = { kind: 'fn', name, node, stmt, external, arrayFn, refs: new Map() };
+    addDef(name, c);
+    containers.push(c);
   }
+
+  return {
+    name: 'string_array',
+    visitor: {
+      Function: enterFunction,
+      VariableDeclarator(path) {
+        const { id, init } = path.node;
+        if(id.type !== 'Identifier' || !init) return;
+        const top = current();
+        if(isStringArray(init)) {
+          // the table inside `function _0xa(){var a=[..]; ...}` belongs to _0xa
+          if(!(top && top.arrayFn)) addDef(id.name, { kind: 'array', name: id.name, node: init, stmt: path, external: { [id.name]: 1 } });
+        } else if(init.type === 'Identifier') {
+          addDef(id.name, { kind: 'alias', name: id.name, target: init.name, stmt: path,
+                            external: id.name === init.name ? { [id.name]: 2 } : { [id.name]: 1, [init.name]: 1 } });
+        }
+      },
+      CallExpression(path) {
+        const { callee, arguments: args } = path.node;
+        if(callee.type === 'Identifier' && args.length > 0 && args.every(a => literalValue(a) !== undefined)) {
+          calls.push({ path, callee: callee.name, container: current() });
+        }
+      },
+      Identifier(path) {
+        const name = path.node.name;
+        nameCount.set(name, (nameCount.get(name) || 0) + 1);
+        const c = current();
+        if(c) c.refs.set(name, (c.refs.get(name) || 0) + 1);
+      }
+    },
+    leave: {
+      Function() {
+        containers.pop();
+      }
+    },
+    finish() {
+      const t0 = Date.now();
+      const stats = { arrays: 0, strings: 0, rotations: 0, decoders: 0, wrappers: 0, aliases: 0,
+                      call_sites: 0, inlined: 0, failed: 0, groups: 0, groups_removed: 0, sandbox_errors: 0,
+                      timeouts: 0 };
+      const single = name => defs.get(name) && defs.get(name).length === 1 ? defs.get(name)[0] : null;
+
+      // arrays and decoders
+      const groups = new Map();   // array name -> group
+      const memberOf = new Map(); // function/alias name -> group
+      for(const [name, list] of defs) {
+        const d = single(name);
+        if(d && (d.kind === 'array' || (d.kind === 'fn' && d.arrayFn))) {
+          groups.set(name, { array: d, members: [d], names: new Set([name]), rotations: [] });
+          stats.strings += d.kind === 'array' ? d.node.elements.length : d.node.body.body
+            .filter(s => s.type === 'VariableDeclaration')
+            .reduce((n, s) => n + s.declarations.reduce((k, v) => k + (isStringArray(v.init) ? v.init.elements.length : 0), 0), 0);
+        }
+      }
+      for(const [name] of defs) {
+        const d = single(name);
+        if(!d || d.kind !== 'fn' || d.arrayFn || d.node.params.length === 0) continue;
+        const arr = Array.from(d.refs.keys()).find(r => groups.has(r) && r !== name);
+        if(arr) { d.role = 'decoder'; groups.get(arr).members.push(d); memberOf.set(name, groups.get(arr)); stats.decoders++; }
+      }
+      // wrappers and aliases, until nothing new resolves
+      for(let changed = true; changed;) {
+        changed = false;
+        for(const [name] of defs) {
+          const d = single(name);
+          if(!d || memberOf.has(name) || groups.has(name)) continue;
+          const target = d.kind === 'fn' ? wrapperTarget(d.node) : d.kind === 'alias' ? d.target : null;
+          const g = target && memberOf.get(target);
+          if(!g) continue;
+          d.role = d.kind === 'alias' ? 'alias' : 'wrapper';
+          stats[d.role === 'alias' ? 'aliases' : 'wrappers']++;
+          g.members.push(d);
+          memberOf.set(name, g);
+          changed = true;
+        }
+      }
+      for(const r of rotations) {
+        const g = groups.get(r.array);
+        if(g) { g.rotations.push(r); stats.rotations++; }
+      }
+      for(const g of groups.values()) {
+        for(const m of g.members) g.names.add(m.name);
+        if(g.members.length > 1) stats.groups++;
+      }
+      stats.arrays = groups.size;
+
+      // evaluate each group in its own sandbox, in source order: arrays, functions, rotations
+      const print = node => recast.print(node).code;
+      for(const g of groups.values()) {
+        if(g.members.length < 2) continue;
+        const src = [];
+        for(const m of g.members) {
+          if(m.kind === 'array') src.push(`var ${m.name} = ${print(m.node)};`);
+          else if(m.kind === 'alias') src.push(`var ${m.name} = ${m.target};`);
+          else if(m.node.type === 'FunctionDeclaration') src.push(print(m.node));
+          else src.push(`var ${m.name} = ${print(m.node)};`);
+        }
+        for(const r of g.rotations) src.push(print(r.call) + ';');
+        g.context = vm.createContext({
+          atob: s => Buffer.from(String(s), 'base64').toString('binary'),
+          btoa: s => Buffer.from(String(s), 'binary').toString('base64'),
+        });
+        try {
+          vm.runInContext(src.join('\n'), g.context, { timeout: SANDBOX_TIMEOUT_MS });
+        } catch(e) {
+          stats.sandbox_errors++;
+          g.context = null;
+          if(!quiet) console.error("String array sandbox failed for", g.array.name + ":", String(e && e.message || e));
+        }
+      }
+
+      // inline call sites; calls inside the group's own definitions (rotation checksums,
+      // wrappers) must stay as they are
+      const inlined = new Map();
+      const memo = new Map();
+      // decoder calls run inside the sandbox too, under the same timeout as its setup
+      const invoke = new vm.Script('globalThis[__callee].apply(null, __args)');
+      for(const call of calls) {
+        const g = memberOf.get(call.callee);
+        if(!g || (call.container && (g.members.includes(call.container) || g.rotations.includes(call.container)))) continue;
+        stats.call_sites++;
+        if(!g.context) {
+          stats.failed++;
+          continue;
+        }
+        const args = call.path.node.arguments.map(literalValue);
+        const key = call.callee + '\0' + JSON.stringify(args);
+        let value = memo.get(key);
+        if(value === undefined) {
+          try {
+            g.context.__callee = call.callee;
+            g.context.__args = args;
+            value = invoke.runInContext(g.context, { timeout: SANDBOX_TIMEOUT_MS });
+          } catch(e) {
+            value = null;
+            // a decoder that never returns (self-defending loop) is not called again
+            if(e && e.code === 'ERR_SCRIPT_EXECUTION_TIMEOUT') {
+              stats.timeouts++;
+              g.context = null;
+              if(!quiet) console.error("String array decoder timed out:", call.callee);
+            }
+          }
+          memo.set(key, value);
+        }
+        if(typeof value !== 'string') { stats.failed++; continue; }
+        call.path.replace(b.literal(value));
+        inlined.set(call.callee, (inlined.get(call.callee) || 0) + 1);
+        stats.inlined++;
+      }
+
+      // drop a group when every occurrence of its names is inside its own definitions
+      for(const g of groups.values()) {
+        if(g.members.length < 2 || !g.context) continue;
+        const owners = g.members.concat(g.rotations);
+        if(owners.some(o => !o.stmt)) continue;
+        const accounted = name => owners.reduce((n, o) =>
+          n + (o.refs ? o.refs.get(name) || 0 : 0) + (o.external ? o.external[name] || 0 : 0), 0) + (inlined.get(name) || 0);
+        if(!Array.from(g.names).every(name => nameCount.get(name) === accounted(name))) continue;
+        for(const o of owners) o.stmt.prune();
+        stats.groups_removed++;
+      }
+      stats.ms = Date.now() - t0;
+      if(!quiet) console.log("String array stats:", JSON.stringify(stats));
+      return stats;
+    }
+  };
+}
+
+function deobf(src, outdir) {
+  const code = fs.readFileSync(src,'utf8');
+  const { code: out, stats } = transform(code, [stringArrayPass()]);
+  const outPath = path.join(outdir, path.basename(src) + ".dearr.js");
+  const statsPath = path.join(outdir, path.basename(src) + ".dearr.stats.json");
+  fs.writeFileSync(outPath, out, 'utf8');
+  fs.writeFileSync(statsPath, JSON.stringify(Object.assign({ file: path.basename(src), bytes: Buffer.byteLength(code) }, stats.string_array), null, 2), 'utf8');
+  console.log("De-arr output:", outPath, "replacements:", stats.string_array.inlined);
+  return [outPath, statsPath];
+}
+
+module.exports = { deobf, stringArrayPass };
+
+if(require.main === module) {
+  const [,, src, outdir] = process.argv;
+  if(!src || !outdir) throw "usage";
+  deobf(src, outdir);
 }
-fs.writeFileSync(outPath, out, 'utf8');
-console.log("De-arr output:", outPath, "replacements:", replaced);
 """.lstrip())
 
     # ast_rename.js
     (TOOLS / "ast_rename.js").write_text(r"""
+// Scope-aware renamer. One traversal builds a symbol table per scope (function, block,
+// catch, for, class); references are resolved against it afterwards, so a minified name
+// that is reused in thousands of functions is renamed per binding, not once globally.
+// New names are unique in the whole file and never collide with an existing name, so no
+// binding can capture or shadow another one. Program-level bindings (globals shared with
+// other scripts) and scopes that can see a direct eval() or a with statement are left alone.
 const fs = require('fs');
 const path = require('path');
-const recast = require('recast');
-const { visit } = recast.types;
-const [,, src, outdir] = process.argv;
-if(!src || !outdir) throw "usage";
-const code = fs.readFileSync(src,'utf8');
-let ast = null;
-try {
-  ast = recast.parse(code, { parser: require("recast/parsers/babel") });
-} catch(e) {
-  console.error("Error parsing AST:", e);
-  ast = recast.parse(code, { parser: require("recast/parsers/acorn") });
-}
-const cand = {};
-visit(ast, {
-  visitLiteral(path) {
-    const v = path.node.value;
-    if(typeof v === 'string' && /^[A-Za-z_$][A-Za-z0-9_$-]{2,50}$/.test(v)) {
-      cand[v] = (cand[v]||0)+1;
-    }
-    this.traverse(path);
-  },
-  visitProperty(path) {
-    const key = path.node.key;
-    if(key && key.type === 'Identifier') {
-      cand[key.name] = (cand[key.name]||0)+1;
+const { transform, literalValue } = require('./ast_core.js');
+
+const MINIFIED_RE = /^(?:[A-Za-z][A-Za-z0-9_$]?|_0x[0-9a-fA-F]{3,}|[yn][0-9][a-z]e?)$/;
+const RESERVED = new Set(('break case catch class const continue debugger default delete do else enum export extends ' +
+  'false finally for function if implements import in instanceof interface let new null package private protected ' +
+  'public return static super switch this throw true try typeof var void while with yield await async of ' +
+  'arguments eval undefined NaN Infinity').split(' '));
+const PATTERNS = new Set(['ObjectPattern', 'ArrayPattern', 'RestElement']);
+const PROPERTIES = new Set(['Property', 'ObjectProperty']);
+const FUNCTIONS = new Set(['FunctionDeclaration', 'FunctionExpression', 'ArrowFunctionExpression',
+  'ObjectMethod', 'ClassMethod', 'ClassPrivateMethod']);
+const KEYED = new Set(['Property', 'ObjectProperty', 'ObjectMethod', 'ClassMethod', 'ClassPrivateMethod',
+  'MethodDefinition', 'ClassProperty', 'PropertyDefinition', 'ClassAccessorProperty']);
+const NOT_REFERENCES = new Set(['LabeledStatement', 'BreakStatement', 'ContinueStatement', 'MetaProperty',
+  'PrivateName', 'ImportSpecifier', 'ImportDefaultSpecifier', 'ImportNamespaceSpecifier',
+  'ExportDefaultSpecifier', 'ExportNamespaceSpecifier']);
+
+// Field of the parent node that holds path (list fields report the list name, not the index).
+function fieldOf(path) {
+  return Array.isArray(path.parentPath.value) ? path.parentPath.name : path.name;
+}
+
+function sanitize(hint) {
+  let name = String(hint).replace(/[^A-Za-z0-9_$]+/g, '_').replace(/^_+|_+$/g, '').slice(0, 40);
+  if(!name) return '';
+  if(/^[0-9]/.test(name)) name = '_' + name;
+  return RESERVED.has(name) ? name + '_' : name;
+}
+
+// Name suggestion for `var x = <init>`.
+function initHint(init) {
+  if(!init) return '';
+  if(init.type === 'CallExpression' && init.callee.type === 'Identifier' && init.arguments.length === 1) {
+    const arg = literalValue(init.arguments[0]);
+    if(typeof arg === 'number') return 'mod_' + arg;
+    if(typeof arg === 'string' && init.callee.name === 'require') return arg.split('/').pop().replace(/\.js$/, '');
+  }
+  if(init.type === 'NewExpression' && init.callee.type === 'Identifier' && init.callee.name.length > 2) {
+    return init.callee.name[0].toLowerCase() + init.callee.name.slice(1);
+  }
+  if(init.type === 'MemberExpression') {
+    const prop = init.computed ? literalValue(init.property) : init.property.name;
+    if(typeof prop === 'string' && prop.length > 2) return prop;
+  }
+  if(FUNCTIONS.has(init.type)) return 'fn';
+  if(init.type === 'ArrayExpression') return 'arr';
+  if(init.type === 'ObjectExpression') return 'obj';
+  return '';
+}
+
+function renamePass({ quiet = false } = {}) {
+  const t0 = Date.now();
+  const global = { parent: null, node: null, hoist: true, global: true, bindings: new Map() };
+  let current = global;
+  let scopeCount = 1;
+  const bindings = [];
+  const refs = [];
+  const names = new Set();
+  const pass = { name: 'ast_rename', renames: [] };
+
+  function push(node, hoist) {
+    current = { parent: current, node, hoist, unsafe: false, bindings: new Map() };
+    scopeCount++;
+  }
+  function pop(path) {
+    if(current.node === path.node) current = current.parent;
+  }
+  function hoistScope(scope) {
+    while(!scope.hoist) scope = scope.parent;
+    return scope;
+  }
+  // eval() and with can reach every binding of the enclosing scopes by name.
+  function markUnsafe(scope) {
+    for(; scope && !scope.unsafe; scope = scope.parent) scope.unsafe = true;
+  }
+  function declare(scope, node, kind, prop, hint) {
+    if(scope.global) return;
+    let b = scope.bindings.get(node.name);
+    if(!b) {
+      b = { name: node.name, kind, hint, scope, decl: node, occurrences: [] };
+      scope.bindings.set(node.name, b);
+      bindings.push(b);
+    } else if(!b.hint && hint) {
+      b.hint = hint;
     }
-    this.traverse(path);
-  },
-  visitClassDeclaration(path) {
-    if(path.node.id && path.node.id.name) cand[path.node.id.name] = (cand[path.node.id.name]||0)+2;
-    this.traverse(path);
-  }
-});
-const candidates = Object.entries(cand).sort((a,b)=>b[1]-a[1]).map(x=>x[0]).slice(0,500);
-console.log("Top candidate literal names:", candidates.slice(0,40));
-const shortIds = new Set();
-visit(ast, {
-  visitIdentifier(path) {
-    const n = path.node.name;
-    if(/^[a-zA-Z0-9]{1,4}$/.test(n) || /^[yn][0-9][a-z]e?$/.test(n) ) {
-      shortIds.add(n);
+    b.occurrences.push({ node, prop });
+  }
+
+  function identifier(path) {
+    const node = path.node;
+    const parent = path.parent.node;
+    const field = fieldOf(path);
+    names.add(node.name);
+    if(NOT_REFERENCES.has(parent.type)) return;
+    if(KEYED.has(parent.type) && field === 'key' && !parent.computed) return;
+    if((parent.type === 'MemberExpression' || parent.type === 'OptionalMemberExpression') && field === 'property' && !parent.computed) return;
+    if(parent.type === 'ExportSpecifier' && field === 'exported') return;
+
+    // climb out of destructuring patterns to the node that declares them
+    let p = path, prop = null;
+    for(;;) {
+      const up = p.parent.node, f = fieldOf(p);
+      if(PROPERTIES.has(up.type) && f === 'value') {
+        if(up.shorthand && !prop) prop = up;
+        if(p.parent.parent.node.type !== 'ObjectPattern') break;
+      } else if(!PATTERNS.has(up.type) && !(up.type === 'AssignmentPattern' && f === 'left')) {
+        break;
+      }
+      p = p.parent;
     }
-    this.traverse(path);
-  }
-});
-const shortList = Array.from(shortIds);
-const mapping = {};
-for(let i=0;i<shortList.length && i<candidates.length;i++){
-  mapping[shortList[i]] = candidates[i];
-}
-console.log("Mapping sample:", Object.entries(mapping).slice(0,40));
-visit(ast, {
-  visitIdentifier(path) {
-    const n = path.node.name;
-    if(mapping[n]) {
-      path.node.name = mapping[n];
+    const ctx = p.parent.node, f = fieldOf(p);
+    if(ctx.type === 'VariableDeclarator' && f === 'id') {
+      const kind = p.parent.parent.node.kind;
+      const hint = p === path ? initHint(ctx.init) : '';
+      if(kind === 'var') {
+        const target = hoistScope(current);
+        declare(target, node, kind, prop, hint);
+        // catch(e){ var e = 1 } (Annex B): the initializer assigns the catch parameter while
+        // e is hoisted to the function, one name for two bindings; neither is renamed
+        for(let s = current; s !== target; s = s.parent) {
+          const caught = s.bindings.get(node.name);
+          if(caught && caught.kind === 'catch') {
+            caught.keep = true;
+            if(target.bindings.has(node.name)) target.bindings.get(node.name).keep = true;
+          }
+        }
+      } else {
+        declare(current, node, kind, prop, hint);
+      }
+    } else if(FUNCTIONS.has(ctx.type) && f === 'params') {
+      declare(current, node, 'param', prop, '');
+    } else if(ctx.type === 'FunctionDeclaration' && f === 'id') {
+      declare(hoistScope(current.parent), node, 'function', prop, 'fn');
+    } else if(ctx.type === 'FunctionExpression' && f === 'id') {
+      declare(current, node, 'function', prop, 'fn');
+    } else if(ctx.type === 'ClassDeclaration' && f === 'id') {
+      declare(current.parent, node, 'class', prop, 'Class');
+    } else if(ctx.type === 'ClassExpression' && f === 'id') {
+      declare(current, node, 'class', prop, 'Class');
+    } else if(ctx.type === 'CatchClause' && f === 'param') {
+      declare(current, node, 'catch', prop, 'err');
+    } else {
+      // x(<number>) calls mark webpack's require parameter
+      const numCall = parent.type === 'CallExpression' && field === 'callee' && parent.arguments.length === 1 &&
+        typeof literalValue(parent.arguments[0]) === 'number';
+      if(node.name === 'eval' && parent.type === 'CallExpression' && field === 'callee') markUnsafe(current);
+      refs.push({ node, prop, scope: current, numCall });
     }
-    this.traverse(path);
   }
-});
-const out = recast.print(ast).code;
-const outPath = path.join(outdir, path.basename(src) + ".ast_renamed.js");
-fs.writeFileSync(outPath, out, 'utf8');
-console.log("AST rename written:", outPath);
+
+  const scoped = {
+    Function(path) { push(path.node, true); },
+    ClassDeclaration(path) { push(path.node, false); },
+    ClassExpression(path) { push(path.node, false); },
+    BlockStatement(path) {
+      const parent = path.parent && path.parent.node;
+      // function and catch bodies share the scope of their parameters
+      if(!parent || !(FUNCTIONS.has(parent.type) || parent.type === 'CatchClause')) push(path.node, false);
+    },
+    CatchClause(path) { push(path.node, false); },
+    ForStatement(path) { push(path.node, false); },
+    ForInStatement(path) { push(path.node, false); },
+    ForOfStatement(path) { push(path.node, false); },
+    SwitchStatement(path) { push(path.node, false); },
+  };
+  pass.visitor = Object.assign({
+    Identifier: identifier,
+    WithStatement() { markUnsafe(current); },
+  }, scoped);
+  pass.leave = {};
+  for(const type of Object.keys(scoped)) pass.leave[type] = pop;
+
+  pass.finish = function() {
+    for(const ref of refs) {
+      for(let s = ref.scope; s; s = s.parent) {
+        const b = s.bindings.get(ref.node.name);
+        if(b) {
+          b.occurrences.push(ref);
+          if(ref.numCall) b.requireCalls = (b.requireCalls || 0) + 1;
+          b.refs = (b.refs || 0) + 1;
+          break;
+        }
+      }
+    }
+    const counters = new Map();
+    function fresh(base) {
+      base = sanitize(base) || 'v';
+      if(base.length > 3 && !names.has(base)) {
+        names.add(base);
+        return base;
+      }
+      let i = counters.get(base) || 0, name;
+      do { name = base + '_' + (++i); } while(names.has(name) || RESERVED.has(name));
+      counters.set(base, i);
+      names.add(name);
+      return name;
+    }
+    let renamed = 0, occurrences = 0, skippedUnsafe = 0, skippedCatchVar = 0;
+    for(const b of bindings) {
+      if(!MINIFIED_RE.test(b.name)) continue;
+      if(b.scope.unsafe) { skippedUnsafe++; continue; }
+      if(b.keep) { skippedCatchVar++; continue; }
+      let hint = b.hint;
+      if(!hint && b.kind === 'param') hint = b.requireCalls && b.requireCalls === b.refs ? 'require' : 'arg';
+      const to = fresh(hint || 'v');
+      for(const occ of b.occurrences) {
+        if(occ.prop && occ.prop.shorthand) {
+          // {a} -> {a: v_1}; acorn shares one node between key and value
+          occ.prop.shorthand = false;
+          if(occ.prop.key === occ.node) occ.prop.key = Object.assign({}, occ.node);
+        }
+        occ.node.name = to;
+        occurrences++;
+      }
+      const loc = b.decl.loc && b.decl.loc.start;
+      pass.renames.push({ from: b.name, to, kind: b.kind, line: loc ? loc.line : null, column: loc ? loc.column : null, refs: b.refs || 0 });
+      renamed++;
+    }
+    if(!quiet) console.log("Rename sample:", pass.renames.slice(0, 20).map(r => r.from + '->' + r.to).join(' '));
+    return { scopes: scopeCount, bindings: bindings.length, renamed, occurrences, skipped_unsafe: skippedUnsafe,
+             skipped_catch_var: skippedCatchVar, ms: Date.now() - t0 };
+  };
+  return pass;
+}
+
+function writeRenames(outPath, src, renames) {
+  const mapPath = outPath.replace(/\.js$/, '') + ".renames.json";
+  fs.writeFileSync(mapPath, JSON.stringify({ source: path.basename(src), renames }, null, 1), 'utf8');
+  return mapPath;
+}
+
+function rename(src, outdir) {
+  const code = fs.readFileSync(src,'utf8');
+  const pass = renamePass();
+  const { code: out, stats } = transform(code, [pass]);
+  const outPath = path.join(outdir, path.basename(src) + ".ast_renamed.js");
+  fs.writeFileSync(outPath, out, 'utf8');
+  const mapPath = writeRenames(outPath, src, pass.renames);
+  console.log("AST rename written:", outPath, JSON.stringify(stats.ast_rename));
+  return [outPath, mapPath];
+}
+
+module.exports = { renamePass, rename, writeRenames };
+
+if(require.main === module) {
+  const [,, src, outdir] = process.argv;
+  if(!src || !outdir) throw "usage";
+  rename(src, outdir);
+}
 """.lstrip())
 
     # run_puppeteer.js
     (TOOLS / "run_puppeteer.js").write_text(r"""
+// Runtime dump of a script loaded into a blank page. One Chromium and a small set of
+// pages are kept warm in BrowserPool and reused across files (the worker keeps the
+// pool alive between requests). A page counts as settled once the network is idle and
+// the DOM has stopped mutating, bounded by a hard ceiling instead of a fixed sleep.
 const fs = require('fs');
 const path = require('path');
-const puppeteer = require('puppeteer');
-const [,, src, outdir] = process.argv;
-if(!src || !outdir) throw "usage";
-(async ()=>{
-  const browser = await puppeteer.launch({args: ['--no-sandbox','--disable-setuid-sandbox']});
-  const page = await browser.newPage();
-  const tmp = path.join(outdir, "pupp_tmp");
+
+const IDLE_MS = 500;
+const QUIET_MS = 500;
+const CEILING_MS = 10000;
+const DEFAULT_PAGES = 4;
+
+class BrowserPool {
+  constructor({ size = DEFAULT_PAGES } = {}) {
+    this.size = size;
+    this.browser = null;
+    this.launching = null;
+    this.idle = [];
+    this.busy = 0;
+    this.waiting = [];
+  }
+
+  // concurrent acquire() calls share one launch
+  launch() {
+    if(!this.launching || (this.browser && !this.browser.isConnected())) {
+      const puppeteer = require('puppeteer');
+      this.idle = [];
+      this.launching = puppeteer.launch({args: ['--no-sandbox','--disable-setuid-sandbox']})
+        .then(browser => { this.browser = browser; return browser; })
+        .catch(e => { this.launching = null; throw e; });
+    }
+    return this.launching;
+  }
+
+  async acquire() {
+    if(this.busy >= this.size) await new Promise(resolve => this.waiting.push(resolve));
+    this.busy++;
+    try {
+      const browser = await this.launch();
+      return this.idle.pop() || await browser.newPage();
+    } catch(e) {
+      this.done();
+      throw e;
+    }
+  }
+
+  async release(page, broken = false) {
+    try {
+      // navigating away stops the script's timers before the page is reused
+      if(!broken && !page.isClosed()) {
+        await page.goto('about:blank', {timeout: CEILING_MS});
+        this.idle.push(page);
+      } else if(!page.isClosed()) {
+        await page.close();
+      }
+    } catch(e) {
+      if(!page.isClosed()) await page.close().catch(() => {});
+    } finally {
+      this.done();
+    }
+  }
+
+  done() {
+    this.busy--;
+    const next = this.waiting.shift();
+    if(next) next();
+  }
+
+  async close() {
+    const launching = this.launching;
+    this.browser = null;
+    this.launching = null;
+    this.idle = [];
+    const browser = launching && await launching.catch(() => null);
+    if(browser) await browser.close();
+  }
+}
+
+let shared = null;
+function sharedPool() {
+  if(!shared) shared = new BrowserPool();
+  return shared;
+}
+
+async function closeSharedPool() {
+  if(shared) await shared.close();
+  shared = null;
+}
+
+// Resolves once no DOM mutation happened for quietMs, or at ceilingMs.
+function domQuiet(page, quietMs, ceilingMs) {
+  return page.evaluate((quietMs, ceilingMs) => new Promise(resolve => {
+    let timer;
+    const finish = () => { observer.disconnect(); clearTimeout(timer); clearTimeout(ceiling); resolve(); };
+    const observer = new MutationObserver(() => { clearTimeout(timer); timer = setTimeout(finish, quietMs); });
+    observer.observe(document, {subtree: true, childList: true, attributes: true, characterData: true});
+    timer = setTimeout(finish, quietMs);
+    const ceiling = setTimeout(finish, ceilingMs);
+  }), quietMs, ceilingMs);
+}
+
+async function settle(page, deadline) {
+  const left = Math.max(deadline - Date.now(), 0);
+  let timer;
+  const ceiling = new Promise(resolve => { timer = setTimeout(() => resolve('ceiling'), left); });
+  const quiet = Promise.all([
+    page.waitForNetworkIdle({idleTime: IDLE_MS, timeout: left}).catch(() => {}),
+    domQuiet(page, QUIET_MS, left).catch(() => {}),
+  ]).then(() => 'quiet');
+  try {
+    return await Promise.race([quiet, ceiling]);
+  } finally {
+    clearTimeout(timer);
+  }
+}
+
+async function dumpRuntime(src, outdir, { pool = sharedPool(), ceiling = CEILING_MS } = {}) {
+  const t0 = Date.now();
+  const deadline = t0 + ceiling;
+  const tmp = path.join(outdir, "pupp_tmp", path.basename(src));
   fs.mkdirSync(tmp, {recursive:true});
   fs.copyFileSync(src, path.join(tmp, "file.js"));
   const html = `<!doctype html><html><head></head><body>
-    <script src="./file.js"></script>
-  </body></html>`;
+      <script src="./file.js"></script>
+    </body></html>`;
   fs.writeFileSync(path.join(tmp, "index.html"), html, 'utf8');
-  await page.goto('file://' + path.join(tmp, "index.html"), {waitUntil:'load', timeout:0});
-  await page.waitForTimeout(1200);
-  const dump = await page.evaluate(()=>{
-    const keys = Object.keys(window).filter(k=> typeof window[k] !== 'function' && k !== 'webkitStorageInfo' && k!=='webkitIndexedDB' && k!=='performance');
-    const sample = {};
-    for(const k of keys.slice(0,400)){
+
+  const page = await pool.acquire();
+  const errors = [];
+  const onError = e => errors.push(String(e && e.message || e).split('\n')[0]);
+  page.on('pageerror', onError);
+  let broken = false;
+  try {
+    try {
+      await page.goto('file://' + path.join(tmp, "index.html"), {waitUntil:'load', timeout: ceiling});
+    } catch(e) {
+      // a script that never finishes loading still leaves a window worth dumping
+      if(!e || e.name !== 'TimeoutError') throw e;
+    }
+    const settled = await settle(page, deadline);
+    const dump = await page.evaluate(()=>{
+      const keys = Object.keys(window).filter(k=> typeof window[k] !== 'function' && k !== 'webkitStorageInfo' && k!=='webkitIndexedDB' && k!=='performance');
+      const sample = {};
+      for(const k of keys.slice(0,400)){
+        try {
+          const v = window[k];
+          if(typeof v === 'string' && v.length>3) sample[k]=v;
+          else if(Array.isArray(v) && v.length>0) sample[k]=v.slice(0,20);
+        } catch(e){}
+      }
+      return {keys: keys.slice(0,200), sample};
+    });
+    dump.errors = errors.slice(0, 50);
+    const outPath = path.join(outdir, path.basename(src) + ".runtime_dump.json");
+    fs.writeFileSync(outPath, JSON.stringify(dump, null, 2), 'utf8');
+    console.log("Runtime dump saved:", outPath, `(${settled}, ${Date.now() - t0}ms)`);
+    return [outPath];
+  } catch(e) {
+    broken = true;
+    throw e;
+  } finally {
+    page.off('pageerror', onError);
+    await pool.release(page, broken);
+  }
+}
+
+// Dumps several scripts in parallel pages of one browser; a failing script is logged
+// and skipped so it does not take the rest of the batch down.
+async function dumpBatch(srcs, outdir, { concurrency = DEFAULT_PAGES, pool = null } = {}) {
+  const own = !pool;
+  pool = pool || new BrowserPool({ size: concurrency });
+  const outputs = [];
+  let next = 0;
+  async function lane() {
+    while(next < srcs.length) {
+      const src = srcs[next++];
       try {
-        const v = window[k];
-        if(typeof v === 'string' && v.length>3) sample[k]=v;
-        else if(Array.isArray(v) && v.length>0) sample[k]=v.slice(0,20);
-      } catch(e){}
+        outputs.push(...await dumpRuntime(src, outdir, { pool }));
+      } catch(e) {
+        console.error("Runtime dump failed:", src, String(e && e.message || e).split('\n')[0]);
+      }
+    }
+  }
+  try {
+    await Promise.all(Array.from({length: Math.min(concurrency, srcs.length)}, lane));
+  } finally {
+    if(own) await pool.close();
+  }
+  return outputs;
+}
+
+module.exports = { BrowserPool, sharedPool, closeSharedPool, dumpRuntime, dumpBatch };
+
+if(require.main === module) {
+  const args = process.argv.slice(2);
+  let run;
+  if(args[0] === '--batch') {
+    // node run_puppeteer.js --batch <outdir> [--jobs N] <src>...
+    const outdir = args[1];
+    let srcs = args.slice(2), concurrency = DEFAULT_PAGES;
+    if(srcs[0] === '--jobs') { concurrency = parseInt(srcs[1], 10) || DEFAULT_PAGES; srcs = srcs.slice(2); }
+    if(!outdir || !srcs.length) throw "usage";
+    run = dumpBatch(srcs, outdir, { concurrency });
+  } else {
+    const [src, outdir] = args;
+    if(!src || !outdir) throw "usage";
+    run = dumpRuntime(src, outdir).finally(closeSharedPool);
+  }
+  run.catch(e => { console.error(e); process.exit(1); });
+}
+""".lstrip())
+
+    # ast_core.js
+    (TOOLS / "ast_core.js").write_text(r"""
+// Shared AST plumbing for the recast-based passes.
+// A pass is {name, visitor: {<NodeType>: fn(path)}, leave?: {<NodeType>: fn(path)},
+// finish(ast) -> stats}. leave handlers run after the node's children. Visitors only
+// record what they need; all tree edits happen in finish(), so several passes can share
+// one parse and one traversal (see pipeline.js).
+const recast = require('recast');
+const { visit, namedTypes: n, getSupertypeNames } = recast.types;
+
+function parse(code) {
+  try {
+    return recast.parse(code, { parser: require("recast/parsers/babel") });
+  } catch(e) {
+    console.error("Error parsing AST:", e);
+    return recast.parse(code, { parser: require("recast/parsers/acorn") });
+  }
+}
+
+// Like ast-types' own dispatch, each pass gets the handler for the most specific
+// type it defines (StringLiteral -> Literal -> Expression -> Node), once per node.
+function combine(passes) {
+  const table = new Map();
+  function pick(names, handlers, list) {
+    const hit = handlers && names.find(t => handlers[t]);
+    if(hit) list.push(handlers[hit]);
+  }
+  function handlersFor(type) {
+    let entry = table.get(type);
+    if(!entry) {
+      const names = [type].concat(getSupertypeNames(type));
+      entry = { enter: [], leave: [] };
+      for(const pass of passes) {
+        pick(names, pass.visitor, entry.enter);
+        pick(names, pass.leave, entry.leave);
+      }
+      table.set(type, entry);
+    }
+    return entry;
+  }
+  return {
+    visitNode(path) {
+      const { enter, leave } = handlersFor(path.node.type);
+      for(let i = 0; i < enter.length; i++) enter[i](path);
+      this.traverse(path);
+      for(let i = leave.length - 1; i >= 0; i--) leave[i](path);
+    }
+  };
+}
+
+function transform(code, passes, { pretty = false } = {}) {
+  const ast = parse(code);
+  visit(ast, combine(passes));
+  const stats = {};
+  for(const pass of passes) stats[pass.name] = pass.finish(ast);
+  const out = pretty ? recast.prettyPrint(ast, { tabWidth: 2 }).code : recast.print(ast).code;
+  return { code: out, stats };
+}
+
+// String/number value of a literal node for both babel and ESTree trees, else undefined.
+function literalValue(node) {
+  if(!node) return undefined;
+  if(n.StringLiteral.check(node) || n.NumericLiteral.check(node)) return node.value;
+  if(node.type === 'Literal' && (typeof node.value === 'string' || typeof node.value === 'number')) return node.value;
+  if(node.type === 'UnaryExpression' && node.operator === '-') {
+    const v = literalValue(node.argument);
+    return typeof v === 'number' ? -v : undefined;
+  }
+  return undefined;
+}
+
+module.exports = { parse, combine, transform, literalValue };
+""".lstrip())
+
+    # pipeline.js
+    (TOOLS / "pipeline.js").write_text(r"""
+// Single-parse restore: the file is parsed once, string-array inlining and renaming
+// run as one combined traversal over that tree, and the result is pretty-printed once.
+const fs = require('fs');
+const path = require('path');
+const { transform } = require('./ast_core.js');
+const { stringArrayPass } = require('./deobf_string_array.js');
+const { renamePass, writeRenames } = require('./ast_rename.js');
+
+function restoreCode(code, { quiet = false } = {}) {
+  const rename = renamePass({ quiet });
+  const result = transform(code, [stringArrayPass({ quiet }), rename], { pretty: true });
+  result.renames = rename.renames;
+  return result;
+}
+
+// Used for per-module restoring: a unit that fails to parse is passed through unchanged.
+function restoreBatch(codes) {
+  return codes.map(code => {
+    try {
+      return restoreCode(code, { quiet: true }).code;
+    } catch(e) {
+      console.error("Restore failed, keeping original:", String(e && e.message || e).split('\n')[0]);
+      return code;
     }
-    return {keys: keys.slice(0,200), sample};
   });
-  const outPath = path.join(outdir, path.basename(src) + ".runtime_dump.json");
-  fs.writeFileSync(outPath, JSON.stringify(dump, null, 2), 'utf8');
-  console.log("Runtime dump saved:", outPath);
-  await browser.close();
-})();
+}
+
+function pipeline(src, outdir) {
+  const t0 = Date.now();
+  const { code, stats, renames } = restoreCode(fs.readFileSync(src, 'utf8'));
+  const outPath = path.join(outdir, path.basename(src) + ".pipeline.js");
+  fs.writeFileSync(outPath, code, 'utf8');
+  const mapPath = writeRenames(outPath, src, renames);
+  console.log("Pipeline output:", outPath, JSON.stringify(stats), (Date.now() - t0) + "ms");
+  return [outPath, mapPath];
+}
+
+module.exports = { restoreCode, restoreBatch, pipeline };
+
+if(require.main === module) {
+  const [,, src, outdir] = process.argv;
+  if(!src || !outdir) throw "usage";
+  pipeline(src, outdir);
+}
+""".lstrip())
+
+    # webpack_split.js
+    (TOOLS / "webpack_split.js").write_text(r"""
+// Splits a webpack bundle into its module functions.
+// The module map is the largest object literal whose keys are all numeric and whose values
+// are all functions ({334:function(){...},1290:function(t,e,r){...}}), or the largest array
+// of functions (webpack 4). The rest of the bundle is returned as "shell" with the map
+// replaced by PLACEHOLDER; each module is wrapped as `var __webpack_module__ = <fn>;` so it
+// parses as a standalone program.
+const fs = require('fs');
+const { visit } = require('recast').types;
+const { parse } = require('./ast_core.js');
+
+const PLACEHOLDER = '__WEBPACK_MODULES__';
+const WRAP_PREFIX = 'var __webpack_module__ = ';
+const MIN_MODULES = 2;
+
+function isFn(node) {
+  return node && (node.type === 'FunctionExpression' || node.type === 'ArrowFunctionExpression');
+}
+
+function numericKey(prop) {
+  if(prop.computed || !prop.key) return false;
+  const k = prop.key;
+  if(k.type === 'NumericLiteral' || (k.type === 'Literal' && typeof k.value === 'number')) return true;
+  return (k.type === 'StringLiteral' || k.type === 'Literal') && /^\d+$/.test(String(k.value));
+}
+
+function moduleSource(code, prop) {
+  // {12(t,e){...}} shorthand methods become plain function expressions
+  if(prop.type === 'ObjectMethod' || (prop.type === 'Property' && prop.method)) {
+    const fn = prop.type === 'ObjectMethod' ? prop : prop.value;
+    return 'function' + code.slice(prop.key.end, fn.end);
+  }
+  return code.slice(prop.value.start, prop.value.end);
+}
+
+function splitCode(code) {
+  const ast = parse(code);
+  let best = null;
+  visit(ast, {
+    visitObjectExpression(path) {
+      const props = path.node.properties;
+      if(props.length >= MIN_MODULES && (!best || props.length > best.count) && props.every(p =>
+          numericKey(p) && (p.type === 'ObjectMethod' || p.method || isFn(p.value)))) {
+        best = { node: path.node, kind: 'object', count: props.length };
+      }
+      this.traverse(path);
+    },
+    visitArrayExpression(path) {
+      const els = path.node.elements;
+      const fns = els.filter(e => e !== null);
+      if(fns.length >= MIN_MODULES && (!best || fns.length > best.count) && fns.every(isFn)) {
+        best = { node: path.node, kind: 'array', count: fns.length };
+      }
+      this.traverse(path);
+    }
+  });
+  if(!best || typeof best.node.start !== 'number') return null;
+  const node = best.node;
+  let modules;
+  if(best.kind === 'object') {
+    modules = node.properties.map(p => ({
+      key: code.slice(p.key.start, p.key.end),
+      code: WRAP_PREFIX + moduleSource(code, p) + ';\n'
+    }));
+  } else {
+    modules = node.elements.map(e => ({ key: null, code: e ? WRAP_PREFIX + code.slice(e.start, e.end) + ';\n' : null }));
+  }
+  const shell = code.slice(0, node.start) + PLACEHOLDER + code.slice(node.end);
+  return { kind: best.kind, shell, modules };
+}
+
+function splitWebpack(src) {
+  const res = splitCode(fs.readFileSync(src, 'utf8'));
+  console.log("Webpack split:", src, res ? `${res.modules.length} modules (${res.kind})` : "no module map found");
+  return res;
+}
+
+module.exports = { PLACEHOLDER, WRAP_PREFIX, splitCode, splitWebpack };
+
+if(require.main === module) {
+  const [,, src, out] = process.argv;
+  if(!src) throw "usage";
+  const res = splitWebpack(src);
+  if(out) fs.writeFileSync(out, JSON.stringify(res), 'utf8');
+}
+""".lstrip())
+
+    # worker.js
+    (TOOLS / "worker.js").write_text(r"""
+// Long-lived pass runner for magic.py.
+// Requests are JSON-RPC 2.0 objects, one per line on stdin:
+//   {"jsonrpc":"2.0","id":1,"method":"beautify","params":{"src":"...","outdir":"..."}}
+// Responses are written to stdout as one JSON line prefixed with RPC_MARK; every other
+// stdout line (tool logs, npx output) is plain log text and is streamed by the caller.
+const readline = require('readline');
+const { beautify, formatFile } = require('./run_beautify.js');
+const { deobf } = require('./deobf_string_array.js');
+const { rename } = require('./ast_rename.js');
+const { dumpRuntime, dumpBatch, sharedPool, closeSharedPool } = require('./run_puppeteer.js');
+const { pipeline, restoreBatch } = require('./pipeline.js');
+const { splitWebpack } = require('./webpack_split.js');
+
+const RPC_MARK = '\x1e';
+
+const methods = {
+  ping: () => ({ pid: process.pid, node: process.version }),
+  beautify: ({src, outdir}) => ({ outputs: beautify(src, outdir) }),
+  deobf_string_array: ({src, outdir}) => ({ outputs: deobf(src, outdir) }),
+  ast_rename: ({src, outdir}) => ({ outputs: rename(src, outdir) }),
+  pipeline: ({src, outdir}) => ({ outputs: pipeline(src, outdir) }),
+  split_webpack: ({src}) => splitWebpack(src),
+  restore_batch: ({codes}) => ({ codes: restoreBatch(codes) }),
+  // both share one warm browser that lives as long as the worker
+  puppeteer: async ({src, outdir}) => ({ outputs: await dumpRuntime(src, outdir) }),
+  puppeteer_batch: async ({srcs, outdir, concurrency}) =>
+    ({ outputs: await dumpBatch(srcs, outdir, { concurrency, pool: sharedPool() }) }),
+  prettier: ({file}) => { formatFile(file); return { outputs: [file] }; },
+  shutdown: async () => { await closeSharedPool(); setImmediate(() => process.exit(0)); return {}; },
+};
+
+function reply(msg) {
+  process.stdout.write(RPC_MARK + JSON.stringify(Object.assign({jsonrpc: '2.0'}, msg)) + '\n');
+}
+
+// Requests are handled strictly one at a time so tool logs are not interleaved.
+let queue = Promise.resolve();
+readline.createInterface({ input: process.stdin }).on('line', line => {
+  if(!line.trim()) return;
+  queue = queue.then(async () => {
+    let req;
+    try { req = JSON.parse(line); } catch(e) { return reply({id: null, error: {code: -32700, message: 'Parse error'}}); }
+    const fn = methods[req.method];
+    if(!fn) return reply({id: req.id, error: {code: -32601, message: 'Method not found: ' + req.method}});
+    // per-request CPU time and the worker's peak RSS so far, for magic.py --profile
+    const cpu0 = process.cpuUsage();
+    const usage = () => {
+      const cpu = process.cpuUsage(cpu0);
+      return { cpu_ms: Math.round((cpu.user + cpu.system) / 100) / 10, peak_rss_kb: process.resourceUsage().maxRSS };
+    };
+    try {
+      const result = await fn(req.params || {});
+      reply({id: req.id, result, usage: usage()});
+    } catch(e) {
+      reply({id: req.id, error: {code: -32000, message: String(e && e.stack || e)}, usage: usage()});
+    }
+  });
+}).on('close', () => queue.then(closeSharedPool).finally(() => process.exit(0)));
 """.lstrip())
 
 def prepare_node_env():
@@ -262,53 +1213,299 @@ def download_source(src_spec, dest):
     except Exception as e:
         raise RuntimeError(f"Failed to download {src_spec}: {e}")
 
-def try_passes(src_path, outdir):
+class NodeWorker:
+    """
+    Long-lived tools/worker.js process. recast/prettier/js-beautify are loaded once and
+    every pass is a JSON-RPC request over stdin/stdout instead of a fresh node/npx spawn.
+    """
+    RPC_MARK = "\x1e"
+
+    def __init__(self, script=None):
+        script = script or TOOLS / "worker.js"
+        log("Starting node worker: " + str(script))
+        self.proc = subprocess.Popen(["node", str(script)], stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                     text=True, bufsize=1)
+        self.next_id = 0
+        # cpu_ms / peak_rss_kb the worker reported for the last request
+        self.usage = {}
+
+    def call(self, method, **params):
+        with PROFILER.span(method, cat="rpc", worker=self.proc.pid) as rec:
+            self.next_id += 1
+            req = {"jsonrpc": "2.0", "id": self.next_id, "method": method, "params": params}
+            self.proc.stdin.write(json.dumps(req) + "\n")
+            self.proc.stdin.flush()
+            for line in self.proc.stdout:
+                if not line.startswith(self.RPC_MARK):
+                    print(line.rstrip())
+                    continue
+                msg = json.loads(line[len(self.RPC_MARK):])
+                if msg.get("id") != self.next_id:
+                    continue
+                self.usage = msg.get("usage") or {}
+                rec.update(self.usage)
+                if "error" in msg:
+                    raise RuntimeError(f"Worker {method} failed: {msg['error'].get('message')}")
+                return msg["result"]
+            raise RuntimeError(f"Node worker exited (code {self.proc.poll()}) during {method}")
+
+    def close(self):
+        if self.proc.poll() is None:
+            try:
+                self.call("shutdown")
+            except (RuntimeError, OSError):
+                pass
+            try:
+                self.proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.proc.kill()
+
+class WorkerPool:
+    """N NodeWorker processes driven from threads, for restoring many small units in parallel."""
+
+    def __init__(self, size):
+        self.workers = [NodeWorker() for _ in range(max(1, size))]
+        self.free = queue.Queue()
+        for w in self.workers:
+            self.free.put(w)
+
+    def call(self, method, **params):
+        w = self.free.get()
+        try:
+            return w.call(method, **params)
+        finally:
+            self.free.put(w)
+
+    def map_batches(self, method, codes, max_bytes=WEBPACK_BATCH_BYTES):
+        """Send codes in size-bounded batches to `method`; results come back in input order."""
+        batches = []
+        idxs, chunk, size = [], [], 0
+        for i, code in enumerate(codes):
+            if code is None:
+                continue
+            idxs.append(i)
+            chunk.append(code)
+            size += len(code)
+            if size >= max_bytes:
+                batches.append((idxs, chunk, size))
+                idxs, chunk, size = [], [], 0
+        if chunk:
+            batches.append((idxs, chunk, size))
+        # biggest batches first so one large unit does not become the tail
+        batches.sort(key=lambda b: -b[2])
+        # pool threads have no open spans of their own; the batches belong to the caller's pass
+        parent = PROFILER.current()
+        def send(batch):
+            with PROFILER.span(method, cat="batch", parent=parent, units=len(batch[1]), bytes_in=batch[2]) as rec:
+                out = self.call(method, codes=batch[1])["codes"]
+                rec["bytes_out"] = sum(len(c) for c in out)
+                return out
+
+        results = [None] * len(codes)
+        with ThreadPoolExecutor(len(self.workers)) as ex:
+            outs = ex.map(send, batches)
+            for (idxs, _, _), out in zip(batches, outs):
+                for i, code in zip(idxs, out):
+                    results[i] = code
+        return results
+
+    def close(self):
+        for w in self.workers:
+            w.close()
+
+def start_worker():
+    try:
+        worker = NodeWorker()
+        info = worker.call("ping")
+        log(f"Node worker ready (pid {info['pid']}, node {info['node']})")
+        return worker
+    except Exception as e:
+        log("Node worker unavailable, falling back to one process per pass: " + str(e))
+        return None
+
+def run_pass(name, script, src, outdir, cache=None, worker=None):
+    """Run one node pass on src, reusing the cached outputs when nothing changed."""
+    src = Path(src).resolve()
+    outdir = Path(outdir).resolve()
+    with PROFILER.span(name, input=src.name, bytes_in=src.stat().st_size) as rec:
+        key = None
+        rec["cache"] = "off"
+        if cache is not None:
+            key = cache.key(name, src, script)
+            hit = cache.get(key, src, outdir)
+            rec["cache"] = "miss" if hit is None else "hit"
+            if hit is not None:
+                log(f"Cache hit for {name}: " + ", ".join(p.name for p in hit))
+                rec["bytes_out"] = sum(p.stat().st_size for p in hit)
+                return hit
+        before = {p: p.stat().st_mtime_ns for p in outdir.glob(src.name + "*")}
+        if worker is not None:
+            log(f"WORKER: {name} {src.name}")
+            rec["via"] = "worker"
+            try:
+                worker.call(name, src=str(src), outdir=str(outdir))
+            finally:
+                rec.update(worker.usage)
+        else:
+            rec["via"] = "spawn"
+            run(["node", str(script), str(src), str(outdir)], usage=rec)
+        outputs = [p for p in outdir.glob(src.name + "*") if p != src and before.get(p) != p.stat().st_mtime_ns]
+        rec["bytes_out"] = sum(p.stat().st_size for p in outputs)
+        if cache is not None:
+            cache.put(key, name, src, outputs)
+        return outputs
+
+def unwrap_webpack_module(code):
+    body = WEBPACK_WRAP_RE.sub("", code, count=1).rstrip()
+    return body[:-1] if body.endswith(";") else body
+
+def assemble_webpack(split, shell, modules):
+    parts = []
+    for mod, code in zip(split["modules"], modules):
+        body = unwrap_webpack_module(code) if code is not None else ""
+        parts.append(f"{mod['key']}: {body}" if split["kind"] == "object" else body)
+    if split["kind"] == "object":
+        table = "{\n" + ",\n".join(parts) + "\n}"
+    else:
+        table = "[\n" + ",\n".join(parts) + "\n]"
+    return shell.replace(WEBPACK_PLACEHOLDER, table, 1)
+
+def restore_webpack(src, outdir, jobs, worker=None, store_dir=None, baseline=None):
+    """
+    Split a webpack bundle into its modules, restore the modules in parallel node workers
+    and reassemble them in the original order. Modules whose source is unchanged since an
+    earlier run are taken from the module store instead of being restored again, and a
+    module-level change report is written next to the output. Returns the output path, or
+    None when src has no module map.
+    """
+    src = Path(src).resolve()
+    outdir = Path(outdir).resolve()
+    out_path = outdir / (src.name + ".webpack.js")
+    report_path = outdir / (src.name + ".webpack.changes.json")
+    store = ModuleStore(store_dir or outdir / "webpack_modules", salt=hash_script(TOOLS / "pipeline.js"))
+
+    splitter = worker or NodeWorker()
+    try:
+        split = splitter.call("split_webpack", src=str(src))
+    finally:
+        if splitter is not worker:
+            splitter.close()
+    if not split:
+        log("No webpack module map found in " + src.name)
+        return None
+
+    keys = ["<shell>"] + [m["key"] if m["key"] is not None else str(i) for i, m in enumerate(split["modules"])]
+    codes = [split["shell"]] + [m["code"] for m in split["modules"]]
+    hashes = [store.fingerprint(c) if c is not None else None for c in codes]
+    restored = [store.get(h) if h else None for h in hashes]
+    todo = [c if c is not None and r is None else None for c, r in zip(codes, restored)]
+    n_todo = sum(c is not None for c in todo)
+    log(f"Webpack modules: {len(split['modules'])}, reused {sum(r is not None for r in restored)}, to restore {n_todo}")
+    if n_todo:
+        log(f"Restoring webpack modules with {min(jobs, n_todo)} node workers")
+        pool = WorkerPool(min(jobs, n_todo))
+        try:
+            fresh = pool.map_batches("restore_batch", todo)
+        finally:
+            pool.close()
+        for i, code in enumerate(fresh):
+            if code is not None:
+                restored[i] = code
+                store.put(hashes[i], code)
+
+    out_path.write_text(assemble_webpack(split, restored[0], restored[1:]), encoding="utf8")
+    log(f"Webpack bundle reassembled: {out_path} ({len(split['modules'])} modules)")
+
+    name = src.name[:-len(".orig.js")] if src.name.endswith(".orig.js") else src.name
+    manifest = {"bundle": name, "sha256": sha256_file(src), "created": time.time(),
+                "modules": {k: h for k, h in zip(keys, hashes) if h}}
+    report = diff_manifests(store.load_manifest(baseline), manifest)
+    report["restored"] = n_todo
+    report["reused"] = len(manifest["modules"]) - n_todo
+    store.save_manifest(manifest)
+    report_path.write_text(json.dumps(report, indent=2), encoding="utf8")
+    log(f"Module changes vs {report['previous']}: {len(report['added'])} added, {len(report['changed'])} changed, "
+        f"{len(report['removed'])} removed, {report['unchanged']} unchanged -> {report_path.name}")
+    return out_path
+
+def try_passes(src_path, outdir, cache=None, worker=None, pipeline=False, webpack=False, jobs=None,
+               module_store=None, baseline=None):
     # полностью сохраняем твой код
     outdir = Path(outdir)
     outdir.mkdir(parents=True, exist_ok=True)
     basename = src_path.name
     orig_copy = outdir / (basename + ".orig.js")
     shutil.copy2(src_path, orig_copy)
-    try:
-        run(["node", str(TOOLS / "run_beautify.js"), str(orig_copy), str(outdir)])
-    except Exception as e:
-        log("Beautify pass failed: " + str(e))
-    found_beaut = None
-    for p in outdir.glob(basename + "*.js"):
-        if p.name.endswith(".beautified.js") or p.name.endswith(".prettier.js") or ".beautified" in p.name:
-            found_beaut = p
+    webpack_out = None
+    if webpack:
+        with PROFILER.span("webpack", input=orig_copy.name, bytes_in=orig_copy.stat().st_size) as rec:
+            try:
+                webpack_out = restore_webpack(orig_copy, outdir, jobs or os.cpu_count() or 1, worker,
+                                              module_store, baseline)
+            except Exception as e:
+                log("Webpack module pass failed: " + str(e))
+            rec["bytes_out"] = webpack_out.stat().st_size if webpack_out else 0
+        if not webpack_out:
+            log("Falling back to whole-file passes")
+    if webpack_out:
+        run_target = webpack_out
+    elif pipeline:
+        # one parse, one combined traversal, one print (tools/pipeline.js)
+        try:
+            run_pass("pipeline", TOOLS / "pipeline.js", orig_copy, outdir, cache, worker)
+        except Exception as e:
+            log("Single-parse pipeline failed: " + str(e))
+        run_target = orig_copy
+        for p in outdir.glob(basename + "*.pipeline.js"):
+            run_target = p
             break
-    if not found_beaut:
-        found_beaut = orig_copy
-    try:
-        run(["node", str(TOOLS / "deobf_string_array.js"), str(found_beaut), str(outdir)])
-    except Exception as e:
-        log("String-array pass failed: " + str(e))
-    candidate_for_ast = None
-    for p in outdir.glob(basename + "*.dearr.js"):
-        candidate_for_ast = p
-        break
-    if not candidate_for_ast:
-        candidate_for_ast = found_beaut
-    try:
-        run(["node", str(TOOLS / "ast_rename.js"), str(candidate_for_ast), str(outdir)])
-    except Exception as e:
-        log("AST rename pass failed: " + str(e))
-    ast_renamed = None
-    for p in outdir.glob(basename + "*.ast_renamed.js"):
-        ast_renamed = p
-        break
-    run_target = ast_renamed or candidate_for_ast or found_beaut
+    else:
+        try:
+            run_pass("beautify", TOOLS / "run_beautify.js", orig_copy, outdir, cache, worker)
+        except Exception as e:
+            log("Beautify pass failed: " + str(e))
+        found_beaut = None
+        for p in outdir.glob(basename + "*.js"):
+            if p.name.endswith(".beautified.js") or p.name.endswith(".prettier.js") or ".beautified" in p.name:
+                found_beaut = p
+                break
+        if not found_beaut:
+            found_beaut = orig_copy
+        try:
+            run_pass("deobf_string_array", TOOLS / "deobf_string_array.js", found_beaut, outdir, cache, worker)
+        except Exception as e:
+            log("String-array pass failed: " + str(e))
+        candidate_for_ast = None
+        for p in outdir.glob(basename + "*.dearr.js"):
+            candidate_for_ast = p
+            break
+        if not candidate_for_ast:
+            candidate_for_ast = found_beaut
+        try:
+            run_pass("ast_rename", TOOLS / "ast_rename.js", candidate_for_ast, outdir, cache, worker)
+        except Exception as e:
+            log("AST rename pass failed: " + str(e))
+        ast_renamed = None
+        for p in outdir.glob(basename + "*.ast_renamed.js"):
+            ast_renamed = p
+            break
+        run_target = ast_renamed or candidate_for_ast or found_beaut
     try:
-        run(["node", str(TOOLS / "run_puppeteer.js"), str(run_target), str(outdir)])
+        run_pass("puppeteer", TOOLS / "run_puppeteer.js", run_target, outdir, cache, worker)
     except Exception as e:
         log("Puppeteer runtime pass failed: " + str(e))
     final_candidates = []
     for p in outdir.glob("**/*"):
-        if p.is_file() and p.name.endswith(".js"):
+        # the workdir is shared between bundle versions, only look at this bundle's outputs
+        if p.is_file() and p.name.endswith(".js") and p.name.startswith(basename):
             final_candidates.append(p)
     preferred = None
-    for suf in [".ast_renamed.js", ".dearr.js", ".prettier.js", ".beautified.js", ".orig.js"]:
+    suffixes = [".ast_renamed.js", ".dearr.js", ".prettier.js", ".beautified.js", ".orig.js"]
+    if pipeline:
+        suffixes.insert(0, ".pipeline.js")
+    if webpack_out:
+        suffixes.insert(0, ".webpack.js")
+    for suf in suffixes:
         for p in final_candidates:
             if p.name.endswith(suf):
                 preferred = p
@@ -319,14 +1516,36 @@ def try_passes(src_path, outdir):
         preferred = max(final_candidates, key=lambda p: p.stat().st_size)
     return outdir, preferred
 
-def post_process_and_write(preferred_path, out_path):
-    try:
-        run(["npx", "--yes", "prettier", "--parser", "babel", "--write", str(preferred_path)])
-    except Exception as e:
-        log("Prettier formatting failed: " + str(e))
+def post_process_and_write(preferred_path, out_path, worker=None, format=True):
+    if format:
+        with PROFILER.span("prettier", input=Path(preferred_path).name, bytes_in=Path(preferred_path).stat().st_size,
+                           cache="off") as rec:
+            try:
+                if worker is not None:
+                    rec["via"] = "worker"
+                    worker.call("prettier", file=str(Path(preferred_path).resolve()))
+                    rec.update(worker.usage)
+                else:
+                    rec["via"] = "spawn"
+                    run(["npx", "--yes", "prettier", "--parser", "babel", "--write", str(preferred_path)], usage=rec)
+            except Exception as e:
+                log("Prettier formatting failed: " + str(e))
+            rec["bytes_out"] = Path(preferred_path).stat().st_size
     shutil.copy2(preferred_path, out_path)
     log(f"Wrote final restored file: {out_path} ({out_path.stat().st_size} bytes)")
 
+def write_profile(out_path, cache=None):
+    report_path = out_path.with_suffix(".profile.json")
+    trace_path = out_path.with_suffix(".trace.json")
+    extra = {"cache": {"hits": cache.hits, "misses": cache.misses}} if cache is not None else {}
+    PROFILER.write(report_path, trace_path, **extra)
+    for name, p in sorted(PROFILER.summary().items(), key=lambda kv: -kv[1]["wall_ms"]):
+        log(f"PROFILE {name:<20} x{p['count']:<3} wall {p['wall_ms']:>9.1f}ms  cpu {p['cpu_ms']:>9.1f}ms  "
+            f"rss {p['peak_rss_kb'] // 1024:>5}MB  in {p['bytes_in']:>10}  out {p['bytes_out']:>10}  hits {p['cache_hits']}")
+    if cache is not None:
+        log(f"PROFILE cache: {cache.hits} hits, {cache.misses} misses")
+    log(f"Profile written: {report_path}, {trace_path}")
+
 def git_commit_and_push(filepath, message="Add restored.js (magic_restore)"):
     try:
         run(["git", "add", str(filepath)], cwd=ROOT)
@@ -343,7 +1562,19 @@ def main():
     parser.add_argument("--out", default="restored.js", help="Output filename")
     parser.add_argument("--workdir", default=str(WORK), help="Working directory")
     parser.add_argument("--commit", action="store_true", help="Commit & push result to repo")
+    parser.add_argument("--no-cache", action="store_true", help="Always re-run every pass")
+    parser.add_argument("--cache-dir", default=str(DEFAULT_CACHE_DIR), help="Pass result cache directory")
+    parser.add_argument("--cache-max-mb", type=int, default=2048, help="Cache size limit (LRU eviction)")
+    parser.add_argument("--no-worker", action="store_true", help="Spawn node per pass instead of using the worker")
+    parser.add_argument("--pipeline", action="store_true", help="Parse once and run deobfuscate+rename in one traversal")
+    parser.add_argument("--webpack", action="store_true", help="Restore webpack modules separately, in parallel")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count(), help="Node workers for --webpack")
+    parser.add_argument("--module-store", help="Restored module store for --webpack (default: <workdir>/webpack_modules)")
+    parser.add_argument("--baseline-manifest", help="Module manifest to diff against instead of the last run")
+    parser.add_argument("--profile", action="store_true",
+                        help="Write per-pass timings/memory to <out>.profile.json and <out>.trace.json")
     args = parser.parse_args()
+    PROFILER.enabled = args.profile
 
     log("Starting magic restore pipeline")
     ensure_dirs()
@@ -362,20 +1593,43 @@ def main():
         log("Failed to fetch source: " + str(e))
         sys.exit(2)
 
+    cache = None
+    if not args.no_cache:
+        cache = PassCache(args.cache_dir, tools_dir=TOOLS, max_bytes=args.cache_max_mb * 1024 * 1024, log=log)
+
+    worker = None if args.no_worker else start_worker()
+
     try:
-        outdir, preferred = try_passes(downloaded, args.workdir)
+        outdir, preferred = try_passes(downloaded, args.workdir, cache, worker, pipeline=args.pipeline,
+                                       webpack=args.webpack, jobs=args.jobs,
+                                       module_store=args.module_store, baseline=args.baseline_manifest)
         if not preferred:
             log("No candidate produced. Exiting.")
             sys.exit(3)
         log("Preferred candidate: " + str(preferred))
         final_out = Path(args.out).resolve()
-        post_process_and_write(preferred, final_out)
+        # pipeline/webpack outputs are already printed once by recast
+        formatted = preferred.name.endswith((".pipeline.js", ".webpack.js"))
+        post_process_and_write(preferred, final_out, worker, format=not formatted)
+        changes = preferred.with_name(preferred.name[:-len(".js")] + ".changes.json")
+        if preferred.name.endswith(".webpack.js") and changes.exists():
+            shutil.copy2(changes, final_out.with_suffix(".changes.json"))
+            log(f"Module change report: {final_out.with_suffix('.changes.json')}")
+        renames = preferred.with_name(preferred.name[:-len(".js")] + ".renames.json")
+        if renames.exists():
+            shutil.copy2(renames, final_out.with_suffix(".renames.json"))
+            log(f"Rename map: {final_out.with_suffix('.renames.json')}")
         if args.commit:
             git_commit_and_push(final_out, message=f"restored.js (magic_restore) from {fname}")
         log("Done.")
     except Exception as e:
         log("Pipeline failed: " + str(e))
         sys.exit(4)
+    finally:
+        if worker is not None:
+            worker.close()
+        if args.profile:
+            write_profile(Path(args.out).resolve(), cache)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -13,6 +13,7 @@ restore_js.py
 Выходной файл: restored.js
 """
 
+import argparse
 import os
 import sys
 import shutil
@@ -23,6 +24,8 @@ import re
 from pathlib import Path
 from urllib.parse import urljoin, urlparse
 
+from restore_cache import PassCache, DEFAULT_CACHE_DIR
+
 ROOT = Path.cwd()
 TOOLS = ROOT / "tools"
 WORK = ROOT / "restore_work"
@@ -281,7 +284,25 @@ def download_dependencies(js_file_path, base_url=None):
             log(f"Не удалось скачать зависимость {dep_url}: {e}")
     return dep_paths
 
-def try_passes(src_path, outdir):
+def run_pass(name, script, src, outdir, cache=None):
+    """Запускает один node-проход, переиспользуя результат из кэша, если вход не изменился"""
+    src = Path(src)
+    outdir = Path(outdir)
+    key = None
+    if cache is not None:
+        key = cache.key(name, src, script)
+        hit = cache.get(key, src, outdir)
+        if hit is not None:
+            log(f"Cache hit for {name}: " + ", ".join(p.name for p in hit))
+            return hit
+    before = {p: p.stat().st_mtime_ns for p in outdir.glob(src.name + "*")}
+    run(["node", str(script), str(src), str(outdir)])
+    outputs = [p for p in outdir.glob(src.name + "*") if p != src and before.get(p) != p.stat().st_mtime_ns]
+    if cache is not None:
+        cache.put(key, name, src, outputs)
+    return outputs
+
+def try_passes(src_path, outdir, cache=None):
     outdir = Path(outdir)
     outdir.mkdir(parents=True, exist_ok=True)
     basename = src_path.name
@@ -293,7 +314,7 @@ def try_passes(src_path, outdir):
 
     log(f"Step {step}/{total_steps}: Beautify")
     try:
-        run(["node", str(TOOLS / "run_beautify.js"), str(orig_copy), str(outdir)])
+        run_pass("beautify", TOOLS / "run_beautify.js", orig_copy, outdir, cache)
     except Exception as e:
         log("Beautify failed: " + str(e))
     step +=1
@@ -308,7 +329,7 @@ def try_passes(src_path, outdir):
     if not found_beaut:
         found_beaut = orig_copy
     try:
-        run(["node", str(TOOLS / "deobf_string_array.js"), str(found_beaut), str(outdir)])
+        run_pass("deobf_string_array", TOOLS / "deobf_string_array.js", found_beaut, outdir, cache)
     except Exception as e:
         log("String-array pass failed: " + str(e))
     step +=1
@@ -321,7 +342,7 @@ def try_passes(src_path, outdir):
     if not candidate_for_ast:
         candidate_for_ast = found_beaut
     try:
-        run(["node", str(TOOLS / "ast_rename.js"), str(candidate_for_ast), str(outdir)])
+        run_pass("ast_rename", TOOLS / "ast_rename.js", candidate_for_ast, outdir, cache)
     except Exception as e:
         log("AST rename pass failed: " + str(e))
     step +=1
@@ -333,7 +354,7 @@ def try_passes(src_path, outdir):
         break
     run_target = ast_renamed or candidate_for_ast or found_beaut
     try:
-        run(["node", str(TOOLS / "run_puppeteer.js"), str(run_target), str(outdir)])
+        run_pass("puppeteer", TOOLS / "run_puppeteer.js", run_target, outdir, cache)
     except Exception as e:
         log("Puppeteer pass failed: " + str(e))
     step +=1
@@ -363,6 +384,12 @@ def post_process(preferred_path, out_path):
     log(f"Final restored file: {out_path} ({out_path.stat().st_size} bytes)")
 
 def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--no-cache", action="store_true", help="Не использовать кэш результатов проходов")
+    parser.add_argument("--cache-dir", default=str(DEFAULT_CACHE_DIR), help="Каталог кэша")
+    parser.add_argument("--cache-max-mb", type=int, default=2048, help="Лимит размера кэша (LRU)")
+    args = parser.parse_args()
+
     ensure_dirs()
     write_tools()
     prepare_node_env()
@@ -376,7 +403,10 @@ def main():
     download_dependencies(downloaded, base_url=src_url)
 
     log("Starting deobfuscation and AST pipeline...")
-    outdir, preferred = try_passes(downloaded, WORK)
+    cache = None
+    if not args.no_cache:
+        cache = PassCache(args.cache_dir, tools_dir=TOOLS, max_bytes=args.cache_max_mb * 1024 * 1024, log=log)
+    outdir, preferred = try_passes(downloaded, WORK, cache)
     if not preferred:
         log("No candidate produced. Exiting.")
         sys.exit(1)
@@ -0,0 +1,247 @@
+"""
+restore_cache.py
+
+Persistent content-addressed cache for the restore passes of magic.py / magic1.py.
+
+An entry is keyed by (input SHA-256, pass name, pass script SHA-256, tool versions)
+and holds every file the pass produced for that input, stored by the suffix the
+pass appended to the input name (".beautified.js", ".dearr.js", ...). On a hit the
+files are copied back into the work directory under the current input name, so
+the rest of try_passes() does not know whether the pass actually ran.
+
+Layout:
+  <cache_dir>/<key[:2]>/<key>/files/<suffix>   cached outputs
+  <cache_dir>/<key[:2]>/<key>/meta.json        pass name, input hash, sizes
+
+Eviction is size-bounded LRU: the entry directory mtime is touched on every hit
+and the oldest entries are removed once the total size exceeds max_bytes.
+
+ModuleStore keeps restored webpack modules by content hash together with the
+manifest (module id -> hash) of the last restored bundle, so a new deploy only
+re-runs the passes on modules that actually changed.
+"""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+
+DEFAULT_CACHE_DIR = Path.home() / ".cache" / "magic_restore"
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+TOOL_PACKAGES = ["recast", "prettier", "js-beautify", "puppeteer"]
+LOCAL_REQUIRE_RE = re.compile(r"""require\(\s*['"]\./([\w.-]+)['"]\s*\)""")
+
+
+def sha256_file(path, bufsize=1 << 20):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(bufsize), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def hash_script(script):
+    """Hash of a node script and every tools/ module it pulls in via require('./x.js')."""
+    h = hashlib.sha256()
+    seen = set()
+    todo = [Path(script)]
+    while todo:
+        path = todo.pop()
+        if path in seen or not path.exists():
+            continue
+        seen.add(path)
+        h.update(path.name.encode("utf8") + sha256_file(path).encode("ascii"))
+        text = path.read_text(encoding="utf8", errors="ignore")
+        todo.extend(sorted((path.parent / dep for dep in LOCAL_REQUIRE_RE.findall(text)), reverse=True))
+    return h.hexdigest() if seen else ""
+
+
+def tool_versions(tools_dir):
+    """node version + installed versions of the npm packages used by the passes."""
+    versions = {}
+    try:
+        versions["node"] = subprocess.run(["node", "--version"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        versions["node"] = None
+    for name in TOOL_PACKAGES:
+        pkg = Path(tools_dir) / "node_modules" / name / "package.json"
+        try:
+            versions[name] = json.loads(pkg.read_text(encoding="utf8")).get("version")
+        except (OSError, ValueError):
+            versions[name] = None
+    return versions
+
+
+class PassCache:
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, tools_dir=None, max_bytes=DEFAULT_MAX_BYTES, log=print):
+        self.dir = Path(cache_dir)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.log = log
+        self.versions = tool_versions(tools_dir) if tools_dir else {}
+        self._script_hashes = {}
+        self.hits = 0
+        self.misses = 0
+
+    def script_hash(self, script):
+        script = Path(script)
+        if script not in self._script_hashes:
+            self._script_hashes[script] = hash_script(script)
+        return self._script_hashes[script]
+
+    def key(self, pass_name, input_path, script=None, extra=None):
+        material = {
+            "input": sha256_file(input_path),
+            "pass": pass_name,
+            "script": self.script_hash(script) if script else "",
+            "versions": self.versions,
+            "extra": extra,
+        }
+        blob = json.dumps(material, sort_keys=True).encode("utf8")
+        return hashlib.sha256(blob).hexdigest()
+
+    def _entry(self, key):
+        return self.dir / key[:2] / key
+
+    def get(self, key, input_path, outdir):
+        """Restore cached outputs for input_path into outdir. Returns the list of paths or None."""
+        entry = self._entry(key)
+        files = entry / "files"
+        if not (entry / "meta.json").exists() or not files.is_dir():
+            self.misses += 1
+            return None
+        restored = []
+        for f in sorted(files.iterdir()):
+            dest = Path(outdir) / (Path(input_path).name + f.name)
+            shutil.copyfile(f, dest)
+            restored.append(dest)
+        os.utime(entry)
+        self.hits += 1
+        return restored
+
+    def put(self, key, pass_name, input_path, outputs):
+        """Store the outputs a pass produced for input_path. Outputs must be named <input name><suffix>."""
+        prefix = Path(input_path).name
+        entry = self._entry(key)
+        if (entry / "meta.json").exists():
+            # same key, same outputs: another writer already published this entry
+            return
+        entry.parent.mkdir(parents=True, exist_ok=True)
+        tmp = Path(tempfile.mkdtemp(dir=entry.parent, prefix=entry.name + ".tmp"))
+        (tmp / "files").mkdir()
+        size = 0
+        for out in outputs:
+            out = Path(out)
+            if not out.name.startswith(prefix) or out.name == prefix:
+                continue
+            shutil.copyfile(out, tmp / "files" / out.name[len(prefix):])
+            size += out.stat().st_size
+        meta = {"pass": pass_name, "input": prefix, "size": size, "created": time.time()}
+        (tmp / "meta.json").write_text(json.dumps(meta), encoding="utf8")
+        if entry.exists() and not (entry / "meta.json").exists():
+            # left half-removed by evict(); get() treats it as a miss
+            shutil.rmtree(entry, ignore_errors=True)
+        try:
+            os.replace(tmp, entry)
+        except OSError:
+            # a concurrent writer of the same key published first (ENOTEMPTY/EEXIST)
+            shutil.rmtree(tmp, ignore_errors=True)
+            if not (entry / "meta.json").exists():
+                raise
+            return
+        self.evict()
+
+    def _entries(self):
+        for shard in self.dir.iterdir():
+            if not shard.is_dir():
+                continue
+            for entry in shard.iterdir():
+                meta = entry / "meta.json"
+                if entry.is_dir() and meta.exists():
+                    try:
+                        size = json.loads(meta.read_text(encoding="utf8")).get("size", 0)
+                    except ValueError:
+                        size = 0
+                    yield entry.stat().st_mtime, size, entry
+
+    def evict(self):
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in entries:
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+            self.log(f"Cache evicted {entry.name} ({size} bytes)")
+
+
+class ModuleStore:
+    """
+    Restored webpack modules addressed by fingerprint (salt + module source), plus
+    manifest.json / manifest.prev.json describing the last two restored bundles.
+    Objects referenced by neither manifest are dropped when a new manifest is saved.
+    """
+
+    def __init__(self, root, salt=""):
+        self.root = Path(root)
+        (self.root / "objects").mkdir(parents=True, exist_ok=True)
+        self.salt = salt
+
+    def fingerprint(self, code):
+        return hashlib.sha256((self.salt + "\0" + code).encode("utf8")).hexdigest()
+
+    def _object(self, h):
+        return self.root / "objects" / h[:2] / (h + ".js")
+
+    def get(self, h):
+        try:
+            return self._object(h).read_text(encoding="utf8")
+        except OSError:
+            return None
+
+    def put(self, h, code):
+        path = self._object(h)
+        path.parent.mkdir(exist_ok=True)
+        tmp = path.with_name(path.name + f".tmp{os.getpid()}")
+        tmp.write_text(code, encoding="utf8")
+        os.replace(tmp, path)
+
+    def load_manifest(self, path=None):
+        path = Path(path) if path else self.root / "manifest.json"
+        try:
+            return json.loads(path.read_text(encoding="utf8"))
+        except (OSError, ValueError):
+            return None
+
+    def save_manifest(self, manifest):
+        current = self.root / "manifest.json"
+        if current.exists():
+            os.replace(current, self.root / "manifest.prev.json")
+        current.write_text(json.dumps(manifest, indent=1), encoding="utf8")
+        keep = set(manifest["modules"].values())
+        prev = self.load_manifest(self.root / "manifest.prev.json")
+        if prev:
+            keep.update(prev["modules"].values())
+        for obj in (self.root / "objects").glob("*/*.js"):
+            if obj.stem not in keep:
+                obj.unlink()
+
+
+def diff_manifests(old, new):
+    """Module-level change report between two ModuleStore manifests."""
+    old_mods = old["modules"] if old else {}
+    new_mods = new["modules"]
+    return {
+        "bundle": new.get("bundle"),
+        "previous": old.get("bundle") if old else None,
+        "modules": len(new_mods),
+        "added": [k for k in new_mods if k not in old_mods],
+        "removed": [k for k in old_mods if k not in new_mods],
+        "changed": [k for k in new_mods if k in old_mods and old_mods[k] != new_mods[k]],
+        "unchanged": sum(1 for k in new_mods if old_mods.get(k) == new_mods[k]),
+    }
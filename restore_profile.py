@@ -0,0 +1,155 @@
+"""
+restore_profile.py
+
+Per-pass profile for magic.py --profile.
+
+Every pass (and every worker RPC underneath it) is recorded as a span with its wall
+time, CPU time and peak RSS, plus input/output sizes and the cache result. CPU and
+RSS come from the process that did the work: os.wait4() rusage for spawned node
+processes, and process.cpuUsage()/resourceUsage() reported back by tools/worker.js.
+Worker RSS is the peak of the long-lived worker so far, not of the single request.
+Each span records its parent (the innermost open span of the same thread, or the one
+passed explicitly when work is handed to a pool thread); a pass that fans out gets the
+usage of the RPCs under it, not of whatever ran at the same time.
+
+Two files are written:
+  <out>.profile.json   per-span records, per-pass totals and run totals
+  <out>.trace.json     Chrome trace-event format (chrome://tracing, ui.perfetto.dev)
+"""
+
+import json
+import os
+import resource
+import threading
+import time
+from contextlib import contextmanager
+
+
+def child_usage(ru):
+    """cpu_ms / peak_rss_kb from a struct_rusage (ru_maxrss is KiB on Linux)."""
+    return {"cpu_ms": round((ru.ru_utime + ru.ru_stime) * 1000, 1), "peak_rss_kb": ru.ru_maxrss}
+
+
+class Profiler:
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.spans = []
+        self.lock = threading.Lock()
+        self.t0 = time.perf_counter()
+        self.started = time.time()
+        self.threads = {}
+        self.next_id = 0
+        self.local = threading.local()
+
+    def current(self):
+        """id of the innermost open span of this thread; pass it as parent= to spans run on other threads."""
+        stack = getattr(self.local, "stack", None)
+        return stack[-1] if stack else None
+
+    @contextmanager
+    def span(self, name, cat="pass", parent=None, **args):
+        """Time the body; the yielded dict is stored as the span's args, so callers can add fields."""
+        rec = dict(args)
+        if not self.enabled:
+            yield rec
+            return
+        with self.lock:
+            self.next_id += 1
+            span_id = self.next_id
+        if parent is None:
+            parent = self.current()
+        if not hasattr(self.local, "stack"):
+            self.local.stack = []
+        self.local.stack.append(span_id)
+        start = time.perf_counter()
+        try:
+            yield rec
+        finally:
+            end = time.perf_counter()
+            self.local.stack.pop()
+            tid = threading.get_ident()
+            with self.lock:
+                self.threads.setdefault(tid, threading.current_thread().name)
+                self.spans.append({
+                    "id": span_id,
+                    "parent": parent,
+                    "name": name,
+                    "cat": cat,
+                    "ts_ms": round((start - self.t0) * 1000, 3),
+                    "wall_ms": round((end - start) * 1000, 3),
+                    "tid": tid,
+                    "args": rec,
+                })
+
+    def nested_usage(self):
+        """span id → CPU/RSS of the worker RPCs under it, for passes that fan out to a pool."""
+        parents = {s["id"]: s["parent"] for s in self.spans}
+        usage = {}
+        for s in self.spans:
+            if s["cat"] != "rpc":
+                continue
+            a = s["args"]
+            node = s["parent"]
+            while node is not None:
+                u = usage.setdefault(node, {"cpu_ms": 0.0, "peak_rss_kb": 0})
+                u["cpu_ms"] = round(u["cpu_ms"] + (a.get("cpu_ms") or 0), 1)
+                u["peak_rss_kb"] = max(u["peak_rss_kb"], a.get("peak_rss_kb") or 0)
+                node = parents.get(node)
+        return usage
+
+    def summary(self):
+        passes = {}
+        nested = self.nested_usage()
+        for s in self.spans:
+            if s["cat"] != "pass":
+                continue
+            a = s["args"]
+            if "cpu_ms" not in a and "via" not in a and a.get("cache") != "hit":
+                a = dict(a, **nested.get(s["id"], {"cpu_ms": 0.0, "peak_rss_kb": 0}))
+            p = passes.setdefault(s["name"], {"count": 0, "wall_ms": 0.0, "cpu_ms": 0.0, "peak_rss_kb": 0,
+                                              "bytes_in": 0, "bytes_out": 0, "cache_hits": 0})
+            p["count"] += 1
+            p["wall_ms"] = round(p["wall_ms"] + s["wall_ms"], 3)
+            p["cpu_ms"] = round(p["cpu_ms"] + (a.get("cpu_ms") or 0), 1)
+            p["peak_rss_kb"] = max(p["peak_rss_kb"], a.get("peak_rss_kb") or 0)
+            p["bytes_in"] += a.get("bytes_in") or 0
+            p["bytes_out"] += a.get("bytes_out") or 0
+            p["cache_hits"] += a.get("cache") == "hit"
+        return passes
+
+    def report(self):
+        me = resource.getrusage(resource.RUSAGE_SELF)
+        kids = resource.getrusage(resource.RUSAGE_CHILDREN)
+        return {
+            "started": self.started,
+            "wall_ms": round((time.perf_counter() - self.t0) * 1000, 3),
+            "coordinator": child_usage(me),
+            "children": child_usage(kids),
+            "passes": self.summary(),
+            "spans": self.spans,
+        }
+
+    def trace_events(self):
+        pid = os.getpid()
+        tids = {tid: i for i, tid in enumerate(self.threads)}
+        events = [{"name": "thread_name", "ph": "M", "pid": pid, "tid": tids[tid], "args": {"name": name}}
+                  for tid, name in self.threads.items()]
+        for s in self.spans:
+            events.append({
+                "name": s["name"],
+                "cat": s["cat"],
+                "ph": "X",
+                "ts": round(s["ts_ms"] * 1000),
+                "dur": round(s["wall_ms"] * 1000),
+                "pid": pid,
+                "tid": tids[s["tid"]],
+                "args": s["args"],
+            })
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write(self, report_path, trace_path, **extra):
+        """extra is merged into the top level of the JSON report (e.g. cache hit/miss totals)."""
+        with open(report_path, "w", encoding="utf8") as f:
+            json.dump(dict(self.report(), **extra), f, indent=1)
+        with open(trace_path, "w", encoding="utf8") as f:
+            json.dump(self.trace_events(), f)
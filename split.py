@@ -1,7 +1,13 @@
 import requests
 import os
-import subprocess
+import re
+import gzip
+import json
 import math
+import queue
+import argparse
+import threading
+import subprocess
 
 # --------------------------------------
 # НАСТРОЙКИ
@@ -9,51 +15,187 @@ import math
 FILE_URL = "https://gist.githubusercontent.com/Hikita1337/9c4f2873fa373fa343fc02e84ab86dda/raw/f959ae8767bf4a55b361186d1ebec8be8e5c8584/timeline1.txt"
 
 OUTPUT_DIR = "."  # сохраняем части в корень репозитория
-PARTS = 2         # количество частей
+PARTS = 2         # количество частей (если размер части не задан явно)
+PART_SIZE = 50 * 1024 * 1024  # размер части, когда общий размер заранее неизвестен
+MANIFEST = "timeline1_parts.json"
+
+READ_CHUNK = 1 << 20
+QUEUE_DEPTH = 16  # кусков в очереди одного писателя; память ограничена этим, а не размером файла
+
+RECORD_RE = re.compile(rb"^===== (\d{4}-\d{2}-\d{2}_[\d-]+) \| ")
+
 
 # --------------------------------------
-# СКАЧИВАНИЕ ФАЙЛА
+# ИСТОЧНИК: локальный файл или потоковое скачивание
 # --------------------------------------
-print("Downloading timeline1.txt ...")
+def open_source(path=None, url=FILE_URL):
+    """(итератор кусков байт, общий размер или None)."""
+    if path:
+        if path.endswith(".gz"):
+            f = gzip.open(path, "rb")
+            return iter(lambda: f.read(READ_CHUNK), b""), None
+        f = open(path, "rb")
+        return iter(lambda: f.read(READ_CHUNK), b""), os.path.getsize(path)
+    print("Downloading timeline1.txt ...")
+    response = requests.get(url, stream=True)
+    response.raise_for_status()
+    length = response.headers.get("Content-Length")
+    # с gzip-сжатием при передаче Content-Length — размер сжатого потока, он не подходит
+    if response.headers.get("Content-Encoding"):
+        length = None
+    return response.iter_content(READ_CHUNK), int(length) if length else None
 
-response = requests.get(FILE_URL)
-response.raise_for_status()
 
-full_text = response.text
-size = len(full_text)
+def iter_lines(chunks):
+    # куски незаконченной строки склеиваются один раз, когда в потоке встретится "\n":
+    # длинное тело ответа без переводов строк не копируется заново на каждом куске
+    pending = []
+    for chunk in chunks:
+        if b"\n" not in chunk:
+            if chunk:
+                pending.append(chunk)
+            continue
+        lines = chunk.split(b"\n")
+        pending.append(lines[0])
+        yield b"".join(pending) + b"\n"
+        for line in lines[1:-1]:
+            yield line + b"\n"
+        pending = [lines[-1]] if lines[-1] else []
+    if pending:
+        yield b"".join(pending)
 
-print(f"File loaded. Size: {size} characters")
 
 # --------------------------------------
-# ДЕЛЕНИЕ НА ЧАСТИ
+# ЗАПИСЬ ЧАСТЕЙ: по потоку на часть, пока читается следующая
 # --------------------------------------
-part_size = math.ceil(size / PARTS)
+class PartWriter(threading.Thread):
+    def __init__(self, path):
+        super().__init__(daemon=True)
+        self.path = path
+        self.queue = queue.Queue(QUEUE_DEPTH)
+        self.error = None
+        self.start()
 
-parts = []
-for i in range(PARTS):
-    start = i * part_size
-    end = start + part_size
-    parts.append(full_text[start:end])
+    def run(self):
+        try:
+            with open(self.path, "wb") as f:
+                while True:
+                    data = self.queue.get()
+                    if data is None:
+                        return
+                    f.write(data)
+        except Exception as e:
+            self.error = e
+            # вычитываем очередь, чтобы читатель не завис на put()
+            while self.queue.get() is not None:
+                pass
 
-# --------------------------------------
-# СОХРАНЕНИЕ ЧАСТЕЙ
-# --------------------------------------
-filenames = []
-for i, content in enumerate(parts, start=1):
-    filename = f"timeline1_part{i}.txt"
-    fullpath = os.path.join(OUTPUT_DIR, filename)
-    with open(fullpath, "w", encoding="utf-8") as f:
-        f.write(content)
-    filenames.append(filename)
-    print(f"Saved: {filename} ({len(content)} chars)")
+    def write(self, data):
+        self.queue.put(data)
 
-# --------------------------------------
-# GIT ADD + COMMIT + PUSH
-# --------------------------------------
-print("Committing and pushing to GitHub...")
+    def close(self):
+        self.queue.put(None)
+
+
+def split_stream(chunks, part_size, output_dir=OUTPUT_DIR, prefix="timeline1_part"):
+    """
+    Режет timeline на части примерно по part_size байт, только по границам записей
+    (===== timestamp | url =====). Возвращает манифест частей.
+    """
+    parts = []
+    writers = []
+    current = None
+    offset = 0
+    pending = []
+    pending_size = 0
+
+    def flush():
+        nonlocal pending, pending_size
+        if pending:
+            current["writer"].write(b"".join(pending))
+            pending, pending_size = [], 0
+
+    def new_part(ts):
+        nonlocal current
+        if current:
+            flush()
+            current["writer"].close()
+        filename = f"{prefix}{len(parts) + 1}.txt"
+        current = {"file": filename, "first_ts": ts, "last_ts": ts, "records": 0,
+                   "offset": offset, "length": 0,
+                   "writer": PartWriter(os.path.join(output_dir, filename))}
+        writers.append(current["writer"])
+        parts.append(current)
+
+    for line in iter_lines(chunks):
+        header = RECORD_RE.match(line)
+        if header:
+            ts = header.group(1).decode()
+            if current is None or current["length"] >= part_size:
+                new_part(ts)
+            current["records"] += 1
+            current["last_ts"] = ts
+        elif current is None:
+            new_part(None)
+        pending.append(line)
+        pending_size += len(line)
+        current["length"] += len(line)
+        offset += len(line)
+        if pending_size >= READ_CHUNK:
+            flush()
+
+    if current:
+        flush()
+        current["writer"].close()
+    for w in writers:
+        w.join()
+        if w.error:
+            raise w.error
+    for part in parts:
+        del part["writer"]
+        print(f"Saved: {part['file']} ({part['length']} bytes, {part['records']} records, "
+              f"{part['first_ts']} .. {part['last_ts']})")
+    return parts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Split timeline1.txt into parts on record boundaries")
+    parser.add_argument("--input", help="Local timeline (plain or .gz) instead of downloading FILE_URL")
+    parser.add_argument("--url", default=FILE_URL)
+    parser.add_argument("--parts", type=int, default=PARTS, help="Number of parts when the size is known")
+    parser.add_argument("--part-size", type=int, help="Target part size in bytes (overrides --parts)")
+    parser.add_argument("--output-dir", default=OUTPUT_DIR)
+    parser.add_argument("--no-push", action="store_true", help="Do not commit and push the parts")
+    args = parser.parse_args()
+
+    chunks, size = open_source(args.input, args.url)
+    part_size = args.part_size or (math.ceil(size / args.parts) if size else PART_SIZE)
+    print(f"Splitting into parts of ~{part_size} bytes" + (f" (source {size} bytes)" if size else ""))
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    parts = split_stream(chunks, part_size, args.output_dir)
+
+    manifest_path = os.path.join(args.output_dir, MANIFEST)
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump({"source": args.input or args.url, "bytes": sum(p["length"] for p in parts),
+                   "records": sum(p["records"] for p in parts), "parts": parts}, f, indent=1)
+    print(f"Manifest: {manifest_path}")
+
+    if args.no_push:
+        return
+
+    # --------------------------------------
+    # GIT ADD + COMMIT + PUSH
+    # --------------------------------------
+    print("Committing and pushing to GitHub...")
+
+    filenames = [os.path.join(args.output_dir, p["file"]) for p in parts] + [manifest_path]
+    subprocess.run(["git", "add"] + filenames, check=True)
+    subprocess.run(["git", "commit", "-m", "Added split timeline1 parts"], check=True)
+    subprocess.run(["git", "push"], check=True)
+
+    print("Done! Files uploaded to your repository.")
 
-subprocess.run(["git", "add"] + filenames, check=True)
-subprocess.run(["git", "commit", "-m", "Added split timeline1 parts"], check=True)
-subprocess.run(["git", "push"], check=True)
 
-print("Done! Files uploaded to your repository.")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
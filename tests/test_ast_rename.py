@@ -0,0 +1,52 @@
+import json
+import shutil
+import subprocess
+from pathlib import Path
+
+import pytest
+
+TOOLS = Path(__file__).resolve().parent.parent / "tools"
+
+
+def have_parser():
+    if shutil.which("node") is None:
+        return False
+    return subprocess.run(["node", "-e", "require('recast'); require('@babel/parser')"], cwd=TOOLS,
+                          capture_output=True).returncode == 0
+
+
+pytestmark = pytest.mark.skipif(not have_parser(), reason="node with recast and @babel/parser is required")
+
+RUN = """
+const { transform } = require('./ast_core.js');
+const { renamePass } = require('./ast_rename.js');
+const pass = renamePass({ quiet: true });
+const { code, stats } = transform(require('fs').readFileSync(0, 'utf8'), [pass]);
+console.log(JSON.stringify({ code, stats: stats.ast_rename, renames: pass.renames }));
+"""
+
+
+def rename(src):
+    out = subprocess.run(["node", "-e", RUN], input=src, cwd=TOOLS, capture_output=True, text=True,
+                         timeout=60, check=True)
+    return json.loads(out.stdout)
+
+
+def run_js(src):
+    return subprocess.run(["node", "-e", src], capture_output=True, text=True, timeout=60, check=True).stdout
+
+
+def test_renames_minified_locals():
+    src = "function f(a) { var b = a + 1; return b; }\nconsole.log(f(1));\n"
+    result = rename(src)
+    assert {r["from"] for r in result["renames"]} == {"a", "b"}
+    assert run_js(result["code"]) == run_js(src) == "2\n"
+
+
+def test_var_redeclaring_catch_param_keeps_behaviour():
+    src = ("function f() { var r = []; try { throw 1 } catch (e) { var e = 5; r.push(e) } r.push(e); return r; }\n"
+           "console.log(JSON.stringify(f()));\n")
+    result = rename(src)
+    assert run_js(result["code"]) == run_js(src) == "[5,null]\n"
+    assert "e" not in {r["from"] for r in result["renames"]}
+    assert result["stats"]["skipped_catch_var"] == 2
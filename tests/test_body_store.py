@@ -0,0 +1,40 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from body_store import BodyStore, StoreStats
+
+
+def put_all(root, bodies):
+    store = BodyStore(root)
+    return [store.put([b]) for b in bodies]
+
+
+def test_put_dedups(tmp_path):
+    store = BodyStore(str(tmp_path))
+    h, size, written = store.put(["hello ", b"world"])
+    assert size == 11 and written > 0
+    assert store.put([b"hello world"]) == (h, 11, 0)
+    assert store.get(h) == b"hello world"
+    assert os.listdir(store.tmp) == []
+
+
+def test_lost_race_is_not_new(tmp_path):
+    store = BodyStore(str(tmp_path))
+    h = store.put([b"body"])[0]
+    # a second process that checked find() before the first one published the object
+    store.find = lambda body_hash: None
+    assert store.put([b"body"]) == (h, 4, 0)
+    assert os.listdir(store.tmp) == []
+
+
+def test_parallel_writers_count_each_object_once(tmp_path):
+    bodies = [f"body {i}".encode() * 1000 for i in range(3)]
+    stats = StoreStats()
+    with ProcessPoolExecutor(4) as pool:
+        for results in pool.map(put_all, [str(tmp_path)] * 8, [bodies] * 8):
+            for r in results:
+                stats.add(*r)
+    summary = stats.summary()
+    assert summary["unique"] == 3
+    assert summary["new_objects"] == 3
+    assert BodyStore(str(tmp_path)).disk_usage()[0] == 3
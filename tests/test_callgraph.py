@@ -0,0 +1,40 @@
+import callgraph
+from jsscan import scan
+
+CALLBACKS = ('function load(u){ return new Promise(function(res){ fetch(u).then(res); }); } '
+             'function outer(){ return load("/x"); } '
+             'function viaArrow(){ [1].forEach(x => fetch("/y")); } '
+             'function top(){ viaArrow(); } '
+             'function unrelated(){ return 1; }')
+
+
+def graph_of(src, tmp_path):
+    funcs, calls, _, refs = scan(src, api=True, graph=True)
+    path = str(tmp_path / "graph.bin")
+    callgraph.save(path, *callgraph.build(src, funcs, calls, refs))
+    return callgraph.Graph(path)
+
+
+def names(graph, result):
+    return {graph.names[n] for n in result}
+
+
+def test_callers_of_api_through_callbacks(tmp_path):
+    graph = graph_of(CALLBACKS, tmp_path)
+    result = callgraph.query(graph, targets=["api:fetch"])
+    assert names(graph, result) == {"load", "outer", "viaArrow", "top", "<anonymous>"}
+    assert sum(graph.names[n] == "<anonymous>" for n in result) == 2
+
+
+def test_reach_from_function_includes_callbacks(tmp_path):
+    graph = graph_of(CALLBACKS, tmp_path)
+    result = callgraph.query(graph, sources=["outer"])
+    assert names(graph, result) == {"outer", "load", "<anonymous>"}
+    assert names(graph, callgraph.query(graph, sources=["top"], targets=["api:fetch"])) == \
+        {"top", "viaArrow", "<anonymous>"}
+
+
+def test_top_level_iife_is_root(tmp_path):
+    graph = graph_of("(function(){ function a(){ fetch('/z'); } a(); })();", tmp_path)
+    assert [graph.names[n] for n in graph.roots] == ["<anonymous>"]
+    assert names(graph, graph.reach(list(graph.roots))) == {"<anonymous>", "a"}
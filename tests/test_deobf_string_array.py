@@ -0,0 +1,60 @@
+import json
+import shutil
+import subprocess
+from pathlib import Path
+
+import pytest
+
+TOOLS = Path(__file__).resolve().parent.parent / "tools"
+
+
+
+def have_parser():
+    if shutil.which("node") is None:
+        return False
+    return subprocess.run(["node", "-e", "require('recast'); require('@babel/parser')"], cwd=TOOLS,
+                          capture_output=True).returncode == 0
+
+
+pytestmark = pytest.mark.skipif(not have_parser(), reason="node with recast and @babel/parser is required")
+
+RUN = """
+const { transform } = require('./ast_core.js');
+const { stringArrayPass } = require('./deobf_string_array.js');
+const { code, stats } = transform(require('fs').readFileSync(0, 'utf8'), [stringArrayPass({ quiet: true })]);
+console.log(JSON.stringify({ code, stats: stats.string_array }));
+"""
+
+
+def run_pass(src, timeout=60):
+    out = subprocess.run(["node", "-e", RUN], input=src, cwd=TOOLS, capture_output=True, text=True,
+                         timeout=timeout, check=True)
+    return json.loads(out.stdout)
+
+
+def test_inlines_decoder_calls():
+    result = run_pass("""
+var _0xa = ['hello', 'world'];
+function _0xd(i) { i = i - 0x0; return _0xa[i]; }
+console.log(_0xd(0x0), _0xd(0x1));
+""")
+    assert result["stats"]["inlined"] == 2
+    assert "'hello'" in result["code"] or '"hello"' in result["code"]
+    assert "_0xa" not in result["code"]
+
+
+def test_looping_decoder_times_out():
+    result = run_pass("""
+var _0xa = ['hello', 'world'];
+function _0xd(i) { i = i - 0x0; if (i === 1) { for (;;) {} } return _0xa[i]; }
+console.log(_0xd(0x0));
+console.log(_0xd(0x1));
+console.log(_0xd(0x0), _0xd(0x1));
+""")
+    stats = result["stats"]
+    assert stats["timeouts"] == 1
+    assert stats["call_sites"] == 4
+    assert stats["inlined"] == 1
+    assert stats["failed"] == 3
+    assert stats["groups_removed"] == 0
+    assert "function _0xd" in result["code"]
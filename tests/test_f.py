@@ -0,0 +1,87 @@
+import random
+import re
+import time
+
+import f
+
+
+def reference(js, functions, keywords):
+    """Прежний поиск: каждое слово — отдельно."""
+    results = []
+    for fn in functions:
+        body = js[fn["body_start"]:fn["body_end"]]
+        by_cat = {}
+        for cat, words in keywords.items():
+            for w in words:
+                n = len(re.findall(r"\b" + re.escape(w) + r"\b", body, re.IGNORECASE))
+                if n:
+                    by_cat.setdefault(cat, {})[w.lower()] = n
+        results.append(by_cat)
+    return results
+
+
+def sample(words, n=200, seed=0):
+    """n тел "{...}" из слов, их склеек и разделителей."""
+    rng = random.Random(seed)
+    pieces = words + ["x", "over_", "gameover", "(", ".", " "]
+    js, functions = "", []
+    for _ in range(n):
+        body = "".join(rng.choice(pieces) + rng.choice(" .(_") for _ in range(rng.randrange(1, 12)))
+        functions.append({"body_start": len(js) + 1, "body_end": len(js) + 1 + len(body)})
+        js += "{" + body + "}"
+    return js, functions
+
+
+def test_default_keywords_match_per_keyword_search():
+    words = [w for ws in f.KEYWORDS.values() for w in ws]
+    js, functions = sample(words)
+    assert len(f.compile_keywords(f.KEYWORDS)[0]) == 1
+    assert f.categorize(js, functions, f.KEYWORDS) == reference(js, functions, f.KEYWORDS)
+
+
+def test_overlapping_keywords_keep_every_category():
+    keywords = {"crash": ["game", "bet"], "end": ["Game Over"], "time": ["over time"], "other": ["over"]}
+    js = "if (game over time) bet(); game.over"
+    functions = [{"body_start": 0, "body_end": len(js)}]
+    assert f.categorize(js, functions, keywords) == [{
+        "crash": {"game": 2, "bet": 1},
+        "end": {"game over": 1},
+        "time": {"over time": 1},
+        "other": {"over": 2},
+    }]
+    js, functions = sample(["game", "game over", "over time", "over", "bet"], seed=1)
+    assert f.categorize(js, functions, keywords) == reference(js, functions, keywords)
+
+
+def test_keywords_overlap():
+    assert f.keywords_overlap("game", "game over")
+    assert f.keywords_overlap("game over", "over time")
+    assert f.keywords_overlap("over", "game over")
+    assert not f.keywords_overlap("mod", "modal")
+    assert not f.keywords_overlap("avatar", "role")
+
+
+def test_diff_categories():
+    last = {"categories": {"chat": [["send", "h1"], ["recv", "h2"], ["gone", "h3"]], "old": [["x", "h9"]]}}
+    functions = [{"id": 0, "name": "send", "hash": "h1"}, {"id": 1, "name": "recv", "hash": "h4"},
+                 {"id": 2, "name": "<anonymous>", "hash": "h5"}]
+    results = [{"chat": {"msg": 1}}, {"chat": {"msg": 2}}, {"chat": {"socket": 1}}]
+    assert f.diff_categories(last, functions, results) == {
+        "chat": {
+            "added": [{"id": 2, "name": "<anonymous>", "hash": "h5"}],
+            "removed": [{"name": "gone", "hash": "h3"}],
+            "changed": [{"id": 1, "name": "recv", "old_hash": "h2", "hash": "h4"}],
+        },
+        "old": {"added": [], "removed": [{"name": "x", "hash": "h9"}], "changed": []},
+    }
+
+
+def test_diff_categories_is_linear():
+    n = 40000
+    last = {"categories": {"chat": [[f"fn{i}", f"old{i}"] for i in range(n)]}}
+    functions = [{"id": i, "name": f"fn{i}" if i % 2 else f"renamed{i}", "hash": f"new{i}"} for i in range(n)]
+    results = [{"chat": {"msg": 1}}] * n
+    t0 = time.perf_counter()
+    diff = f.diff_categories(last, functions, results)["chat"]
+    assert time.perf_counter() - t0 < 2
+    assert (len(diff["added"]), len(diff["removed"]), len(diff["changed"])) == (n // 2, n // 2, n // 2)
@@ -0,0 +1,45 @@
+from jsscan import extract_functions
+
+
+def names(src):
+    return [(f["kind"], f["name"], src[f["start"]:f["end"]]) for f in extract_functions(src)]
+
+
+def test_function_forms():
+    src = "function a(x) { return x } var b = function () {}; const c = async (y) => y * 2; o = {d() {}, 'e': z => {}}"
+    assert names(src) == [
+        ("function", "a", "function a(x) { return x }"),
+        ("function", "b", "function () {}"),
+        ("arrow", "c", "async (y) => y * 2"),
+        ("method", "d", "d() {}"),
+        ("arrow", "e", "z => {}"),
+    ]
+
+
+def test_strings_regex_templates_do_not_break_braces():
+    src = "f = () => { s = '}'; r = /}/g; t = `${'}'}`; }"
+    assert names(src) == [("arrow", "f", src[4:])]
+
+
+def test_ternary_branches_take_assignment_target():
+    src = "x = a ? () => 1 : () => 2;"
+    assert names(src) == [("arrow", "x", "() => 1"), ("arrow", "x", "() => 2")]
+
+
+def test_ternary_branches_in_object_and_nested():
+    src = "var o = {k: c ? function () {} : (a) => a, m: () => 0}; y = c ? d ? () => 1 : () => 2 : () => 3"
+    assert [n for _, n, _ in names(src)] == ["k", "k", "m", "y", "y", "y"]
+
+
+def test_ternary_without_target_is_anonymous():
+    assert [n for _, n, _ in names("f(a ? b : () => 1); g = (c ? () => 1 : () => 2)")] == ["<anonymous>"] * 3
+
+
+def test_concise_arrow_ends_before_else():
+    src = "if (x) y = () => 1\nelse z = () => 2\ntry { a() } catch (e) { w = () => p.catch(q).finally(r) }"
+    assert [s for _, _, s in names(src)] == ["() => 1", "() => 2", "() => p.catch(q).finally(r)"]
+
+
+def test_concise_arrow_ends_before_case():
+    src = "switch (k) {\ncase 1: f = () => a\ncase 2: g = () => b.default\ndefault: h = () => c\n}"
+    assert [s for _, _, s in names(src)] == ["() => a", "() => b.default", "() => c"]
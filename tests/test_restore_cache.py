@@ -0,0 +1,63 @@
+import threading
+
+from restore_cache import PassCache
+
+
+def make_outputs(tmp_path, text):
+    src = tmp_path / "in.js"
+    src.write_text(text)
+    out = tmp_path / "in.js.beautified.js"
+    out.write_text(text + " // beautified")
+    return src, out
+
+
+def test_put_get_roundtrip(tmp_path):
+    cache = PassCache(tmp_path / "cache", log=lambda msg: None)
+    src, out = make_outputs(tmp_path, "a()")
+    key = cache.key("beautify", src)
+    cache.put(key, "beautify", src, [out])
+    cache.put(key, "beautify", src, [out])
+    restored = cache.get(key, src, tmp_path / "cache")
+    assert [p.read_text() for p in restored] == ["a() // beautified"]
+
+
+def test_concurrent_writers_of_one_key(tmp_path):
+    cache = PassCache(tmp_path / "cache", log=lambda msg: None)
+    src, out = make_outputs(tmp_path, "b()")
+    key = cache.key("beautify", src)
+    errors = []
+    start = threading.Barrier(8)
+
+    def writer():
+        start.wait()
+        try:
+            cache.put(key, "beautify", src, [out])
+        except OSError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=writer) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
+    entry = cache._entry(key)
+    assert sorted(p.name for p in entry.parent.iterdir()) == [entry.name]
+    assert cache.get(key, src, tmp_path) is not None
+
+
+def test_lost_replace_is_a_hit(tmp_path, monkeypatch):
+    cache = PassCache(tmp_path / "cache", log=lambda msg: None)
+    src, out = make_outputs(tmp_path, "c()")
+    key = cache.key("beautify", src)
+    cache.put(key, "beautify", src, [out])
+    # this writer checked for the entry before the other one published it
+    path_type = type(cache._entry(key))
+    real_exists = path_type.exists
+    calls = []
+    monkeypatch.setattr(path_type, "exists", lambda p: (calls.append(p), len(calls) > 1 and real_exists(p))[1])
+    cache.put(key, "beautify", src, [out])
+    monkeypatch.undo()
+    entry = cache._entry(key)
+    assert sorted(p.name for p in entry.parent.iterdir()) == [entry.name]
+    assert cache.get(key, src, tmp_path) is not None
@@ -0,0 +1,45 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from restore_profile import Profiler
+
+
+def rpc(profiler, cpu_ms, rss_kb, parent=None):
+    with profiler.span("restore_batch", cat="batch", parent=parent):
+        with profiler.span("restore_batch", cat="rpc") as rec:
+            time.sleep(0.02)
+            rec.update(cpu_ms=cpu_ms, peak_rss_kb=rss_kb)
+
+
+def fan_out(profiler, name, cpu_ms, rss_kb, start):
+    with profiler.span(name):
+        start.wait()
+        parent = profiler.current()
+        with ThreadPoolExecutor(2) as ex:
+            list(ex.map(lambda _: rpc(profiler, cpu_ms, rss_kb, parent), range(3)))
+
+
+def test_concurrent_passes_get_only_their_own_rpcs():
+    profiler = Profiler()
+    start = threading.Barrier(2)
+    threads = [threading.Thread(target=fan_out, args=(profiler, "a", 10, 1000, start)),
+               threading.Thread(target=fan_out, args=(profiler, "b", 1, 50, start))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    passes = profiler.summary()
+    assert passes["a"]["cpu_ms"] == 30 and passes["a"]["peak_rss_kb"] == 1000
+    assert passes["b"]["cpu_ms"] == 3 and passes["b"]["peak_rss_kb"] == 50
+
+
+def test_parent_is_innermost_span_of_thread():
+    profiler = Profiler()
+    with profiler.span("outer"):
+        outer = profiler.current()
+        with profiler.span("inner", cat="rpc"):
+            pass
+    assert profiler.current() is None
+    inner = next(s for s in profiler.spans if s["name"] == "inner")
+    assert inner["parent"] == outer
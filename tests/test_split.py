@@ -0,0 +1,27 @@
+import random
+import time
+
+from split import iter_lines
+
+
+def chunked(data, rng):
+    pos = 0
+    while pos < len(data):
+        n = rng.randrange(0, 12)
+        yield data[pos:pos + n]
+        pos += n
+
+
+def test_iter_lines_matches_splitlines():
+    rng = random.Random(0)
+    for data in [b"", b"\n", b"a", b"a\n", b"\n\nab\ncd", b"one\ntwo\n\nthree\n", bytes(rng.choice(b"ab\n") for _ in range(500))]:
+        for _ in range(20):
+            assert list(iter_lines(chunked(data, rng))) == data.splitlines(keepends=True)
+
+
+def test_long_line_is_linear():
+    chunk = b"x" * 1024
+    t0 = time.perf_counter()
+    lines = list(iter_lines([chunk] * 20000 + [b"\nend"]))
+    assert time.perf_counter() - t0 < 2
+    assert [len(line) for line in lines] == [20000 * 1024 + 1, 3]
@@ -0,0 +1,46 @@
+import hashlib
+import sqlite3
+
+import pytest
+
+import timeline_db
+
+BODIES = ["Hello World", "hello world", "nothing here"]
+
+
+def build(tmp_path, fts):
+    timeline = tmp_path / "timeline1.txt"
+    db_path = str(tmp_path / "timeline1.sqlite")
+    index = timeline_db.TimelineIndex(db_path, str(timeline))
+    text = b""
+    for i, body in enumerate(BODIES):
+        data = body.encode()
+        index.add({"ts": f"2024-01-0{i + 1}_00-00-00", "url": f"https://h/{i}", "body_offset": len(text),
+                   "body_len": len(data), "body_hash": hashlib.sha256(data).hexdigest()})
+        text += data + b"\n"
+    timeline.write_bytes(text)
+    index.close(fts=fts)
+    return sqlite3.connect(db_path)
+
+
+def urls(db, contains):
+    return [r["url"] for r in timeline_db.query(db, contains=contains)]
+
+
+@pytest.mark.parametrize("fts", [False, True])
+def test_contains_is_case_sensitive_with_and_without_fts(tmp_path, fts):
+    db = build(tmp_path, fts)
+    assert bool(db.execute("SELECT 1 FROM meta WHERE key = 'fts'").fetchone()) == fts
+    assert urls(db, "Hello") == ["https://h/0"]
+    assert urls(db, "hello") == ["https://h/1"]
+    assert urls(db, "WORLD") == []
+
+
+def test_old_case_insensitive_index_is_not_used(tmp_path):
+    db = build(tmp_path, True)
+    # index built before the tokenizer became case-sensitive
+    db.execute("DROP TABLE bodies")
+    db.execute("CREATE VIRTUAL TABLE bodies USING fts5(body, content='', tokenize='trigram')")
+    db.executemany("INSERT INTO bodies (rowid, body) VALUES (?, ?)", enumerate(BODIES, 1))
+    db.execute("UPDATE meta SET value = '1' WHERE key = 'fts'")
+    assert urls(db, "Hello") == ["https://h/0"]
@@ -0,0 +1,199 @@
+"""
+timeline_blocks.py
+
+Блочно-сжатый timeline: timeline1.txt.gz — последовательность независимых gzip-членов,
+каждый ~BLOCK_SIZE несжатых байт и всегда режется по границе записи (===== ts | url =====).
+Файл остаётся обычным gzip (zcat/gunzip отдают весь timeline), а рядом лежит индекс
+timeline1.txt.gz.idx.json: для каждого блока смещение/длина в .gz, смещение/длина
+в несжатом тексте, первый/последний timestamp и число записей.
+
+По индексу читатель распаковывает только нужные блоки: диапазон времени (iter_lines)
+или произвольный байтовый диапазон несжатого текста (BlockReader.seek/read — так
+timeline_db.py читает секции по смещениям из timeline1.sqlite).
+
+zstd был бы быстрее, но zstandard не в стандартной библиотеке; gzip-члены читаются
+везде без зависимостей.
+"""
+
+import bisect
+import gzip
+import json
+import os
+import re
+import zlib
+
+BLOCK_SIZE = 1 << 20
+LEVEL = 6
+HEADER_RE = re.compile(r"^===== (\S+) \| ")
+
+
+def index_path(path):
+    return path + ".idx.json"
+
+
+def normalize_ts(value):
+    """'2025-12-09 09:42:51' / '2025-12-09T09:42' → формат TIMESTAMP_RE ('2025-12-09_09-42-51')."""
+    return re.sub(r"[:.]", "-", re.sub(r"[ T]", "_", value.strip()))
+
+
+def ts_bounds(since=None, until=None):
+    """Нормализованные границы; until — включительный префикс ('2025-12-09_10' — весь час)."""
+    return (normalize_ts(since) if since else None,
+            normalize_ts(until) + "~" if until else None)
+
+
+class BlockWriter:
+    """
+    Файлоподобный приёмник для history.TimelineWriter: write() копит байты, mark(ts)
+    отмечает начало записи — только там может закончиться блок.
+    """
+
+    def __init__(self, path, block_size=BLOCK_SIZE, level=LEVEL):
+        self.path = path
+        self.block_size = block_size
+        self.level = level
+        self.out = open(path, "wb")
+        self.buf = []
+        self.buffered = 0
+        self.raw_offset = 0
+        self.blocks = []
+        self.first_ts = self.last_ts = None
+        self.records = 0
+
+    def write(self, data):
+        self.buf.append(data)
+        self.buffered += len(data)
+
+    def mark(self, timestamp):
+        if self.buffered >= self.block_size:
+            self.flush()
+        if self.first_ts is None:
+            self.first_ts = timestamp
+        self.last_ts = timestamp
+        self.records += 1
+
+    def flush(self):
+        if not self.buffered:
+            return
+        data = gzip.compress(b"".join(self.buf), compresslevel=self.level, mtime=0)
+        self.blocks.append({
+            "offset": self.out.tell(),
+            "length": len(data),
+            "raw_offset": self.raw_offset,
+            "raw_length": self.buffered,
+            "first_ts": self.first_ts,
+            "last_ts": self.last_ts,
+            "records": self.records,
+        })
+        self.out.write(data)
+        self.raw_offset += self.buffered
+        self.buf = []
+        self.buffered = 0
+        self.first_ts = self.last_ts = None
+        self.records = 0
+
+    def close(self):
+        self.flush()
+        self.out.close()
+        with open(index_path(self.path), "w", encoding="utf-8") as f:
+            json.dump({"format": "gzip-members", "block_size": self.block_size,
+                       "raw_size": self.raw_offset, "size": os.path.getsize(self.path),
+                       "blocks": self.blocks}, f, indent=1)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class BlockReader:
+    """Несжатый timeline как файл с seek/read; распаковывается только затронутый блок."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(index_path(path), encoding="utf-8") as f:
+            self.index = json.load(f)
+        self.blocks = self.index["blocks"]
+        self.starts = [b["raw_offset"] for b in self.blocks]
+        self.f = open(path, "rb")
+        self.pos = 0
+        self.cached = (None, b"")
+
+    def block(self, i):
+        if self.cached[0] != i:
+            b = self.blocks[i]
+            self.f.seek(b["offset"])
+            self.cached = (i, zlib.decompress(self.f.read(b["length"]), wbits=31))
+        return self.cached[1]
+
+    def seek(self, pos):
+        self.pos = pos
+
+    def tell(self):
+        return self.pos
+
+    def read(self, n=-1):
+        end = self.index["raw_size"] if n < 0 else min(self.pos + n, self.index["raw_size"])
+        parts = []
+        while self.pos < end:
+            i = bisect.bisect_right(self.starts, self.pos) - 1
+            data = self.block(i)
+            start = self.pos - self.starts[i]
+            piece = data[start:start + end - self.pos]
+            parts.append(piece)
+            self.pos += len(piece)
+        return b"".join(parts)
+
+    def blocks_between(self, since=None, until=None):
+        """Номера блоков, пересекающих [since, until] (границы уже нормализованы)."""
+        return [i for i, b in enumerate(self.blocks)
+                if (since is None or b["last_ts"] >= since) and (until is None or b["first_ts"] <= until)]
+
+    def close(self):
+        self.f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_timeline(path):
+    """Файл для seek/read по смещениям несжатого timeline — блочный или обычный."""
+    if os.path.exists(index_path(path)):
+        return BlockReader(path)
+    return open(path, "rb")
+
+
+def iter_lines(path, since=None, until=None):
+    """
+    Строки записей timeline с since <= ts <= until. Для блочного файла распаковываются
+    только блоки, пересекающие интервал; обычный файл читается целиком.
+    """
+    since, until = ts_bounds(since, until)
+    if os.path.exists(index_path(path)):
+        with BlockReader(path) as reader:
+            chunks = (reader.block(i).decode("utf-8", errors="ignore").splitlines(keepends=True)
+                      for i in reader.blocks_between(since, until))
+            yield from filter_records((line for chunk in chunks for line in chunk), since, until)
+        return
+    with open(path, encoding="utf-8", errors="ignore") as f:
+        yield from filter_records(f, since, until)
+
+
+def filter_records(lines, since, until):
+    if since is None and until is None:
+        yield from lines
+        return
+    keep = False
+    for line in lines:
+        header = HEADER_RE.match(line)
+        if header:
+            ts = header.group(1)
+            if until is not None and ts > until:
+                return
+            keep = since is None or ts >= since
+        if keep:
+            yield line
@@ -0,0 +1,286 @@
+"""
+timeline_db.py
+
+Индекс timeline1.txt в SQLite: одна строка на обмен (timestamp, URL, host, path, метод,
+статус, байтовые смещения секций REQUEST/RESPONSE/BODY в timeline и sha256 тела).
+Индексы по времени, host, path и статусу, так что выборки вида «все /api/... между T1 и T2»
+или «ответы 5xx» не требуют чтения всего файла; сами секции читаются по смещениям.
+
+Поиск по содержимому тел: с --fts строится полнотекстовый индекс FTS5 (trigram,
+без хранения текста) — подстроки от 3 символов ищутся по индексу. Без него тела
+кандидатов читаются из timeline по смещениям. Поиск в обоих случаях с учётом регистра;
+индекс старого формата (без учёта регистра) не используется — пересоберите его --build-fts. Timeline может быть и блочно-сжатым
+(history.py --blocks, timeline_blocks.py) — смещения всегда в несжатом тексте.
+
+Запись: history.py (TimelineIndex). Запросы:
+  python3 timeline_db.py History/timeline1.sqlite [--since T1] [--until T2] [--host H]
+                         [--path /api/] [--method POST] [--status 5xx] [--contains TEXT]
+                         [--limit N] [--show request|response|body]
+"""
+
+import argparse
+import os
+import re
+import sqlite3
+import sys
+import time
+from urllib.parse import urlsplit
+
+from body_store import REF_RE, BodyStore
+from timeline_blocks import open_timeline, ts_bounds
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS exchanges (
+    id INTEGER PRIMARY KEY,
+    ts TEXT NOT NULL,
+    url TEXT,
+    host TEXT,
+    path TEXT,
+    method TEXT,
+    status INTEGER,
+    block_offset INTEGER,
+    req_offset INTEGER, req_len INTEGER,
+    resp_offset INTEGER, resp_len INTEGER,
+    body_offset INTEGER, body_len INTEGER,
+    body_hash TEXT
+);
+CREATE INDEX IF NOT EXISTS exchanges_ts ON exchanges (ts);
+CREATE INDEX IF NOT EXISTS exchanges_host ON exchanges (host, ts);
+CREATE INDEX IF NOT EXISTS exchanges_path ON exchanges (path, ts);
+CREATE INDEX IF NOT EXISTS exchanges_status ON exchanges (status, ts);
+CREATE INDEX IF NOT EXISTS exchanges_body_hash ON exchanges (body_hash);
+"""
+COLUMNS = ["ts", "url", "host", "path", "method", "status", "block_offset", "req_offset", "req_len",
+           "resp_offset", "resp_len", "body_offset", "body_len", "body_hash"]
+INSERT_BATCH = 1000
+# тела, которые history.py пишет заглушкой вместо содержимого (в индексе без хеша)
+PLACEHOLDERS = {"(binary or unknown)", "(unreadable)"}
+# с учётом регистра, как и поиск по телам без индекса (scan in body)
+FTS_TOKENIZE = "trigram case_sensitive 1"
+
+METHOD_RE = re.compile(r"^\s*(?:Method:\s*)?(GET|POST|PUT|DELETE|PATCH|HEAD|OPTIONS|CONNECT|TRACE)\b", re.M | re.I)
+STATUS_RE = re.compile(r"^\s*(?:HTTP/[\d.]+\s+|Status(?:[ -]?code)?:\s*)(\d{3})\b", re.M | re.I)
+
+
+def exchange_meta(url, request, response):
+    """host/path из URL, метод из запроса, статус из ответа (None, если не нашлись)."""
+    parts = urlsplit(url) if url and url != "UNKNOWN" else None
+    method = METHOD_RE.search(request or "")
+    status = STATUS_RE.search(response or "")
+    return {
+        "host": parts.hostname if parts else None,
+        "path": parts.path if parts else None,
+        "method": method.group(1).upper() if method else None,
+        "status": int(status.group(1)) if status else None,
+    }
+
+
+class TimelineIndex:
+    """Пишет индекс одного timeline; файл пересоздаётся, записи вставляются пачками."""
+
+    def __init__(self, db_path, timeline_path, body_store=None):
+        self.path = db_path
+        tmp = db_path + ".tmp"
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        self.tmp = tmp
+        self.db = sqlite3.connect(tmp)
+        self.db.execute("PRAGMA journal_mode=OFF")
+        self.db.execute("PRAGMA synchronous=OFF")
+        self.db.executescript(SCHEMA)
+        base = os.path.dirname(os.path.abspath(db_path))
+        meta = [("timeline", os.path.relpath(timeline_path, base)), ("created", str(time.time()))]
+        if body_store:
+            meta.append(("body_store", os.path.relpath(body_store, base)))
+        self.db.executemany("INSERT INTO meta VALUES (?, ?)", meta)
+        self.pending = []
+        self.count = 0
+
+    def add(self, rec):
+        self.pending.append(tuple(rec.get(c) for c in COLUMNS))
+        if len(self.pending) >= INSERT_BATCH:
+            self.flush()
+
+    def flush(self):
+        if self.pending:
+            self.db.executemany(f"INSERT INTO exchanges ({', '.join(COLUMNS)}) VALUES "
+                                f"({', '.join('?' * len(COLUMNS))})", self.pending)
+            self.count += len(self.pending)
+            self.pending = []
+
+    def close(self, fts=False):
+        self.flush()
+        self.db.commit()
+        if fts:
+            build_fts(self.db, timeline_of(self.db, self.tmp), store_of(self.db, self.tmp))
+        self.db.close()
+        os.replace(self.tmp, self.path)
+        return self.count
+
+
+def meta_path(db, db_path, key):
+    row = db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+    return row and os.path.join(os.path.dirname(os.path.abspath(db_path)), row[0])
+
+
+def timeline_of(db, db_path):
+    return meta_path(db, db_path, "timeline")
+
+
+def store_of(db, db_path):
+    root = meta_path(db, db_path, "body_store")
+    return BodyStore(root) if root else None
+
+
+def read_range(f, offset, length, store=None):
+    """Секция по смещению; ссылка на хранилище тел (history.py --body-store) разворачивается."""
+    f.seek(offset)
+    text = f.read(length).decode("utf-8", errors="ignore")
+    ref = store and REF_RE.match(text)
+    if ref:
+        return store.get(ref.group(1)).decode("utf-8", errors="ignore")
+    return text
+
+
+def build_fts(db, timeline_path, store=None):
+    """Contentless trigram FTS5 по телам; каждое уникальное тело индексируется один раз."""
+    db.execute("DROP TABLE IF EXISTS bodies")
+    db.execute(f"CREATE VIRTUAL TABLE bodies USING fts5(body, content='', tokenize='{FTS_TOKENIZE}')")
+    seen = set()
+    with open_timeline(timeline_path) as f:
+        rows = db.execute("SELECT id, body_offset, body_len, body_hash FROM exchanges "
+                          "WHERE body_offset IS NOT NULL ORDER BY body_offset").fetchall()
+        for rowid, offset, length, body_hash in rows:
+            if body_hash in seen:
+                continue
+            if body_hash:
+                seen.add(body_hash)
+            db.execute("INSERT INTO bodies (rowid, body) VALUES (?, ?)", (rowid, read_range(f, offset, length, store)))
+    db.execute("INSERT INTO meta VALUES ('fts', ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+               (FTS_TOKENIZE,))
+    db.commit()
+
+
+def status_range(value):
+    value = value.lower()
+    if re.fullmatch(r"[1-5]xx", value):
+        return int(value[0]) * 100, int(value[0]) * 100 + 99
+    return int(value), int(value)
+
+
+def query(db, since=None, until=None, host=None, path=None, method=None, status=None, contains=None, limit=None):
+    where, args = [], []
+    since, until = ts_bounds(since, until)
+    if since:
+        where.append("ts >= ?")
+        args.append(since)
+    if until:
+        where.append("ts <= ?")
+        args.append(until)
+    if host:
+        where.append("host = ?")
+        args.append(host)
+    if path:
+        where.append("path >= ? AND path < ?")
+        args += [path, path + "\uffff"]
+    if method:
+        where.append("method = ?")
+        args.append(method.upper())
+    if status:
+        lo, hi = status_range(status)
+        where.append("status BETWEEN ? AND ?")
+        args += [lo, hi]
+
+    has_fts = db.execute("SELECT 1 FROM meta WHERE key = 'fts' AND value = ?", (FTS_TOKENIZE,)).fetchone()
+    scan = None
+    if contains and has_fts and len(contains) >= 3:
+        # одинаковые тела проиндексированы один раз — ищем по хешу
+        where.append("body_hash IN (SELECT e.body_hash FROM bodies JOIN exchanges e ON e.id = bodies.rowid "
+                     "WHERE bodies MATCH ?)")
+        args.append('"' + contains.replace('"', '""') + '"')
+    elif contains:
+        where.append("body_offset IS NOT NULL")
+        scan = contains
+
+    sql = f"SELECT {', '.join(['id'] + COLUMNS)} FROM exchanges"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY ts"
+    if limit and not scan:
+        sql += f" LIMIT {int(limit)}"
+    rows = (dict(zip(["id"] + COLUMNS, r)) for r in db.execute(sql, args))
+    if scan is None:
+        yield from rows
+        return
+    found = 0
+    store = store_of(db, db_path_of(db))
+    with open_timeline(timeline_of(db, db_path_of(db))) as f:
+        # одно и то же тело (по хешу) проверяется один раз
+        checked = {}
+        for row in rows:
+            hit = checked.get(row["body_hash"])
+            if hit is None:
+                hit = scan in read_range(f, row["body_offset"], row["body_len"], store)
+                if row["body_hash"]:
+                    checked[row["body_hash"]] = hit
+            if hit:
+                yield row
+                found += 1
+                if limit and found >= limit:
+                    return
+
+
+def db_path_of(db):
+    return db.execute("PRAGMA database_list").fetchone()[2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Запросы к индексу timeline (см. history.py)")
+    parser.add_argument("db", nargs="?", default=os.path.join("History", "timeline1.sqlite"))
+    parser.add_argument("--since", help="Начало интервала (2025-12-09_09-42 или 2025-12-09 09:42)")
+    parser.add_argument("--until", help="Конец интервала, включительно")
+    parser.add_argument("--host")
+    parser.add_argument("--path", help="Префикс пути, например /api/")
+    parser.add_argument("--method")
+    parser.add_argument("--status", help="Код или класс: 404, 5xx")
+    parser.add_argument("--contains", help="Подстрока в теле ответа")
+    parser.add_argument("--limit", type=int)
+    parser.add_argument("--show", choices=["request", "response", "body"], help="Печатать секцию целиком")
+    parser.add_argument("--count", action="store_true", help="Только число совпадений")
+    parser.add_argument("--build-fts", action="store_true", help="Построить полнотекстовый индекс тел")
+    args = parser.parse_args()
+
+    db = sqlite3.connect(args.db)
+    if args.build_fts:
+        started = time.perf_counter()
+        build_fts(db, timeline_of(db, args.db), store_of(db, args.db))
+        print(f"[OK] FTS индекс построен за {time.perf_counter() - started:.2f} с", file=sys.stderr)
+        return
+
+    started = time.perf_counter()
+    rows = query(db, args.since, args.until, args.host, args.path, args.method, args.status, args.contains,
+                 args.limit)
+    n = 0
+    timeline = None
+    store = store_of(db, args.db)
+    for row in rows:
+        n += 1
+        if args.count:
+            continue
+        print(f"{row['ts']}  {row['status'] or '---'}  {row['method'] or '-':<7} {row['url']}")
+        if args.show:
+            prefix = {"request": "req", "response": "resp", "body": "body"}[args.show]
+            if row[prefix + "_offset"] is not None:
+                timeline = timeline or open_timeline(timeline_of(db, args.db))
+                print(read_range(timeline, row[prefix + "_offset"], row[prefix + "_len"], store))
+                print()
+    if timeline:
+        timeline.close()
+    if args.count:
+        print(n)
+    print(f"[OK] {n} обменов за {(time.perf_counter() - started) * 1000:.1f} мс", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+// Shared AST plumbing for the recast-based passes.
+// A pass is {name, visitor: {<NodeType>: fn(path)}, leave?: {<NodeType>: fn(path)},
+// finish(ast) -> stats}. leave handlers run after the node's children. Visitors only
+// record what they need; all tree edits happen in finish(), so several passes can share
+// one parse and one traversal (see pipeline.js).
+const recast = require('recast');
+const { visit, namedTypes: n, getSupertypeNames } = recast.types;
+
+function parse(code) {
+  try {
+    return recast.parse(code, { parser: require("recast/parsers/babel") });
+  } catch(e) {
+    console.error("Error parsing AST:", e);
+    return recast.parse(code, { parser: require("recast/parsers/acorn") });
+  }
+}
+
+// Like ast-types' own dispatch, each pass gets the handler for the most specific
+// type it defines (StringLiteral -> Literal -> Expression -> Node), once per node.
+function combine(passes) {
+  const table = new Map();
+  function pick(names, handlers, list) {
+    const hit = handlers && names.find(t => handlers[t]);
+    if(hit) list.push(handlers[hit]);
+  }
+  function handlersFor(type) {
+    let entry = table.get(type);
+    if(!entry) {
+      const names = [type].concat(getSupertypeNames(type));
+      entry = { enter: [], leave: [] };
+      for(const pass of passes) {
+        pick(names, pass.visitor, entry.enter);
+        pick(names, pass.leave, entry.leave);
+      }
+      table.set(type, entry);
+    }
+    return entry;
+  }
+  return {
+    visitNode(path) {
+      const { enter, leave } = handlersFor(path.node.type);
+      for(let i = 0; i < enter.length; i++) enter[i](path);
+      this.traverse(path);
+      for(let i = leave.length - 1; i >= 0; i--) leave[i](path);
+    }
+  };
+}
+
+function transform(code, passes, { pretty = false } = {}) {
+  const ast = parse(code);
+  visit(ast, combine(passes));
+  const stats = {};
+  for(const pass of passes) stats[pass.name] = pass.finish(ast);
+  const out = pretty ? recast.prettyPrint(ast, { tabWidth: 2 }).code : recast.print(ast).code;
+  return { code: out, stats };
+}
+
+// String/number value of a literal node for both babel and ESTree trees, else undefined.
+function literalValue(node) {
+  if(!node) return undefined;
+  if(n.StringLiteral.check(node) || n.NumericLiteral.check(node)) return node.value;
+  if(node.type === 'Literal' && (typeof node.value === 'string' || typeof node.value === 'number')) return node.value;
+  if(node.type === 'UnaryExpression' && node.operator === '-') {
+    const v = literalValue(node.argument);
+    return typeof v === 'number' ? -v : undefined;
+  }
+  return undefined;
+}
+
+module.exports = { parse, combine, transform, literalValue };
@@ -1,58 +1,257 @@
+// Scope-aware renamer. One traversal builds a symbol table per scope (function, block,
+// catch, for, class); references are resolved against it afterwards, so a minified name
+// that is reused in thousands of functions is renamed per binding, not once globally.
+// New names are unique in the whole file and never collide with an existing name, so no
+// binding can capture or shadow another one. Program-level bindings (globals shared with
+// other scripts) and scopes that can see a direct eval() or a with statement are left alone.
 const fs = require('fs');
 const path = require('path');
-const recast = require('recast');
-const { visit } = recast.types;
-const [,, src, outdir] = process.argv;
-if(!src || !outdir) throw "usage";
-const code = fs.readFileSync(src,'utf8');
-let ast = recast.parse(code, { parser: require("recast/parsers/babel") });
-const cand = {};
-visit(ast, {
-  visitLiteral(path) {
-    const v = path.node.value;
-    if(typeof v === 'string' && /^[A-Za-z_$][A-Za-z0-9_$-]{2,50}$/.test(v)) {
-      cand[v] = (cand[v]||0)+1;
+const { transform, literalValue } = require('./ast_core.js');
+
+const MINIFIED_RE = /^(?:[A-Za-z][A-Za-z0-9_$]?|_0x[0-9a-fA-F]{3,}|[yn][0-9][a-z]e?)$/;
+const RESERVED = new Set(('break case catch class const continue debugger default delete do else enum export extends ' +
+  'false finally for function if implements import in instanceof interface let new null package private protected ' +
+  'public return static super switch this throw true try typeof var void while with yield await async of ' +
+  'arguments eval undefined NaN Infinity').split(' '));
+const PATTERNS = new Set(['ObjectPattern', 'ArrayPattern', 'RestElement']);
+const PROPERTIES = new Set(['Property', 'ObjectProperty']);
+const FUNCTIONS = new Set(['FunctionDeclaration', 'FunctionExpression', 'ArrowFunctionExpression',
+  'ObjectMethod', 'ClassMethod', 'ClassPrivateMethod']);
+const KEYED = new Set(['Property', 'ObjectProperty', 'ObjectMethod', 'ClassMethod', 'ClassPrivateMethod',
+  'MethodDefinition', 'ClassProperty', 'PropertyDefinition', 'ClassAccessorProperty']);
+const NOT_REFERENCES = new Set(['LabeledStatement', 'BreakStatement', 'ContinueStatement', 'MetaProperty',
+  'PrivateName', 'ImportSpecifier', 'ImportDefaultSpecifier', 'ImportNamespaceSpecifier',
+  'ExportDefaultSpecifier', 'ExportNamespaceSpecifier']);
+
+// Field of the parent node that holds path (list fields report the list name, not the index).
+function fieldOf(path) {
+  return Array.isArray(path.parentPath.value) ? path.parentPath.name : path.name;
+}
+
+function sanitize(hint) {
+  let name = String(hint).replace(/[^A-Za-z0-9_$]+/g, '_').replace(/^_+|_+$/g, '').slice(0, 40);
+  if(!name) return '';
+  if(/^[0-9]/.test(name)) name = '_' + name;
+  return RESERVED.has(name) ? name + '_' : name;
+}
+
+// Name suggestion for `var x = <init>`.
+function initHint(init) {
+  if(!init) return '';
+  if(init.type === 'CallExpression' && init.callee.type === 'Identifier' && init.arguments.length === 1) {
+    const arg = literalValue(init.arguments[0]);
+    if(typeof arg === 'number') return 'mod_' + arg;
+    if(typeof arg === 'string' && init.callee.name === 'require') return arg.split('/').pop().replace(/\.js$/, '');
+  }
+  if(init.type === 'NewExpression' && init.callee.type === 'Identifier' && init.callee.name.length > 2) {
+    return init.callee.name[0].toLowerCase() + init.callee.name.slice(1);
+  }
+  if(init.type === 'MemberExpression') {
+    const prop = init.computed ? literalValue(init.property) : init.property.name;
+    if(typeof prop === 'string' && prop.length > 2) return prop;
+  }
+  if(FUNCTIONS.has(init.type)) return 'fn';
+  if(init.type === 'ArrayExpression') return 'arr';
+  if(init.type === 'ObjectExpression') return 'obj';
+  return '';
+}
+
+function renamePass({ quiet = false } = {}) {
+  const t0 = Date.now();
+  const global = { parent: null, node: null, hoist: true, global: true, bindings: new Map() };
+  let current = global;
+  let scopeCount = 1;
+  const bindings = [];
+  const refs = [];
+  const names = new Set();
+  const pass = { name: 'ast_rename', renames: [] };
+
+  function push(node, hoist) {
+    current = { parent: current, node, hoist, unsafe: false, bindings: new Map() };
+    scopeCount++;
+  }
+  function pop(path) {
+    if(current.node === path.node) current = current.parent;
+  }
+  function hoistScope(scope) {
+    while(!scope.hoist) scope = scope.parent;
+    return scope;
+  }
+  // eval() and with can reach every binding of the enclosing scopes by name.
+  function markUnsafe(scope) {
+    for(; scope && !scope.unsafe; scope = scope.parent) scope.unsafe = true;
+  }
+  function declare(scope, node, kind, prop, hint) {
+    if(scope.global) return;
+    let b = scope.bindings.get(node.name);
+    if(!b) {
+      b = { name: node.name, kind, hint, scope, decl: node, occurrences: [] };
+      scope.bindings.set(node.name, b);
+      bindings.push(b);
+    } else if(!b.hint && hint) {
+      b.hint = hint;
     }
-    this.traverse(path);
-  },
-  visitProperty(path) {
-    const key = path.node.key;
-    if(key && key.type === 'Identifier') {
-      cand[key.name] = (cand[key.name]||0)+1;
+    b.occurrences.push({ node, prop });
+  }
+
+  function identifier(path) {
+    const node = path.node;
+    const parent = path.parent.node;
+    const field = fieldOf(path);
+    names.add(node.name);
+    if(NOT_REFERENCES.has(parent.type)) return;
+    if(KEYED.has(parent.type) && field === 'key' && !parent.computed) return;
+    if((parent.type === 'MemberExpression' || parent.type === 'OptionalMemberExpression') && field === 'property' && !parent.computed) return;
+    if(parent.type === 'ExportSpecifier' && field === 'exported') return;
+
+    // climb out of destructuring patterns to the node that declares them
+    let p = path, prop = null;
+    for(;;) {
+      const up = p.parent.node, f = fieldOf(p);
+      if(PROPERTIES.has(up.type) && f === 'value') {
+        if(up.shorthand && !prop) prop = up;
+        if(p.parent.parent.node.type !== 'ObjectPattern') break;
+      } else if(!PATTERNS.has(up.type) && !(up.type === 'AssignmentPattern' && f === 'left')) {
+        break;
+      }
+      p = p.parent;
     }
-    this.traverse(path);
-  },
-  visitClassDeclaration(path) {
-    if(path.node.id && path.node.id.name) cand[path.node.id.name] = (cand[path.node.id.name]||0)+2;
-    this.traverse(path);
-  }
-});
-const candidates = Object.entries(cand).sort((a,b)=>b[1]-a[1]).map(x=>x[0]).slice(0,500);
-const shortIds = new Set();
-visit(ast, {
-  visitIdentifier(path) {
-    const n = path.node.name;
-    if(/^[a-zA-Z0-9]{1,4}$/.test(n) || /^[yn][0-9][a-z]e?$/.test(n) ) {
-      shortIds.add(n);
+    const ctx = p.parent.node, f = fieldOf(p);
+    if(ctx.type === 'VariableDeclarator' && f === 'id') {
+      const kind = p.parent.parent.node.kind;
+      const hint = p === path ? initHint(ctx.init) : '';
+      if(kind === 'var') {
+        const target = hoistScope(current);
+        declare(target, node, kind, prop, hint);
+        // catch(e){ var e = 1 } (Annex B): the initializer assigns the catch parameter while
+        // e is hoisted to the function, one name for two bindings; neither is renamed
+        for(let s = current; s !== target; s = s.parent) {
+          const caught = s.bindings.get(node.name);
+          if(caught && caught.kind === 'catch') {
+            caught.keep = true;
+            if(target.bindings.has(node.name)) target.bindings.get(node.name).keep = true;
+          }
+        }
+      } else {
+        declare(current, node, kind, prop, hint);
+      }
+    } else if(FUNCTIONS.has(ctx.type) && f === 'params') {
+      declare(current, node, 'param', prop, '');
+    } else if(ctx.type === 'FunctionDeclaration' && f === 'id') {
+      declare(hoistScope(current.parent), node, 'function', prop, 'fn');
+    } else if(ctx.type === 'FunctionExpression' && f === 'id') {
+      declare(current, node, 'function', prop, 'fn');
+    } else if(ctx.type === 'ClassDeclaration' && f === 'id') {
+      declare(current.parent, node, 'class', prop, 'Class');
+    } else if(ctx.type === 'ClassExpression' && f === 'id') {
+      declare(current, node, 'class', prop, 'Class');
+    } else if(ctx.type === 'CatchClause' && f === 'param') {
+      declare(current, node, 'catch', prop, 'err');
+    } else {
+      // x(<number>) calls mark webpack's require parameter
+      const numCall = parent.type === 'CallExpression' && field === 'callee' && parent.arguments.length === 1 &&
+        typeof literalValue(parent.arguments[0]) === 'number';
+      if(node.name === 'eval' && parent.type === 'CallExpression' && field === 'callee') markUnsafe(current);
+      refs.push({ node, prop, scope: current, numCall });
     }
-    this.traverse(path);
   }
-});
-const shortList = Array.from(shortIds);
-const mapping = {};
-for(let i=0;i<shortList.length && i<candidates.length;i++){
-  mapping[shortList[i]] = candidates[i];
-}
-visit(ast, {
-  visitIdentifier(path) {
-    const n = path.node.name;
-    if(mapping[n]) {
-      path.node.name = mapping[n];
+
+  const scoped = {
+    Function(path) { push(path.node, true); },
+    ClassDeclaration(path) { push(path.node, false); },
+    ClassExpression(path) { push(path.node, false); },
+    BlockStatement(path) {
+      const parent = path.parent && path.parent.node;
+      // function and catch bodies share the scope of their parameters
+      if(!parent || !(FUNCTIONS.has(parent.type) || parent.type === 'CatchClause')) push(path.node, false);
+    },
+    CatchClause(path) { push(path.node, false); },
+    ForStatement(path) { push(path.node, false); },
+    ForInStatement(path) { push(path.node, false); },
+    ForOfStatement(path) { push(path.node, false); },
+    SwitchStatement(path) { push(path.node, false); },
+  };
+  pass.visitor = Object.assign({
+    Identifier: identifier,
+    WithStatement() { markUnsafe(current); },
+  }, scoped);
+  pass.leave = {};
+  for(const type of Object.keys(scoped)) pass.leave[type] = pop;
+
+  pass.finish = function() {
+    for(const ref of refs) {
+      for(let s = ref.scope; s; s = s.parent) {
+        const b = s.bindings.get(ref.node.name);
+        if(b) {
+          b.occurrences.push(ref);
+          if(ref.numCall) b.requireCalls = (b.requireCalls || 0) + 1;
+          b.refs = (b.refs || 0) + 1;
+          break;
+        }
+      }
     }
-    this.traverse(path);
-  }
-});
-const out = recast.print(ast).code;
-const outPath = path.join(outdir, path.basename(src) + ".ast_renamed.js");
-fs.writeFileSync(outPath, out, 'utf8');
-console.log("AST rename written:", outPath);
+    const counters = new Map();
+    function fresh(base) {
+      base = sanitize(base) || 'v';
+      if(base.length > 3 && !names.has(base)) {
+        names.add(base);
+        return base;
+      }
+      let i = counters.get(base) || 0, name;
+      do { name = base + '_' + (++i); } while(names.has(name) || RESERVED.has(name));
+      counters.set(base, i);
+      names.add(name);
+      return name;
+    }
+    let renamed = 0, occurrences = 0, skippedUnsafe = 0, skippedCatchVar = 0;
+    for(const b of bindings) {
+      if(!MINIFIED_RE.test(b.name)) continue;
+      if(b.scope.unsafe) { skippedUnsafe++; continue; }
+      if(b.keep) { skippedCatchVar++; continue; }
+      let hint = b.hint;
+      if(!hint && b.kind === 'param') hint = b.requireCalls && b.requireCalls === b.refs ? 'require' : 'arg';
+      const to = fresh(hint || 'v');
+      for(const occ of b.occurrences) {
+        if(occ.prop && occ.prop.shorthand) {
+          // {a} -> {a: v_1}; acorn shares one node between key and value
+          occ.prop.shorthand = false;
+          if(occ.prop.key === occ.node) occ.prop.key = Object.assign({}, occ.node);
+        }
+        occ.node.name = to;
+        occurrences++;
+      }
+      const loc = b.decl.loc && b.decl.loc.start;
+      pass.renames.push({ from: b.name, to, kind: b.kind, line: loc ? loc.line : null, column: loc ? loc.column : null, refs: b.refs || 0 });
+      renamed++;
+    }
+    if(!quiet) console.log("Rename sample:", pass.renames.slice(0, 20).map(r => r.from + '->' + r.to).join(' '));
+    return { scopes: scopeCount, bindings: bindings.length, renamed, occurrences, skipped_unsafe: skippedUnsafe,
+             skipped_catch_var: skippedCatchVar, ms: Date.now() - t0 };
+  };
+  return pass;
+}
+
+function writeRenames(outPath, src, renames) {
+  const mapPath = outPath.replace(/\.js$/, '') + ".renames.json";
+  fs.writeFileSync(mapPath, JSON.stringify({ source: path.basename(src), renames }, null, 1), 'utf8');
+  return mapPath;
+}
+
+function rename(src, outdir) {
+  const code = fs.readFileSync(src,'utf8');
+  const pass = renamePass();
+  const { code: out, stats } = transform(code, [pass]);
+  const outPath = path.join(outdir, path.basename(src) + ".ast_renamed.js");
+  fs.writeFileSync(outPath, out, 'utf8');
+  const mapPath = writeRenames(outPath, src, pass.renames);
+  console.log("AST rename written:", outPath, JSON.stringify(stats.ast_rename));
+  return [outPath, mapPath];
+}
+
+module.exports = { renamePass, rename, writeRenames };
+
+if(require.main === module) {
+  const [,, src, outdir] = process.argv;
+  if(!src || !outdir) throw "usage";
+  rename(src, outdir);
+}
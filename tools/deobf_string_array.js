@@ -1,33 +1,285 @@
+// String-array decoder engine (obfuscator.io style).
+// One traversal records every string array (`var _0xa = ['..']` and the
+// `function _0xa(){var a=[..]; _0xa=function(){return a;}; return _0xa();}` form), every
+// named function that could be a decoder or a decoder wrapper, aliases (`var w = _0xdec`),
+// rotation IIFEs (`(function(arr, 0x1a2b){ ...push(...shift()) ... })(_0xa, 0x1a2b)`) and
+// every call with literal arguments. finish() groups these by array, evaluates each group's
+// own source in a vm sandbox (so rotations, base64/rc4 decoders and offsets behave exactly as
+// at runtime) and inlines every call site whose result is a string. A group's definitions
+// are removed only when every reference to them was inlined.
 const fs = require('fs');
 const path = require('path');
-const [,, src, outdir] = process.argv;
-if(!src || !outdir) throw "usage";
-const code = fs.readFileSync(src,'utf8');
-const arrRegex = /var\s+(_0x[a-f0-9]+)\s*=\s*\[((?:\s*'[^']*'\s*,?|\s*"[^"]*"\s*,?)+)\]\s*;/i;
-let m = code.match(arrRegex);
-let outPath = path.join(outdir, path.basename(src) + ".dearr.js");
-let out = code;
-let replaced = 0;
-if(m){
-  const varName = m[1];
-  const arrText = m[2];
-  const items = Array.from(arrText.matchAll(/'([^']*)'|"([^"]*)"/g)).map(x=> x[1] || x[2]);
-  const decoderRegex = new RegExp("(_0x[0-9a-f]+)\\s*=\\s*function\\([^)]*\\)\\s*\\{[\\s\\S]*?return\\s+"+varName+"\\s*\\[\\s*a\\s*-\\s*(0x[0-9a-f]+|\\d+)\\s*\\]", "i");
-  const dec = code.match(decoderRegex);
-  if(dec){
-    const func = dec[1];
-    const off = parseInt(dec[2], 0);
-    const callRegex = new RegExp(func + "\\(\\s*(0x[0-9a-fA-F]+|\\d+)\\s*\\)", "g");
-    out = out.replace(callRegex, (s, num) => {
-      try{
-        let idx = parseInt(num, 0) - off;
-        if(idx >= 0 && idx < items.length) { replaced++; return JSON.stringify(items[idx]); }
-      }catch(e){}
-      return s;
-    });
-    out = out.replace(arrRegex, '');
-    out = out.replace(decoderRegex, '');
+const vm = require('vm');
+const recast = require('recast');
+const { builders: b } = recast.types;
+const { transform, literalValue } = require('./ast_core.js');
+
+const MAX_CANDIDATE_CHARS = 200000;
+const MAX_DECODER_PARAMS = 5;
+const SANDBOX_TIMEOUT_MS = 5000;
+
+function isStringArray(node) {
+  return node && node.type === 'ArrayExpression' && node.elements.length > 0
+    && node.elements.every(e => typeof literalValue(e) === 'string');
+}
+
+function tooBig(node) {
+  return typeof node.start === 'number' && node.end - node.start > MAX_CANDIDATE_CHARS;
+}
+
+// `return callee(<params/literals/arithmetic>)` as the whole body
+function wrapperTarget(fn) {
+  const body = fn.body && fn.body.type === 'BlockStatement' ? fn.body.body : null;
+  const ret = body ? (body.length === 1 && body[0].type === 'ReturnStatement' && body[0].argument) : fn.body;
+  if(!ret || ret.type !== 'CallExpression' || ret.callee.type !== 'Identifier') return null;
+  const params = new Set(fn.params.map(p => p.type === 'Identifier' && p.name));
+  const pure = e => e.type === 'Identifier' ? params.has(e.name)
+    : literalValue(e) !== undefined ? true
+    : e.type === 'BinaryExpression' ? pure(e.left) && pure(e.right)
+    : e.type === 'UnaryExpression' ? pure(e.argument)
+    : false;
+  return ret.arguments.every(pure) ? ret.callee.name : null;
+}
+
+function stringArrayPass({ quiet = false } = {}) {
+  const defs = new Map();       // name -> [def]
+  const containers = [];        // stack of candidate functions / IIFEs being visited
+  const nameCount = new Map();  // every identifier occurrence, by name
+  const calls = [];
+  const rotations = [];
+
+  function addDef(name, def) {
+    if(!defs.has(name)) defs.set(name, []);
+    defs.get(name).push(def);
+  }
+  function inContainer(name) {
+    return containers.some(c => c && c.name === name);
   }
+  function current() {
+    for(let i = containers.length - 1; i >= 0; i--) if(containers[i]) return containers[i];
+    return null;
+  }
+
+  function enterFunction(path) {
+    const node = path.node;
+    const parent = path.parent && path.parent.node;
+    let name = null, stmt = null, external = null;
+    if(node.type === 'FunctionDeclaration' && node.id) {
+      name = node.id.name; stmt = path;
+    } else if(parent && parent.type === 'VariableDeclarator' && parent.init === node && parent.id.type === 'Identifier') {
+      name = parent.id.name; stmt = path.parent; external = { [name]: 1 };
+    } else if(parent && parent.type === 'AssignmentExpression' && parent.right === node && parent.operator === '='
+              && parent.left.type === 'Identifier' && path.parent.parent.node.type === 'ExpressionStatement') {
+      name = parent.left.name; stmt = path.parent.parent; external = { [name]: 1 };
+    } else if(parent && parent.type === 'CallExpression' && parent.callee === node && parent.arguments.length >= 2
+              && parent.arguments[0].type === 'Identifier' && !tooBig(node)) {
+      // the call arguments are visited after this container is left, count them here
+      external = {};
+      for(const a of parent.arguments) if(a.type === 'Identifier') external[a.name] = (external[a.name] || 0) + 1;
+      const c = { kind: 'rotation', node, call: parent, array: parent.arguments[0].name, external, refs: new Map() };
+      let up = path.parent.parent;
+      if(up.node.type === 'UnaryExpression') up = up.parent;
+      c.stmt = up.node.type === 'ExpressionStatement' ? up : null;
+      rotations.push(c);
+      containers.push(c);
+      return;
+    }
+    // decoders reassign themselves inside their own body; that is not a second definition
+    if(!name || inContainer(name) || tooBig(node) || node.params.length > MAX_DECODER_PARAMS) {
+      containers.push(null);
+      return;
+    }
+    let arrayFn = false;
+    if(node.params.length === 0 && node.body.type === 'BlockStatement') {
+      arrayFn = node.body.body.some(s => s.type === 'VariableDeclaration' && s.declarations.some(d => isStringArray(d.init)));
+    }
+    const c = { kind: 'fn', name, node, stmt, external, arrayFn, refs: new Map() };
+    addDef(name, c);
+    containers.push(c);
+  }
+
+  return {
+    name: 'string_array',
+    visitor: {
+      Function: enterFunction,
+      VariableDeclarator(path) {
+        const { id, init } = path.node;
+        if(id.type !== 'Identifier' || !init) return;
+        const top = current();
+        if(isStringArray(init)) {
+          // the table inside `function _0xa(){var a=[..]; ...}` belongs to _0xa
+          if(!(top && top.arrayFn)) addDef(id.name, { kind: 'array', name: id.name, node: init, stmt: path, external: { [id.name]: 1 } });
+        } else if(init.type === 'Identifier') {
+          addDef(id.name, { kind: 'alias', name: id.name, target: init.name, stmt: path,
+                            external: id.name === init.name ? { [id.name]: 2 } : { [id.name]: 1, [init.name]: 1 } });
+        }
+      },
+      CallExpression(path) {
+        const { callee, arguments: args } = path.node;
+        if(callee.type === 'Identifier' && args.length > 0 && args.every(a => literalValue(a) !== undefined)) {
+          calls.push({ path, callee: callee.name, container: current() });
+        }
+      },
+      Identifier(path) {
+        const name = path.node.name;
+        nameCount.set(name, (nameCount.get(name) || 0) + 1);
+        const c = current();
+        if(c) c.refs.set(name, (c.refs.get(name) || 0) + 1);
+      }
+    },
+    leave: {
+      Function() {
+        containers.pop();
+      }
+    },
+    finish() {
+      const t0 = Date.now();
+      const stats = { arrays: 0, strings: 0, rotations: 0, decoders: 0, wrappers: 0, aliases: 0,
+                      call_sites: 0, inlined: 0, failed: 0, groups: 0, groups_removed: 0, sandbox_errors: 0,
+                      timeouts: 0 };
+      const single = name => defs.get(name) && defs.get(name).length === 1 ? defs.get(name)[0] : null;
+
+      // arrays and decoders
+      const groups = new Map();   // array name -> group
+      const memberOf = new Map(); // function/alias name -> group
+      for(const [name, list] of defs) {
+        const d = single(name);
+        if(d && (d.kind === 'array' || (d.kind === 'fn' && d.arrayFn))) {
+          groups.set(name, { array: d, members: [d], names: new Set([name]), rotations: [] });
+          stats.strings += d.kind === 'array' ? d.node.elements.length : d.node.body.body
+            .filter(s => s.type === 'VariableDeclaration')
+            .reduce((n, s) => n + s.declarations.reduce((k, v) => k + (isStringArray(v.init) ? v.init.elements.length : 0), 0), 0);
+        }
+      }
+      for(const [name] of defs) {
+        const d = single(name);
+        if(!d || d.kind !== 'fn' || d.arrayFn || d.node.params.length === 0) continue;
+        const arr = Array.from(d.refs.keys()).find(r => groups.has(r) && r !== name);
+        if(arr) { d.role = 'decoder'; groups.get(arr).members.push(d); memberOf.set(name, groups.get(arr)); stats.decoders++; }
+      }
+      // wrappers and aliases, until nothing new resolves
+      for(let changed = true; changed;) {
+        changed = false;
+        for(const [name] of defs) {
+          const d = single(name);
+          if(!d || memberOf.has(name) || groups.has(name)) continue;
+          const target = d.kind === 'fn' ? wrapperTarget(d.node) : d.kind === 'alias' ? d.target : null;
+          const g = target && memberOf.get(target);
+          if(!g) continue;
+          d.role = d.kind === 'alias' ? 'alias' : 'wrapper';
+          stats[d.role === 'alias' ? 'aliases' : 'wrappers']++;
+          g.members.push(d);
+          memberOf.set(name, g);
+          changed = true;
+        }
+      }
+      for(const r of rotations) {
+        const g = groups.get(r.array);
+        if(g) { g.rotations.push(r); stats.rotations++; }
+      }
+      for(const g of groups.values()) {
+        for(const m of g.members) g.names.add(m.name);
+        if(g.members.length > 1) stats.groups++;
+      }
+      stats.arrays = groups.size;
+
+      // evaluate each group in its own sandbox, in source order: arrays, functions, rotations
+      const print = node => recast.print(node).code;
+      for(const g of groups.values()) {
+        if(g.members.length < 2) continue;
+        const src = [];
+        for(const m of g.members) {
+          if(m.kind === 'array') src.push(`var ${m.name} = ${print(m.node)};`);
+          else if(m.kind === 'alias') src.push(`var ${m.name} = ${m.target};`);
+          else if(m.node.type === 'FunctionDeclaration') src.push(print(m.node));
+          else src.push(`var ${m.name} = ${print(m.node)};`);
+        }
+        for(const r of g.rotations) src.push(print(r.call) + ';');
+        g.context = vm.createContext({
+          atob: s => Buffer.from(String(s), 'base64').toString('binary'),
+          btoa: s => Buffer.from(String(s), 'binary').toString('base64'),
+        });
+        try {
+          vm.runInContext(src.join('\n'), g.context, { timeout: SANDBOX_TIMEOUT_MS });
+        } catch(e) {
+          stats.sandbox_errors++;
+          g.context = null;
+          if(!quiet) console.error("String array sandbox failed for", g.array.name + ":", String(e && e.message || e));
+        }
+      }
+
+      // inline call sites; calls inside the group's own definitions (rotation checksums,
+      // wrappers) must stay as they are
+      const inlined = new Map();
+      const memo = new Map();
+      // decoder calls run inside the sandbox too, under the same timeout as its setup
+      const invoke = new vm.Script('globalThis[__callee].apply(null, __args)');
+      for(const call of calls) {
+        const g = memberOf.get(call.callee);
+        if(!g || (call.container && (g.members.includes(call.container) || g.rotations.includes(call.container)))) continue;
+        stats.call_sites++;
+        if(!g.context) {
+          stats.failed++;
+          continue;
+        }
+        const args = call.path.node.arguments.map(literalValue);
+        const key = call.callee + '\0' + JSON.stringify(args);
+        let value = memo.get(key);
+        if(value === undefined) {
+          try {
+            g.context.__callee = call.callee;
+            g.context.__args = args;
+            value = invoke.runInContext(g.context, { timeout: SANDBOX_TIMEOUT_MS });
+          } catch(e) {
+            value = null;
+            // a decoder that never returns (self-defending loop) is not called again
+            if(e && e.code === 'ERR_SCRIPT_EXECUTION_TIMEOUT') {
+              stats.timeouts++;
+              g.context = null;
+              if(!quiet) console.error("String array decoder timed out:", call.callee);
+            }
+          }
+          memo.set(key, value);
+        }
+        if(typeof value !== 'string') { stats.failed++; continue; }
+        call.path.replace(b.literal(value));
+        inlined.set(call.callee, (inlined.get(call.callee) || 0) + 1);
+        stats.inlined++;
+      }
+
+      // drop a group when every occurrence of its names is inside its own definitions
+      for(const g of groups.values()) {
+        if(g.members.length < 2 || !g.context) continue;
+        const owners = g.members.concat(g.rotations);
+        if(owners.some(o => !o.stmt)) continue;
+        const accounted = name => owners.reduce((n, o) =>
+          n + (o.refs ? o.refs.get(name) || 0 : 0) + (o.external ? o.external[name] || 0 : 0), 0) + (inlined.get(name) || 0);
+        if(!Array.from(g.names).every(name => nameCount.get(name) === accounted(name))) continue;
+        for(const o of owners) o.stmt.prune();
+        stats.groups_removed++;
+      }
+      stats.ms = Date.now() - t0;
+      if(!quiet) console.log("String array stats:", JSON.stringify(stats));
+      return stats;
+    }
+  };
+}
+
+function deobf(src, outdir) {
+  const code = fs.readFileSync(src,'utf8');
+  const { code: out, stats } = transform(code, [stringArrayPass()]);
+  const outPath = path.join(outdir, path.basename(src) + ".dearr.js");
+  const statsPath = path.join(outdir, path.basename(src) + ".dearr.stats.json");
+  fs.writeFileSync(outPath, out, 'utf8');
+  fs.writeFileSync(statsPath, JSON.stringify(Object.assign({ file: path.basename(src), bytes: Buffer.byteLength(code) }, stats.string_array), null, 2), 'utf8');
+  console.log("De-arr output:", outPath, "replacements:", stats.string_array.inlined);
+  return [outPath, statsPath];
+}
+
+module.exports = { deobf, stringArrayPass };
+
+if(require.main === module) {
+  const [,, src, outdir] = process.argv;
+  if(!src || !outdir) throw "usage";
+  deobf(src, outdir);
 }
-fs.writeFileSync(outPath, out, 'utf8');
-console.log("De-arr output:", outPath, "replacements:", replaced);
@@ -0,0 +1,44 @@
+// Single-parse restore: the file is parsed once, string-array inlining and renaming
+// run as one combined traversal over that tree, and the result is pretty-printed once.
+const fs = require('fs');
+const path = require('path');
+const { transform } = require('./ast_core.js');
+const { stringArrayPass } = require('./deobf_string_array.js');
+const { renamePass, writeRenames } = require('./ast_rename.js');
+
+function restoreCode(code, { quiet = false } = {}) {
+  const rename = renamePass({ quiet });
+  const result = transform(code, [stringArrayPass({ quiet }), rename], { pretty: true });
+  result.renames = rename.renames;
+  return result;
+}
+
+// Used for per-module restoring: a unit that fails to parse is passed through unchanged.
+function restoreBatch(codes) {
+  return codes.map(code => {
+    try {
+      return restoreCode(code, { quiet: true }).code;
+    } catch(e) {
+      console.error("Restore failed, keeping original:", String(e && e.message || e).split('\n')[0]);
+      return code;
+    }
+  });
+}
+
+function pipeline(src, outdir) {
+  const t0 = Date.now();
+  const { code, stats, renames } = restoreCode(fs.readFileSync(src, 'utf8'));
+  const outPath = path.join(outdir, path.basename(src) + ".pipeline.js");
+  fs.writeFileSync(outPath, code, 'utf8');
+  const mapPath = writeRenames(outPath, src, renames);
+  console.log("Pipeline output:", outPath, JSON.stringify(stats), (Date.now() - t0) + "ms");
+  return [outPath, mapPath];
+}
+
+module.exports = { restoreCode, restoreBatch, pipeline };
+
+if(require.main === module) {
+  const [,, src, outdir] = process.argv;
+  if(!src || !outdir) throw "usage";
+  pipeline(src, outdir);
+}
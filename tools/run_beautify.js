@@ -1,22 +1,49 @@
 const fs = require('fs');
 const child = require('child_process');
 const path = require('path');
-const [,, src, outdir] = process.argv;
-if(!src || !outdir) { console.error("Usage: node run_beautify.js src outdir"); process.exit(2); }
-const srcContent = fs.readFileSync(src,'utf8');
-const bname = path.basename(src);
-const out1 = path.join(outdir, bname + ".beautified.js");
-try {
-  child.execSync(`npx --yes js-beautify "${src}" -o "${out1}" --indent-size 2`, {stdio:'inherit'});
-} catch(e) {
-  const naive = srcContent.replace(/;/g, ';\n').replace(/\{/g,'{\n').replace(/\}/g,'}\n');
-  fs.writeFileSync(out1, naive, 'utf8');
+
+function tryRequire(name) {
+  try { return require(name); } catch(e) { return null; }
 }
-const out2 = path.join(outdir, bname + ".prettier.js");
-try {
-  child.execSync(`npx --yes prettier --parser babel --write "${out1}"`, {stdio:'inherit'});
-  fs.copyFileSync(out1, out2);
-} catch(e) {
-  fs.copyFileSync(out1, out2);
+
+// js-beautify/prettier are loaded once per process; npx is only a fallback when they are not installed.
+const jsBeautify = tryRequire('js-beautify');
+const prettier = tryRequire('prettier');
+
+function formatFile(file) {
+  if(prettier) {
+    fs.writeFileSync(file, prettier.format(fs.readFileSync(file,'utf8'), {parser:'babel'}), 'utf8');
+  } else {
+    child.execSync(`npx --yes prettier --parser babel --write "${file}"`, {stdio:'inherit'});
+  }
+}
+
+function beautify(src, outdir) {
+  const srcContent = fs.readFileSync(src,'utf8');
+  const bname = path.basename(src);
+  const out1 = path.join(outdir, bname + ".beautified.js");
+  try {
+    if(jsBeautify) fs.writeFileSync(out1, jsBeautify.js(srcContent, {indent_size: 2}), 'utf8');
+    else child.execSync(`npx --yes js-beautify "${src}" -o "${out1}" --indent-size 2`, {stdio:'inherit'});
+  } catch(e) {
+    const naive = srcContent.replace(/;/g, ';\n').replace(/\{/g,'{\n').replace(/\}/g,'}\n');
+    fs.writeFileSync(out1, naive, 'utf8');
+  }
+  const out2 = path.join(outdir, bname + ".prettier.js");
+  try {
+    formatFile(out1);
+    fs.copyFileSync(out1, out2);
+  } catch(e) {
+    fs.copyFileSync(out1, out2);
+  }
+  console.log("Beautify outputs:", out1, out2);
+  return [out1, out2];
+}
+
+module.exports = { beautify, formatFile };
+
+if(require.main === module) {
+  const [,, src, outdir] = process.argv;
+  if(!src || !outdir) { console.error("Usage: node run_beautify.js src outdir"); process.exit(2); }
+  beautify(src, outdir);
 }
-console.log("Beautify outputs:", out1, out2);
@@ -1,34 +1,210 @@
+// Runtime dump of a script loaded into a blank page. One Chromium and a small set of
+// pages are kept warm in BrowserPool and reused across files (the worker keeps the
+// pool alive between requests). A page counts as settled once the network is idle and
+// the DOM has stopped mutating, bounded by a hard ceiling instead of a fixed sleep.
 const fs = require('fs');
 const path = require('path');
-const puppeteer = require('puppeteer');
-const [,, src, outdir] = process.argv;
-if(!src || !outdir) throw "usage";
-(async ()=>{
-  const browser = await puppeteer.launch({args: ['--no-sandbox','--disable-setuid-sandbox']});
-  const page = await browser.newPage();
-  const tmp = path.join(outdir, "pupp_tmp");
+
+const IDLE_MS = 500;
+const QUIET_MS = 500;
+const CEILING_MS = 10000;
+const DEFAULT_PAGES = 4;
+
+class BrowserPool {
+  constructor({ size = DEFAULT_PAGES } = {}) {
+    this.size = size;
+    this.browser = null;
+    this.launching = null;
+    this.idle = [];
+    this.busy = 0;
+    this.waiting = [];
+  }
+
+  // concurrent acquire() calls share one launch
+  launch() {
+    if(!this.launching || (this.browser && !this.browser.isConnected())) {
+      const puppeteer = require('puppeteer');
+      this.idle = [];
+      this.launching = puppeteer.launch({args: ['--no-sandbox','--disable-setuid-sandbox']})
+        .then(browser => { this.browser = browser; return browser; })
+        .catch(e => { this.launching = null; throw e; });
+    }
+    return this.launching;
+  }
+
+  async acquire() {
+    if(this.busy >= this.size) await new Promise(resolve => this.waiting.push(resolve));
+    this.busy++;
+    try {
+      const browser = await this.launch();
+      return this.idle.pop() || await browser.newPage();
+    } catch(e) {
+      this.done();
+      throw e;
+    }
+  }
+
+  async release(page, broken = false) {
+    try {
+      // navigating away stops the script's timers before the page is reused
+      if(!broken && !page.isClosed()) {
+        await page.goto('about:blank', {timeout: CEILING_MS});
+        this.idle.push(page);
+      } else if(!page.isClosed()) {
+        await page.close();
+      }
+    } catch(e) {
+      if(!page.isClosed()) await page.close().catch(() => {});
+    } finally {
+      this.done();
+    }
+  }
+
+  done() {
+    this.busy--;
+    const next = this.waiting.shift();
+    if(next) next();
+  }
+
+  async close() {
+    const launching = this.launching;
+    this.browser = null;
+    this.launching = null;
+    this.idle = [];
+    const browser = launching && await launching.catch(() => null);
+    if(browser) await browser.close();
+  }
+}
+
+let shared = null;
+function sharedPool() {
+  if(!shared) shared = new BrowserPool();
+  return shared;
+}
+
+async function closeSharedPool() {
+  if(shared) await shared.close();
+  shared = null;
+}
+
+// Resolves once no DOM mutation happened for quietMs, or at ceilingMs.
+function domQuiet(page, quietMs, ceilingMs) {
+  return page.evaluate((quietMs, ceilingMs) => new Promise(resolve => {
+    let timer;
+    const finish = () => { observer.disconnect(); clearTimeout(timer); clearTimeout(ceiling); resolve(); };
+    const observer = new MutationObserver(() => { clearTimeout(timer); timer = setTimeout(finish, quietMs); });
+    observer.observe(document, {subtree: true, childList: true, attributes: true, characterData: true});
+    timer = setTimeout(finish, quietMs);
+    const ceiling = setTimeout(finish, ceilingMs);
+  }), quietMs, ceilingMs);
+}
+
+async function settle(page, deadline) {
+  const left = Math.max(deadline - Date.now(), 0);
+  let timer;
+  const ceiling = new Promise(resolve => { timer = setTimeout(() => resolve('ceiling'), left); });
+  const quiet = Promise.all([
+    page.waitForNetworkIdle({idleTime: IDLE_MS, timeout: left}).catch(() => {}),
+    domQuiet(page, QUIET_MS, left).catch(() => {}),
+  ]).then(() => 'quiet');
+  try {
+    return await Promise.race([quiet, ceiling]);
+  } finally {
+    clearTimeout(timer);
+  }
+}
+
+async function dumpRuntime(src, outdir, { pool = sharedPool(), ceiling = CEILING_MS } = {}) {
+  const t0 = Date.now();
+  const deadline = t0 + ceiling;
+  const tmp = path.join(outdir, "pupp_tmp", path.basename(src));
   fs.mkdirSync(tmp, {recursive:true});
   fs.copyFileSync(src, path.join(tmp, "file.js"));
   const html = `<!doctype html><html><head></head><body>
-    <script src="./file.js"></script>
-  </body></html>`;
+      <script src="./file.js"></script>
+    </body></html>`;
   fs.writeFileSync(path.join(tmp, "index.html"), html, 'utf8');
-  await page.goto('file://' + path.join(tmp, "index.html"), {waitUntil:'load', timeout:0});
-  await page.waitForTimeout(1200);
-  const dump = await page.evaluate(()=>{
-    const keys = Object.keys(window).filter(k=> typeof window[k] !== 'function' && k !== 'webkitStorageInfo' && k!=='webkitIndexedDB' && k!=='performance');
-    const sample = {};
-    for(const k of keys.slice(0,400)){
+
+  const page = await pool.acquire();
+  const errors = [];
+  const onError = e => errors.push(String(e && e.message || e).split('\n')[0]);
+  page.on('pageerror', onError);
+  let broken = false;
+  try {
+    try {
+      await page.goto('file://' + path.join(tmp, "index.html"), {waitUntil:'load', timeout: ceiling});
+    } catch(e) {
+      // a script that never finishes loading still leaves a window worth dumping
+      if(!e || e.name !== 'TimeoutError') throw e;
+    }
+    const settled = await settle(page, deadline);
+    const dump = await page.evaluate(()=>{
+      const keys = Object.keys(window).filter(k=> typeof window[k] !== 'function' && k !== 'webkitStorageInfo' && k!=='webkitIndexedDB' && k!=='performance');
+      const sample = {};
+      for(const k of keys.slice(0,400)){
+        try {
+          const v = window[k];
+          if(typeof v === 'string' && v.length>3) sample[k]=v;
+          else if(Array.isArray(v) && v.length>0) sample[k]=v.slice(0,20);
+        } catch(e){}
+      }
+      return {keys: keys.slice(0,200), sample};
+    });
+    dump.errors = errors.slice(0, 50);
+    const outPath = path.join(outdir, path.basename(src) + ".runtime_dump.json");
+    fs.writeFileSync(outPath, JSON.stringify(dump, null, 2), 'utf8');
+    console.log("Runtime dump saved:", outPath, `(${settled}, ${Date.now() - t0}ms)`);
+    return [outPath];
+  } catch(e) {
+    broken = true;
+    throw e;
+  } finally {
+    page.off('pageerror', onError);
+    await pool.release(page, broken);
+  }
+}
+
+// Dumps several scripts in parallel pages of one browser; a failing script is logged
+// and skipped so it does not take the rest of the batch down.
+async function dumpBatch(srcs, outdir, { concurrency = DEFAULT_PAGES, pool = null } = {}) {
+  const own = !pool;
+  pool = pool || new BrowserPool({ size: concurrency });
+  const outputs = [];
+  let next = 0;
+  async function lane() {
+    while(next < srcs.length) {
+      const src = srcs[next++];
       try {
-        const v = window[k];
-        if(typeof v === 'string' && v.length>3) sample[k]=v;
-        else if(Array.isArray(v) && v.length>0) sample[k]=v.slice(0,20);
-      } catch(e){}
+        outputs.push(...await dumpRuntime(src, outdir, { pool }));
+      } catch(e) {
+        console.error("Runtime dump failed:", src, String(e && e.message || e).split('\n')[0]);
+      }
     }
-    return {keys: keys.slice(0,200), sample};
-  });
-  const outPath = path.join(outdir, path.basename(src) + ".runtime_dump.json");
-  fs.writeFileSync(outPath, JSON.stringify(dump, null, 2), 'utf8');
-  console.log("Runtime dump saved:", outPath);
-  await browser.close();
-})();
+  }
+  try {
+    await Promise.all(Array.from({length: Math.min(concurrency, srcs.length)}, lane));
+  } finally {
+    if(own) await pool.close();
+  }
+  return outputs;
+}
+
+module.exports = { BrowserPool, sharedPool, closeSharedPool, dumpRuntime, dumpBatch };
+
+if(require.main === module) {
+  const args = process.argv.slice(2);
+  let run;
+  if(args[0] === '--batch') {
+    // node run_puppeteer.js --batch <outdir> [--jobs N] <src>...
+    const outdir = args[1];
+    let srcs = args.slice(2), concurrency = DEFAULT_PAGES;
+    if(srcs[0] === '--jobs') { concurrency = parseInt(srcs[1], 10) || DEFAULT_PAGES; srcs = srcs.slice(2); }
+    if(!outdir || !srcs.length) throw "usage";
+    run = dumpBatch(srcs, outdir, { concurrency });
+  } else {
+    const [src, outdir] = args;
+    if(!src || !outdir) throw "usage";
+    run = dumpRuntime(src, outdir).finally(closeSharedPool);
+  }
+  run.catch(e => { console.error(e); process.exit(1); });
+}
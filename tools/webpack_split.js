@@ -0,0 +1,84 @@
+// Splits a webpack bundle into its module functions.
+// The module map is the largest object literal whose keys are all numeric and whose values
+// are all functions ({334:function(){...},1290:function(t,e,r){...}}), or the largest array
+// of functions (webpack 4). The rest of the bundle is returned as "shell" with the map
+// replaced by PLACEHOLDER; each module is wrapped as `var __webpack_module__ = <fn>;` so it
+// parses as a standalone program.
+const fs = require('fs');
+const { visit } = require('recast').types;
+const { parse } = require('./ast_core.js');
+
+const PLACEHOLDER = '__WEBPACK_MODULES__';
+const WRAP_PREFIX = 'var __webpack_module__ = ';
+const MIN_MODULES = 2;
+
+function isFn(node) {
+  return node && (node.type === 'FunctionExpression' || node.type === 'ArrowFunctionExpression');
+}
+
+function numericKey(prop) {
+  if(prop.computed || !prop.key) return false;
+  const k = prop.key;
+  if(k.type === 'NumericLiteral' || (k.type === 'Literal' && typeof k.value === 'number')) return true;
+  return (k.type === 'StringLiteral' || k.type === 'Literal') && /^\d+$/.test(String(k.value));
+}
+
+function moduleSource(code, prop) {
+  // {12(t,e){...}} shorthand methods become plain function expressions
+  if(prop.type === 'ObjectMethod' || (prop.type === 'Property' && prop.method)) {
+    const fn = prop.type === 'ObjectMethod' ? prop : prop.value;
+    return 'function' + code.slice(prop.key.end, fn.end);
+  }
+  return code.slice(prop.value.start, prop.value.end);
+}
+
+function splitCode(code) {
+  const ast = parse(code);
+  let best = null;
+  visit(ast, {
+    visitObjectExpression(path) {
+      const props = path.node.properties;
+      if(props.length >= MIN_MODULES && (!best || props.length > best.count) && props.every(p =>
+          numericKey(p) && (p.type === 'ObjectMethod' || p.method || isFn(p.value)))) {
+        best = { node: path.node, kind: 'object', count: props.length };
+      }
+      this.traverse(path);
+    },
+    visitArrayExpression(path) {
+      const els = path.node.elements;
+      const fns = els.filter(e => e !== null);
+      if(fns.length >= MIN_MODULES && (!best || fns.length > best.count) && fns.every(isFn)) {
+        best = { node: path.node, kind: 'array', count: fns.length };
+      }
+      this.traverse(path);
+    }
+  });
+  if(!best || typeof best.node.start !== 'number') return null;
+  const node = best.node;
+  let modules;
+  if(best.kind === 'object') {
+    modules = node.properties.map(p => ({
+      key: code.slice(p.key.start, p.key.end),
+      code: WRAP_PREFIX + moduleSource(code, p) + ';\n'
+    }));
+  } else {
+    modules = node.elements.map(e => ({ key: null, code: e ? WRAP_PREFIX + code.slice(e.start, e.end) + ';\n' : null }));
+  }
+  const shell = code.slice(0, node.start) + PLACEHOLDER + code.slice(node.end);
+  return { kind: best.kind, shell, modules };
+}
+
+function splitWebpack(src) {
+  const res = splitCode(fs.readFileSync(src, 'utf8'));
+  console.log("Webpack split:", src, res ? `${res.modules.length} modules (${res.kind})` : "no module map found");
+  return res;
+}
+
+module.exports = { PLACEHOLDER, WRAP_PREFIX, splitCode, splitWebpack };
+
+if(require.main === module) {
+  const [,, src, out] = process.argv;
+  if(!src) throw "usage";
+  const res = splitWebpack(src);
+  if(out) fs.writeFileSync(out, JSON.stringify(res), 'utf8');
+}
@@ -0,0 +1,58 @@
+// Long-lived pass runner for magic.py.
+// Requests are JSON-RPC 2.0 objects, one per line on stdin:
+//   {"jsonrpc":"2.0","id":1,"method":"beautify","params":{"src":"...","outdir":"..."}}
+// Responses are written to stdout as one JSON line prefixed with RPC_MARK; every other
+// stdout line (tool logs, npx output) is plain log text and is streamed by the caller.
+const readline = require('readline');
+const { beautify, formatFile } = require('./run_beautify.js');
+const { deobf } = require('./deobf_string_array.js');
+const { rename } = require('./ast_rename.js');
+const { dumpRuntime, dumpBatch, sharedPool, closeSharedPool } = require('./run_puppeteer.js');
+const { pipeline, restoreBatch } = require('./pipeline.js');
+const { splitWebpack } = require('./webpack_split.js');
+
+const RPC_MARK = '\x1e';
+
+const methods = {
+  ping: () => ({ pid: process.pid, node: process.version }),
+  beautify: ({src, outdir}) => ({ outputs: beautify(src, outdir) }),
+  deobf_string_array: ({src, outdir}) => ({ outputs: deobf(src, outdir) }),
+  ast_rename: ({src, outdir}) => ({ outputs: rename(src, outdir) }),
+  pipeline: ({src, outdir}) => ({ outputs: pipeline(src, outdir) }),
+  split_webpack: ({src}) => splitWebpack(src),
+  restore_batch: ({codes}) => ({ codes: restoreBatch(codes) }),
+  // both share one warm browser that lives as long as the worker
+  puppeteer: async ({src, outdir}) => ({ outputs: await dumpRuntime(src, outdir) }),
+  puppeteer_batch: async ({srcs, outdir, concurrency}) =>
+    ({ outputs: await dumpBatch(srcs, outdir, { concurrency, pool: sharedPool() }) }),
+  prettier: ({file}) => { formatFile(file); return { outputs: [file] }; },
+  shutdown: async () => { await closeSharedPool(); setImmediate(() => process.exit(0)); return {}; },
+};
+
+function reply(msg) {
+  process.stdout.write(RPC_MARK + JSON.stringify(Object.assign({jsonrpc: '2.0'}, msg)) + '\n');
+}
+
+// Requests are handled strictly one at a time so tool logs are not interleaved.
+let queue = Promise.resolve();
+readline.createInterface({ input: process.stdin }).on('line', line => {
+  if(!line.trim()) return;
+  queue = queue.then(async () => {
+    let req;
+    try { req = JSON.parse(line); } catch(e) { return reply({id: null, error: {code: -32700, message: 'Parse error'}}); }
+    const fn = methods[req.method];
+    if(!fn) return reply({id: req.id, error: {code: -32601, message: 'Method not found: ' + req.method}});
+    // per-request CPU time and the worker's peak RSS so far, for magic.py --profile
+    const cpu0 = process.cpuUsage();
+    const usage = () => {
+      const cpu = process.cpuUsage(cpu0);
+      return { cpu_ms: Math.round((cpu.user + cpu.system) / 100) / 10, peak_rss_kb: process.resourceUsage().maxRSS };
+    };
+    try {
+      const result = await fn(req.params || {});
+      reply({id: req.id, result, usage: usage()});
+    } catch(e) {
+      reply({id: req.id, error: {code: -32000, message: String(e && e.stack || e)}, usage: usage()});
+    }
+  });
+}).on('close', () => queue.then(closeSharedPool).finally(() => process.exit(0)));
@@ -1,40 +1,357 @@
 import re
 import os
+import json
+import mmap
+import argparse
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from urllib.parse import urlsplit
+
+from body_store import REF_RE
+from timeline_blocks import HEADER_RE, BlockReader, filter_records, index_path, iter_lines, ts_bounds
+from timeline_db import PLACEHOLDERS, exchange_meta
 
 # Параметры
 INPUT_FILE = os.path.join("History", "timeline1.txt")  # путь к твоему файлу
 OUTPUT_FILE = os.path.join("History", "cs2run_csgoih_urls.txt")  # файл для результата
+CATALOG_FILE = os.path.join("History", "endpoints.json")  # --catalog
 
+# домен с точкой совпадает с хостом и всеми его поддоменами (csgoih.run, api.csgoih.run),
+# слово без точки — с любой меткой хоста (yandex → mc.yandex.ru, yandex.com.tr)
 INCLUDE_DOMAINS = ["cs2run.app", "csgoih.run"]
 EXCLUDE_DOMAINS = ["yandex", "google", "top-fwz1.mail.ru"]
 
 URL_REGEX = re.compile(r"https?://[^\s\"']+")
+HOST_REGEX = re.compile(r"https?://(?:[^\s\"'/?#@]*@)?([^\s\"'/?#:]+)", re.I)
+
+# --mmap: куски файла на процесс (выравниваются по границам записей)
+CHUNK_SIZE = 16 << 20
+RECORD_START = b"\n===== "
+
+# --catalog: сегменты пути, которые сворачиваются в шаблон
+ID_SEGMENT = re.compile(r"^\d+$")
+UUID_SEGMENT = re.compile(r"^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$", re.I)
+HEX_SEGMENT = re.compile(r"^[0-9a-f]{16,}$", re.I)
+# index-5f3a2b1c.js, chunk.BkP3x_9a.css, app.3f2a.js.map — хеш сборщика в имени файла
+ASSET_SEGMENT = re.compile(r"^(.+?[-.])([A-Za-z0-9_]{6,})(\.[A-Za-z0-9]+(?:\.map)?)$")
+# время ответа, если его записал инструмент захвата или сервер
+LATENCY_RE = re.compile(r"^\s*(X-Response-Time|X-Runtime|Response-Time|Duration|Elapsed|Time)\s*:\s*"
+                        r"([\d.]+)\s*(ms|s)?\s*$", re.M | re.I)
+SERVER_TIMING_RE = re.compile(r"^\s*Server-Timing\s*:(.*)$", re.M | re.I)
+DUR_RE = re.compile(r"dur=([\d.]+)")
+CONTENT_LENGTH_RE = re.compile(r"^\s*Content-Length\s*:\s*(\d+)\s*$", re.M | re.I)
+
+
+class DomainMatcher:
+    """
+    Один проход по меткам хоста справа налево: trie доменов из INCLUDE/EXCLUDE
+    (по меткам, а не подстрокам — "yandex" в пути URL больше не считается)
+    плюс множество одиночных меток. Результат кешируется по хосту.
+    """
+
+    def __init__(self, include, exclude):
+        self.trie = {}
+        self.labels = {}
+        for verdict, domains in ((True, include), (False, exclude)):
+            for dom in domains:
+                dom = dom.lower().strip(".")
+                if "." not in dom:
+                    self.labels.setdefault(dom, set()).add(verdict)
+                    continue
+                node = self.trie
+                for label in reversed(dom.split(".")):
+                    node = node.setdefault(label, {})
+                node.setdefault(None, set()).add(verdict)
+        self.cache = {}
+
+    def match(self, host):
+        verdict = self.cache.get(host)
+        if verdict is None:
+            verdict = self.cache[host] = self._match(host)
+        return verdict
+
+    def _match(self, host):
+        found = set()
+        node = self.trie
+        for label in reversed(host.lower().rstrip(".").split(".")):
+            found |= self.labels.get(label, set())
+            node = node and node.get(label)
+            if node:
+                found |= node.get(None, set())
+        return True in found and False not in found
+
+
+_matchers = {}
+
+
+def get_matcher(include_domains, exclude_domains):
+    key = (tuple(include_domains), tuple(exclude_domains))
+    if key not in _matchers:
+        _matchers[key] = DomainMatcher(include_domains, exclude_domains)
+    return _matchers[key]
+
 
 def extract_urls_from_line(line):
     return URL_REGEX.findall(line)
 
 def filter_domains(urls, include_domains, exclude_domains):
+    matcher = get_matcher(include_domains, exclude_domains)
     filtered = []
     for u in urls:
-        if any(dom in u for dom in include_domains) and not any(ex in u for ex in exclude_domains):
+        host = HOST_REGEX.match(u)
+        if host and matcher.match(host.group(1)):
             filtered.append(u)
     return filtered
 
+def unique_urls(text):
+    # порядок первого появления; dict сохраняет порядок вставки
+    return list(dict.fromkeys(filter_domains(URL_REGEX.findall(text), INCLUDE_DOMAINS, EXCLUDE_DOMAINS)))
+
+def scan_text(text, since, until):
+    if since or until:
+        text = "".join(filter_records(text.splitlines(keepends=True), since, until))
+    return unique_urls(text)
+
+def scan_chunk(task):
+    path, start, end, since, until = task
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        text = mm[start:end].decode("utf-8", errors="ignore")
+    return scan_text(text, since, until)
+
+def scan_blocks(task):
+    path, blocks, since, until = task
+    with BlockReader(path) as reader:
+        return [u for i in blocks
+                for u in scan_text(reader.block(i).decode("utf-8", errors="ignore"), since, until)]
+
+def record_chunks(path, since, until, chunk_size=CHUNK_SIZE):
+    # границы кусков сдвигаются до начала следующей записи, чтобы запись не резалась
+    size = os.path.getsize(path)
+    if size == 0:
+        return []
+    tasks = []
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        start = 0
+        while start < size:
+            end = size
+            if start + chunk_size < size:
+                pos = mm.find(RECORD_START, start + chunk_size)
+                if pos >= 0:
+                    end = pos + 1
+            tasks.append((path, start, end, since, until))
+            start = end
+    return tasks
+
+def block_chunks(path, since, until, chunk_size=CHUNK_SIZE):
+    with BlockReader(path) as reader:
+        tasks, group, raw = [], [], 0
+        for i in reader.blocks_between(since, until):
+            group.append(i)
+            raw += reader.blocks[i]["raw_length"]
+            if raw >= chunk_size:
+                tasks.append((path, group, since, until))
+                group, raw = [], 0
+        if group:
+            tasks.append((path, group, since, until))
+    return tasks
+
+def scan_parallel(path, since=None, until=None, workers=None):
+    since, until = ts_bounds(since, until)
+    if os.path.exists(index_path(path)):
+        fn, tasks = scan_blocks, block_chunks(path, since, until)
+    else:
+        fn, tasks = scan_chunk, record_chunks(path, since, until)
+    workers = min(workers or os.cpu_count() or 1, len(tasks))
+    # куски идут в порядке файла, так что первое появление URL сохраняется
+    if workers <= 1:
+        return list(dict.fromkeys(u for task in tasks for u in fn(task)))
+    with ProcessPoolExecutor(workers) as pool:
+        return list(dict.fromkeys(u for urls in pool.map(fn, tasks) for u in urls))
+
+def template_segment(seg):
+    if ID_SEGMENT.match(seg):
+        return "{id}"
+    if UUID_SEGMENT.match(seg):
+        return "{uuid}"
+    if HEX_SEGMENT.match(seg):
+        return "{hash}"
+    asset = ASSET_SEGMENT.match(seg)
+    # хеш — смесь букв и цифр; "index.min.js" или "v2" шаблоном не становятся
+    if asset and re.search(r"\d", asset.group(2)) and re.search(r"[A-Za-z]", asset.group(2)):
+        return asset.group(1) + "{hash}" + asset.group(3)
+    return seg
+
+def url_template(u):
+    parts = urlsplit(u)
+    path = "/".join(template_segment(seg) for seg in parts.path.split("/"))
+    query = ""
+    if parts.query:
+        keys = [kv.split("=", 1)[0] for kv in parts.query.split("&") if kv]
+        query = "?" + "&".join(f"{k}={{}}" for k in keys)
+    return f"{parts.scheme}://{(parts.hostname or '').lower()}{path or '/'}{query}"
+
+def ts_seconds(ts):
+    # 2025-12-09_09-42-51-123456 → секунды (хвост — доли секунды)
+    y, mo, d, h, mi, sec, frac = re.findall(r"\d+", ts)[:7]
+    return (datetime(int(y), int(mo), int(d)).timestamp() + int(h) * 3600 + int(mi) * 60 + int(sec)
+            + int(frac) / 10 ** len(frac))
+
+def latency_ms(request, response):
+    for text in (response, request):
+        match = LATENCY_RE.search(text or "")
+        if match:
+            value = float(match.group(2))
+            unit = (match.group(3) or ("s" if match.group(1).lower() == "x-runtime" else "ms")).lower()
+            return value * 1000 if unit == "s" else value
+        timing = SERVER_TIMING_RE.search(text or "")
+        if timing:
+            durs = [float(d) for d in DUR_RE.findall(timing.group(1))]
+            if durs:
+                return max(durs)
+    return None
+
+def iter_exchanges(path, since=None, until=None):
+    """Обмены timeline: ts, url, текст запроса/ответа и размер тела (по ссылке хранилища — из неё)."""
+    rec = None
+    for line in iter_lines(path, since, until):
+        header = HEADER_RE.match(line)
+        if header:
+            if rec:
+                yield finish_exchange(rec)
+            url = line[header.end():].rstrip("\n")
+            rec = {"ts": header.group(1), "url": url[:-len(" =====")] if url.endswith(" =====") else url,
+                   "section": None, "REQUEST": [], "RESPONSE": [], "BODY": []}
+            continue
+        if rec is None:
+            continue
+        name = line.strip()
+        if name in ("[REQUEST]", "[RESPONSE]", "[BODY]"):
+            rec["section"] = name[1:-1]
+            continue
+        if rec["section"]:
+            rec[rec["section"]].append(line)
+    if rec:
+        yield finish_exchange(rec)
+
+def finish_exchange(rec):
+    body = "".join(rec["BODY"])
+    # секция тела заканчивается "\n\n", запрос и ответ — "\n" и пустой строкой перед следующей секцией
+    text = body[:-2] if body.endswith("\n\n") else body.rstrip("\n")
+    ref = REF_RE.match(text)
+    if ref:
+        size = int(ref.group(2))
+    elif not rec["BODY"] or text in PLACEHOLDERS:
+        size = None
+    else:
+        size = len(text.encode("utf-8"))
+    return {"ts": rec["ts"], "url": rec["url"], "request": "".join(rec["REQUEST"]).strip(),
+            "response": "".join(rec["RESPONSE"]).strip(), "body_size": size}
+
+def percentiles(values, digits=1):
+    if not values:
+        return None
+    ordered = sorted(values)
+    pick = lambda q: ordered[min(len(ordered) - 1, max(0, round(q * (len(ordered) - 1))))]
+    return {"p50": round(pick(0.5), digits), "p90": round(pick(0.9), digits),
+            "p99": round(pick(0.99), digits), "max": round(ordered[-1], digits)}
+
+def build_catalog(path, since=None, until=None):
+    matcher = get_matcher(INCLUDE_DOMAINS, EXCLUDE_DOMAINS)
+    endpoints = defaultdict(lambda: {"calls": 0, "status": Counter(), "latency": [], "size": [], "times": [],
+                                     "examples": []})
+    for ex in iter_exchanges(path, since, until):
+        host = HOST_REGEX.match(ex["url"])
+        if not host or not matcher.match(host.group(1)):
+            continue
+        meta = exchange_meta(ex["url"], ex["request"], ex["response"])
+        ep = endpoints[(meta["method"] or "?", url_template(ex["url"]))]
+        ep["calls"] += 1
+        ep["status"][str(meta["status"] or "---")] += 1
+        ep["times"].append(ts_seconds(ex["ts"]))
+        latency = latency_ms(ex["request"], ex["response"])
+        if latency is not None:
+            ep["latency"].append(latency)
+        size = ex["body_size"]
+        if size is None:
+            length = CONTENT_LENGTH_RE.search(ex["response"])
+            size = int(length.group(1)) if length else None
+        if size is not None:
+            ep["size"].append(size)
+        if len(ep["examples"]) < 3 and ex["url"] not in ep["examples"]:
+            ep["examples"].append(ex["url"])
+
+    catalog = []
+    for (method, template), ep in endpoints.items():
+        times = sorted(ep["times"])
+        gaps = [(b - a) * 1000 for a, b in zip(times, times[1:])]
+        catalog.append({
+            "method": method,
+            "template": template,
+            "calls": ep["calls"],
+            "status": dict(ep["status"].most_common()),
+            "latency_ms": percentiles(ep["latency"]),
+            "latency_samples": len(ep["latency"]),
+            "size_bytes": percentiles(ep["size"], 0),
+            # интервал между вызовами: для опрашиваемых эндпоинтов это их период
+            "interval_ms": percentiles(gaps),
+            "first": datetime.fromtimestamp(times[0]).isoformat(timespec="milliseconds"),
+            "last": datetime.fromtimestamp(times[-1]).isoformat(timespec="milliseconds"),
+            "examples": ep["examples"],
+        })
+    catalog.sort(key=lambda e: -e["calls"])
+    return catalog
+
+def print_catalog(catalog, top=20):
+    fmt = lambda p: f"{p['p50']:>8} {p['p90']:>8}" if p else f"{'-':>8} {'-':>8}"
+    print(f"{'calls':>6} {'lat p50':>8} {'lat p90':>8} {'size p50':>8} {'size p90':>8} {'int p50':>8} {'int p90':>8}  endpoint")
+    for e in catalog[:top]:
+        print(f"{e['calls']:>6} {fmt(e['latency_ms'])} {fmt(e['size_bytes'])} {fmt(e['interval_ms'])}  "
+              f"{e['method']} {e['template']}")
+
+def default_input():
+    # history.py --blocks пишет timeline1.txt.gz вместо timeline1.txt
+    if not os.path.exists(INPUT_FILE) and os.path.exists(INPUT_FILE + ".gz"):
+        return INPUT_FILE + ".gz"
+    return INPUT_FILE
+
 def main():
-    found = []
-    with open(INPUT_FILE, encoding="utf-8", errors="ignore") as f:
-        for line in f:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--input", default=default_input(), help="timeline1.txt или блочный timeline1.txt.gz")
+    parser.add_argument("--since", help="Только записи с этого времени (2025-12-09_09-42 или 2025-12-09 09:42)")
+    parser.add_argument("--until", help="Только записи до этого времени, включительно")
+    parser.add_argument("--mmap", action="store_true",
+                        help="Читать timeline через mmap кусками по границам записей, параллельно")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Процессов для --mmap")
+    parser.add_argument("--catalog", action="store_true",
+                        help=f"Каталог эндпоинтов (шаблоны URL, вызовы, задержки, размеры) → {CATALOG_FILE}")
+    args = parser.parse_args()
+
+    if args.catalog:
+        catalog = build_catalog(args.input, args.since, args.until)
+        with open(CATALOG_FILE, "w", encoding="utf-8") as out:
+            json.dump(catalog, out, indent=1, ensure_ascii=False)
+        print_catalog(catalog)
+        print(f"[OK] Каталог сохранён в {CATALOG_FILE}, эндпоинтов: {len(catalog)}")
+        return
+
+    if args.mmap:
+        unique = scan_parallel(args.input, args.since, args.until, args.workers)
+    else:
+        found = []
+        # у блочного timeline распаковываются только блоки, попавшие в интервал
+        for line in iter_lines(args.input, args.since, args.until):
             urls = extract_urls_from_line(line)
             for u in filter_domains(urls, INCLUDE_DOMAINS, EXCLUDE_DOMAINS):
                 found.append(u)
 
-    # удаляем дубли, сохраняя порядок
-    unique = []
-    seen = set()
-    for u in found:
-        if u not in seen:
-            seen.add(u)
-            unique.append(u)
+        # удаляем дубли, сохраняя порядок
+        unique = []
+        seen = set()
+        for u in found:
+            if u not in seen:
+                seen.add(u)
+                unique.append(u)
 
     # сохраняем в файл
     with open(OUTPUT_FILE, "w", encoding="utf-8") as out:
@@ -44,4 +361,4 @@ def main():
     print(f"[OK] Результат сохранён в {OUTPUT_FILE}, всего {len(unique)} URL")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()